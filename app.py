@@ -1,17 +1,102 @@
+import asyncio
+import os
+import uuid
+
 import gradio as gr
-from focus_buddy_langgraph import run_focus_session_v4
+from focus_buddy_langgraph import astream_focus_session_v4, get_checkpointer
 from memory_manager import get_recent_sessions, record_session
-
-
-def run_agent(goal, duration, auto_schedule):
+from metrics import get_metrics
+from plan_checks import get_reflection_stats
+
+NODE_LABELS = {
+    "context_agent": "📡 context",
+    "classifier": "🏷️ classified",
+    "router": "🔀 routed",
+    "planner_agent": "📝 draft plan",
+    "research_agent": "🔎 research notes",
+    "motivator_agent": "💪 motivation",
+    "reflection_agent": "🔁 reflection",
+}
+
+
+def format_debug(run=None):
+    """Markdown tables: per-step timings of `run` (this session's last run), then p50/p95/p99 over all runs."""
+    if not run:
+        return "_No runs yet._"
+    lines = [
+        f"**Last run** `{run['id']}` — {run['total_ms']:.0f} ms total",
+        "",
+        "| step | ms | tokens in/out | cache |",
+        "|---|---:|---:|---|",
+    ]
+    for sp in run["spans"]:
+        tokens = f"{sp.get('input_tokens', '–')}/{sp.get('output_tokens', '–')}" if "llm." in sp["name"] else ""
+        cache = "hit" if sp.get("cache_hit") else ("miss" if "llm." in sp["name"] else "")
+        error = f" ⚠️ {sp['error']}" if sp.get("error") else ""
+        lines.append(f"| {sp['name']}{error} | {sp['ms']:.1f} | {tokens} | {cache} |")
+    refl = get_reflection_stats()
+    if refl["reviewed"]:
+        lines += [
+            "",
+            f"Reflection skipped on {refl['skipped'] + refl['merged']}/{refl['reviewed']} plans "
+            f"(≈{refl['est_seconds_saved']:.1f} s saved)",
+        ]
+    lines += ["", "**All runs**", "", "| metric | n | p50 | p95 | p99 |", "|---|---:|---:|---:|---:|"]
+    for name, m in get_metrics().items():
+        lines.append(f"| {name} | {m['count']} | {m['p50_ms']} | {m['p95_ms']} | {m['p99_ms']} |")
+    return "\n".join(lines)
+
+
+def _user_id(request):
+    """Whose data a request may touch, decided server-side: the logged-in user when the app runs with auth,
+    else this browser session. None (no request, e.g. a direct call) = the shared single-user files."""
+    if request is None:
+        return None
+    return getattr(request, "username", None) or f"session-{request.session_hash}"
+
+
+def _run(last_run, user_id, goal, duration, auto_schedule):
+    """Checkpointed run for this click: the previous run id when that run failed (resume it) or only
+    auto_schedule changed (reuse its plan); a new one otherwise. `ok` turns True once the plan is shown."""
+    key = [user_id, goal, duration]
+    if last_run and last_run["key"] == key and (not last_run["ok"] or last_run["auto_schedule"] != auto_schedule):
+        run_id = last_run["run_id"]
+    else:
+        run_id = uuid.uuid4().hex
+    return {"key": key, "run_id": run_id, "auto_schedule": auto_schedule, "ok": False}
+
+
+async def run_agent(goal, duration, auto_schedule, last_run, last_trace, request: gr.Request = None):
+    """Streams progress and plan text into the UI as the graph runs (async: no worker thread is held).
+    `last_trace` is this session's latest run_trace record: other sessions' runs never show up in its debug table."""
     if not goal or not duration:
-        return "⚠️ Please enter both goal and duration.", "No previous sessions yet."
-    plan = run_focus_session_v4(goal, duration, auto_schedule=auto_schedule)
-    recent = get_recent_sessions()
-    return plan, recent
-
-
-def submit_feedback(goal, duration, fatigue, breaks, focus_time):
+        yield "⚠️ Please enter both goal and duration.", "No previous sessions yet.", gr.update(), last_run, last_trace
+        return
+    user_id = _user_id(request)
+    run = _run(last_run, user_id, goal, duration, auto_schedule)
+    if last_run and last_run["run_id"] != run["run_id"]:
+        await get_checkpointer().adelete_thread(last_run["run_id"])  # this session can no longer reach it
+    yield "_⏳ starting…_", gr.update(), gr.update(), run, last_trace
+    done, text, streaming_node = [], "", None
+    async for event in astream_focus_session_v4(
+        goal, duration, auto_schedule=auto_schedule, user_id=user_id, run_id=run["run_id"]
+    ):
+        if event["type"] == "node":
+            done.append(NODE_LABELS.get(event["node"], event["node"]))
+        elif event["type"] == "token":
+            if event["node"] != streaming_node:  # reflector output replaces the draft
+                streaming_node, text = event["node"], ""
+            text += event["text"]
+        else:
+            recent = await asyncio.to_thread(get_recent_sessions, user_id=user_id)
+            trace = event["run"] or last_trace  # None: the finished run was reused, nothing ran
+            yield event["text"], recent, format_debug(trace), {**run, "ok": True}, trace
+            return
+        progress = "_⏳ " + " → ".join(done) + "_" if done else "_⏳ starting…_"
+        yield f"{progress}\n\n{text}", gr.update(), gr.update(), gr.update(), gr.update()
+
+
+async def submit_feedback(goal, duration, fatigue, breaks, focus_time, request: gr.Request = None):
     if not goal or not duration:
         return "⚠️ Please enter the same goal + duration you just worked on."
     try:
@@ -19,13 +104,15 @@ def submit_feedback(goal, duration, fatigue, breaks, focus_time):
     except ValueError:
         focus_int = None
 
-    record_session(
+    await asyncio.to_thread(
+        record_session,
         goal=goal,
         duration=duration,
         reflection="User feedback after execution.",
         actual_focus=focus_int,
         fatigue_score=int(fatigue) if fatigue is not None else None,
         breaks_taken=int(breaks) if breaks is not None else 0,
+        user_id=_user_id(request),
     )
     return "Feedback saved! Future plans will adapt to this pattern."
 
@@ -47,11 +134,19 @@ with gr.Blocks(title="Focus Buddy v4.0 — MCP-ready & Self-aware") as demo:
     )
 
     run_btn = gr.Button("Generate Plan")
+    last_run = gr.State(None)  # run id of the previous click, for resume / re-schedule
+    last_trace = gr.State(None)  # timings of this session's last run, for the debug table
 
     plan_out = gr.Markdown(label="Plan / Reflection", show_copy_button=True)
     memory_out = gr.Textbox(label="Recent Sessions", lines=8)
+    with gr.Accordion("Debug: last run timings", open=False):
+        debug_out = gr.Markdown(format_debug())
 
-    run_btn.click(run_agent, [goal, duration, auto_schedule], [plan_out, memory_out])
+    run_btn.click(
+        run_agent,
+        [goal, duration, auto_schedule, last_run, last_trace],
+        [plan_out, memory_out, debug_out, last_run, last_trace],
+    )
 
     gr.Markdown("## Log Your Session Feedback")
     fatigue = gr.Slider(1, 5, step=1, label="Fatigue (1 = fresh, 5 = exhausted)", value=3)
@@ -67,5 +162,8 @@ with gr.Blocks(title="Focus Buddy v4.0 — MCP-ready & Self-aware") as demo:
         [status],
     )
 
+# handlers are async, so one process can run many sessions at once (Gradio's default is 1 per event)
+demo.queue(default_concurrency_limit=int(os.getenv("APP_CONCURRENCY", "64")))
+
 if __name__ == "__main__":
     demo.launch()
@@ -0,0 +1 @@
+"""Offline benchmarks for Focus Buddy (stubbed LLM + MCP latency, no network)."""
@@ -0,0 +1,83 @@
+"""
+Sync vs async planning sessions against a local OpenAI-compatible stub server, i.e.
+through the real ChatOpenAI / AsyncOpenAI clients and their pooled HTTP connections.
+
+    python -m benchmarks.bench_async --sessions 50 --threads 4 --latency 0.3
+
+sync:  run_focus_session_v4 on a pool of `--threads` worker threads (like Gradio workers)
+async: arun_focus_session_v4 for all sessions at once on one event loop
+Also compares focus_buddy.focus_buddy_agent with afocus_buddy_agent. "conns" is the
+number of TCP connections the server saw, which stays near the pool size when
+keep-alive connections are reused.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stub_openai_server import start_stub_server
+from benchmarks.stubs import sandbox
+
+
+def _row(label, seconds, sessions, server):
+    print(f"{label:<28}{seconds:>9.2f}{sessions / seconds:>12.1f}{server.requests:>10}{server.connections:>8}")
+    server.requests = server.connections = 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=4, help="sync worker threads")
+    parser.add_argument("--latency", type=float, default=0.3, help="stub server seconds per request")
+    args = parser.parse_args(argv)
+
+    server, base_url = start_stub_server(latency=args.latency)
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-stub")
+
+    import focus_buddy
+    import focus_buddy_langgraph as fbl
+
+    goals = [f"Finish report section {i}" for i in range(args.sessions)]  # distinct → no cache hits
+    with sandbox():
+        try:
+            # warm up: imports, graph compile, first connection
+            fbl.run_focus_session_v4("Warm up", "1 hour")
+            asyncio.run(fbl.arun_focus_session_v4("Warm up async", "1 hour"))
+            server.requests = server.connections = 0
+            fbl.llm_cache.clear()
+
+            print(f"{'mode':<28}{'wall s':>9}{'sessions/s':>12}{'requests':>10}{'conns':>8}")
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.threads) as pool:
+                list(pool.map(lambda g: fbl.run_focus_session_v4(g, "1 hour"), goals))
+            _row(f"graph sync ({args.threads} threads)", time.perf_counter() - t0, args.sessions, server)
+
+            fbl.llm_cache.clear()
+
+            async def run_async():
+                return await asyncio.gather(*(fbl.arun_focus_session_v4(g, "1 hour") for g in goals))
+
+            t0 = time.perf_counter()
+            asyncio.run(run_async())
+            _row("graph async (1 loop)", time.perf_counter() - t0, args.sessions, server)
+
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.threads) as pool:
+                list(pool.map(lambda g: focus_buddy.focus_buddy_agent(g, "1 hour"), goals))
+            _row(f"focus_buddy sync ({args.threads} thr)", time.perf_counter() - t0, args.sessions, server)
+
+            async def run_simple():
+                return await asyncio.gather(*(focus_buddy.afocus_buddy_agent(g, "1 hour") for g in goals))
+
+            t0 = time.perf_counter()
+            asyncio.run(run_simple())
+            _row("focus_buddy async", time.perf_counter() - t0, args.sessions, server)
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Recurring events and bulk calendar operations.
+
+    python -m benchmarks.bench_calendar --events 500 --series 2000
+    python -m benchmarks.bench_calendar --check-only      # exit 1 if a check fails
+
+checks:  random RRULEs expanded lazily over random windows vs a naive day-by-day
+         expansion from the first occurrence; free slots from the index vs the original
+         5-minute greedy scan on random calendars; add_events_bulk / remove_events are
+         one write each and round-trip through the file
+import:  `--events` meetings via add_event one at a time vs one add_events_bulk call
+series:  `--series` weekly meetings that started five years ago, stored as RRULE records
+         vs materialized (every occurrence up to a year ahead as a one-off event):
+         file size, index build and get_free_slots over a week
+"""
+
+import argparse
+import calendar
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import mcp_client
+from benchmarks.stubs import sandbox
+from calendar_engine import WEEKDAYS, CalendarIndex, Recurrence, get_calendar_index
+from data_repository import get_repository
+from mcp_client import CalendarServerMock
+
+
+def _reference(start, end, freq, interval, days, count, until, exdates, hi):
+    """Every occurrence start up to `hi`, walking day by day from the first one."""
+    out, n, day = [], 0, start.replace(hour=0, minute=0)
+    clock = start - day
+    first_monday = start.date() - timedelta(days=start.weekday())
+    while day <= hi:
+        if freq == "DAILY":
+            hit = (day.date() - start.date()).days % interval == 0
+        elif freq == "WEEKLY":
+            weeks = (day.date() - timedelta(days=day.weekday()) - first_monday).days // 7
+            hit = day.weekday() in days and weeks % interval == 0
+        else:
+            months = (day.year - start.year) * 12 + day.month - start.month
+            length = calendar.monthrange(day.year, day.month)[1]
+            hit = months % interval == 0 and any(day.day == (d if d > 0 else length + d + 1) for d in days)
+        s = day + clock
+        if hit and s >= start:
+            if (count is not None and n >= count) or (until and s > until) or s > hi:
+                break
+            n += 1
+            if s not in exdates:
+                out.append(s)
+        day += timedelta(days=1)
+    return out
+
+
+def check_expansion(tmp: Path, rng: random.Random, cases: int) -> list:
+    failures = []
+    base = datetime(2024, 1, 1)
+    index = CalendarIndex(tmp / "probe.json")
+    index.refresh()  # an empty file: load_events below is not overwritten by a reload
+    for case in range(cases):
+        start = base + timedelta(days=rng.randint(0, 400), minutes=15 * rng.randint(0, 95))
+        end = start + timedelta(minutes=rng.choice([15, 30, 60, 90, 24 * 60 + 30]))
+        freq = rng.choice(["DAILY", "WEEKLY", "MONTHLY"])
+        interval = rng.randint(1, 3)
+        parts = [f"FREQ={freq}", f"INTERVAL={interval}"]
+        if freq == "WEEKLY":
+            days = sorted(rng.sample(range(7), rng.randint(1, 4)))
+            parts.append("BYDAY=" + ",".join(WEEKDAYS[d] for d in days))
+        elif freq == "MONTHLY":
+            days = rng.sample([1, 15, 28, 29, 30, 31, -1, -3], rng.randint(1, 3))
+            parts.append("BYMONTHDAY=" + ",".join(map(str, days)))
+        else:
+            days = []
+        count = until = None
+        if rng.random() < 0.4:
+            count = rng.randint(1, 60)
+            parts.append(f"COUNT={count}")
+        elif rng.random() < 0.5:
+            until = start + timedelta(days=rng.randint(0, 500), hours=rng.randint(0, 23))
+            parts.append("UNTIL=" + until.strftime("%Y%m%dT%H%M%S"))
+        rule = ";".join(parts)
+        horizon = start + timedelta(days=900)
+        every = _reference(start, end, freq, interval, days, count, until, set(), horizon)
+        exdates = set(rng.sample(every, min(len(every), rng.randint(0, 3))))
+        expected_all = [s for s in every if s not in exdates]
+        series = Recurrence(start, end, rule, [x.isoformat() for x in exdates])
+        index.load_events([{"title": "x", "start": start.isoformat(), "end": end.isoformat(), "rrule": rule,
+                            "exdate": [x.isoformat() for x in exdates]}])
+        for _ in range(5):
+            lo = start + timedelta(days=rng.randint(-30, 800), hours=rng.randint(0, 23))
+            hi = lo + timedelta(hours=rng.choice([1, 8, 48, 24 * 9, 24 * 40]))
+            expected = [s for s in expected_all if s + (end - start) > lo and s <= hi]
+            lazy = [s for s, _ in series.between(lo, hi)]
+            cached = [s for s, _ in index.busy_between(lo, hi)]  # day buckets, possibly already expanded
+            if lazy != expected or cached != expected:
+                failures.append(f"case {case}: {rule} start {start} window {lo}..{hi}: "
+                                f"{len(lazy)} / {len(cached)} vs {len(expected)}")
+                break
+    return failures
+
+
+def _greedy_free_slots(events, now, end, duration_minutes):
+    """The original get_free_slots scan (before the interval index), kept as the reference."""
+    occupied = []
+    for e in events:
+        try:
+            s = datetime.fromisoformat(e["start"])
+            f = datetime.fromisoformat(e["end"])
+            occupied.append((max(s, now), min(f, end)))
+        except Exception:
+            continue
+    cur, slots = now, []
+    block = timedelta(minutes=duration_minutes)
+    while cur + block <= end and len(slots) < 3:
+        conflict = False
+        for s, f in occupied:
+            if cur < f and (cur + block) > s:
+                conflict = True
+                cur = max(cur, f)
+                break
+        if not conflict:
+            slots.append({"start": cur.isoformat(timespec="minutes"),
+                          "end": (cur + block).isoformat(timespec="minutes")})
+            cur += timedelta(minutes=duration_minutes // 2 or 1)
+    return slots
+
+
+def check_greedy(tmp: Path, rng: random.Random, cases: int) -> list:
+    index = CalendarIndex(tmp / "greedy.json")
+    index.refresh()
+    now = datetime(2030, 3, 4, 9, 0)
+    for case in range(cases):
+        horizon = rng.choice([2, 8, 24, 72])
+        events = []
+        for _ in range(rng.randint(0, 40)):
+            s = now + timedelta(minutes=rng.randint(-180, horizon * 60 + 180))
+            f = s + timedelta(minutes=rng.choice([0, 5, 15, 25, 30, 45, 60, 90, 240]))
+            events.append({"title": "x", "start": s.isoformat(timespec="minutes"),
+                           "end": f.isoformat(timespec="minutes")})
+        duration = rng.choice([1, 15, 25, 30, 45, 50, 60, 90, 120])
+        end = now + timedelta(hours=horizon)
+        index.load_events(events)
+        expected = _greedy_free_slots(events, now, end, duration)
+        got = index.free_slots(duration, now, end)
+        if got != expected:
+            return [f"free slots case {case} ({len(events)} events, {duration} min over {horizon} h): "
+                    f"{got} vs greedy {expected}"]
+    return []
+
+
+def check_bulk(tmp: Path) -> list:
+    failures = []
+    path = mcp_client.CAL_PATH = tmp / "bulk.json"
+    repo = get_repository(path, "calendar")
+    events = [{"title": f"Import {i}", "start": f"2030-01-{1 + i % 28:02d}T09:00",
+               "end": f"2030-01-{1 + i % 28:02d}T09:30"} for i in range(200)]
+    events += [{"title": "Standup", "start": "2030-01-01T10:00", "end": "2030-01-01T10:15",
+                "rrule": "FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR"},
+               {"title": "Broken", "start": "2030-01-01T10:00", "end": "2030-01-01T10:15", "rrule": "FREQ=HOURLY"},
+               {"title": "No end", "start": "2030-01-01T10:00"}]
+    repo.snapshot()  # load the (missing) file first: reloads bump the version too
+    version = repo.version
+    out = CalendarServerMock.add_events_bulk(events)
+    if (out["added"], len(out["rejected"]), repo.version - version) != (201, 2, 1):
+        failures.append(f"add_events_bulk: {out['added']} added, {len(out['rejected'])} rejected, "
+                        f"{repo.version - version} writes (expected 201, 2, 1)")
+    on_disk = json.loads(path.read_text(encoding="utf-8"))["events"]
+    if len(on_disk) != 201 or len(path.read_text(encoding="utf-8").splitlines()) != 201 + 4:
+        failures.append("bulk import is not one event per line on disk")
+    busy = get_calendar_index(path).busy_between(datetime(2030, 1, 6), datetime(2030, 1, 9))  # Sun..Tue
+    if sum(1 for s, f in busy if (s.hour, s.minute, f - s) == (10, 0, timedelta(minutes=15))) != 2:
+        failures.append(f"weekday standup not expanded over Mon-Tue: {busy}")
+    version = repo.version
+    removed = CalendarServerMock.remove_events(ids=out["ids"][:50], title="Standup")["removed"]
+    if removed != 51 or repo.version - version != 1 or len(json.loads(path.read_text())["events"]) != 150:
+        failures.append(f"remove_events removed {removed} in {repo.version - version} writes (expected 51 in 1)")
+    if CalendarServerMock.remove_events(ids=["missing"])["removed"] != 0 or repo.version - version != 1:
+        failures.append("remove_events with no match wrote the file")
+    return failures
+
+
+def _weekly_series(n: int, now: datetime):
+    rng = random.Random(n)
+    first = now - timedelta(days=5 * 365)
+    series = []
+    for i in range(n):
+        start = (first + timedelta(days=rng.randint(0, 6))).replace(hour=rng.randint(8, 17), minute=0)
+        days = ",".join(rng.sample(WEEKDAYS[:5], rng.randint(1, 2)))
+        series.append({"title": f"Weekly {i}", "start": start.isoformat(timespec="minutes"),
+                       "end": (start + timedelta(minutes=30)).isoformat(timespec="minutes"),
+                       "rrule": f"FREQ=WEEKLY;BYDAY={days};INTERVAL={rng.choice([1, 1, 2])}"})
+    return series
+
+
+def _ms(fn, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings)
+
+
+def bench(tmp: Path, events: int, series: int) -> None:
+    rows = [{"title": f"Meeting {i}", "start": f"2030-02-{1 + i % 28:02d}T{8 + i % 9:02d}:00",
+             "end": f"2030-02-{1 + i % 28:02d}T{8 + i % 9:02d}:45"} for i in range(events)]
+    mcp_client.CAL_PATH = tmp / "one_by_one.json"
+    t0 = time.perf_counter()
+    for e in rows:
+        CalendarServerMock.add_event(e["title"], e["start"], e["end"])
+    one = time.perf_counter() - t0
+    mcp_client.CAL_PATH = tmp / "bulk_import.json"
+    t0 = time.perf_counter()
+    CalendarServerMock.add_events_bulk(rows)
+    bulk = time.perf_counter() - t0
+    print(f"import {events} events: add_event × {events} {one * 1000:.0f} ms, add_events_bulk {bulk * 1000:.1f} ms "
+          f"({one / bulk:.0f}×)")
+
+    now = datetime.now().replace(second=0, microsecond=0)
+    recurring = _weekly_series(series, now)
+    probe = CalendarIndex(tmp / "unused.json")
+    materialized = []
+    for e in recurring:
+        s, f = datetime.fromisoformat(e["start"]), datetime.fromisoformat(e["end"])
+        materialized += [{"title": e["title"], "start": a.isoformat(timespec="minutes"),
+                          "end": b.isoformat(timespec="minutes")}
+                         for a, b in Recurrence(s, f, e["rrule"]).between(s, now + timedelta(days=365))]
+    print(f"\n{series} weekly series since {now.year - 5}{'':<6}{'RRULE records':>16}{'materialized':>16}")
+    layouts = {}
+    for label, data in (("rrule", recurring), ("materialized", materialized)):
+        path = tmp / f"{label}.json"
+        repo = get_repository(path, "calendar")
+        repo.add_many(data)
+        layouts[label] = (path.stat().st_size, _ms(lambda: probe.load_events(data), 3),
+                          _ms(lambda: get_calendar_index(path).free_slots(
+                              60, now, now + timedelta(days=7), working_hours=[9, 18], max_slots=5), 20))
+    for i, label in enumerate(("events on disk", "file KiB", "index build ms", "free slots (7 days) ms")):
+        values = [len(recurring), len(materialized)] if i == 0 else [
+            layouts[k][i - 1] / (1024 if i == 1 else 1) for k in ("rrule", "materialized")]
+        print(f"{label:<34}" + "".join(f"{v:>16.1f}" if i else f"{v:>16}" for v in values))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--series", type=int, default=2000)
+    parser.add_argument("--cases", type=int, default=400, help="random RRULEs to check")
+    parser.add_argument("--check-only", action="store_true")
+    args = parser.parse_args(argv)
+
+    with sandbox(memory=None) as tmp:
+        failures = (check_expansion(tmp, random.Random(0), args.cases)
+                    + check_greedy(tmp, random.Random(1), args.cases * 5)
+                    + check_bulk(tmp))
+        if not args.check_only:
+            bench(tmp, args.events, args.series)
+    for f in failures:
+        print("FAIL", f)
+    print("checks: " + ("OK" if not failures else f"{len(failures)} failure(s)"))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Checkpointed runs (run_id): failure injection, resume and auto_schedule reuse checks, plus
+the per-run cost of checkpointing, with a stub LLM and temp memory / calendar / checkpoint files.
+
+    python -m benchmarks.bench_checkpoints --runs 20
+    python -m benchmarks.bench_checkpoints --check-only      # exit 1 if a check fails
+
+Checks (sync run, async stream): the reflector's LLM call fails once; retrying the same run id
+must call only the reflector again (no MCP call, no classifier / planner run, no planner LLM call,
+one pre-reflection memory entry). Re-running the finished run with auto_schedule flipped reruns
+the planner node without its LLM call and books the slot, flipping it back removes that booking,
+and neither records the pre-reflection entry again; the unchanged run returns its answer
+without running anything. An expired run is pruned while checkpoints keep being written
+(not only when the file is opened).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-stub")  # never used: the LLM is stubbed
+
+import focus_buddy_langgraph as fbl  # noqa: E402
+import graph_checkpoints  # noqa: E402
+import mcp_client  # noqa: E402
+import memory_manager  # noqa: E402
+from benchmarks.stubs import StubLLM, sandbox  # noqa: E402
+from langgraph.checkpoint.base import empty_checkpoint  # noqa: E402
+from metrics import registry  # noqa: E402
+
+_CHECKPOINTED = ("checkpointer", "checkpointed_graph", "async_checkpointed_graph")
+
+
+class _FlakyReflector:
+    """Wraps fbl.generate / agenerate: the reflector's LLM call raises while `failing` is set."""
+
+    def __init__(self):
+        self.failing = False
+        self.generate, self.agenerate = fbl.generate, fbl.agenerate
+
+    def _check(self, node):
+        if node == "reflection_agent" and self.failing:
+            raise TimeoutError("injected: reflector LLM timed out")
+
+    def sync(self, messages, node, stream=False):
+        self._check(node)
+        return self.generate(messages, node, stream)
+
+    async def async_(self, messages, node, stream=False):
+        self._check(node)
+        return await self.agenerate(messages, node, stream)
+
+
+def _counts():
+    snap = registry.snapshot()
+    return {name: row["count"] for name, row in snap.items() if name.startswith(("node.", "mcp."))}
+
+
+def _delta(before, after):
+    return {k: after.get(k, 0) - before.get(k, 0) for k in after if after.get(k, 0) != before.get(k, 0)}
+
+
+def _run(mode, goal, auto_schedule, run_id):
+    if mode == "run":
+        return fbl.run_focus_session_v4(goal, "1 hour", auto_schedule, run_id=run_id)
+
+    async def consume():
+        events = [e async for e in fbl.astream_focus_session_v4(goal, "1 hour", auto_schedule, run_id=run_id)]
+        return events[-1]["text"]
+
+    return asyncio.run(consume())
+
+
+def check(mode: str, flaky: _FlakyReflector, llm: StubLLM) -> list:
+    failures = []
+
+    def expect(ok, what):
+        if not ok:
+            failures.append(f"[{mode}] {what}")
+
+    goal, run_id = f"Write the quarterly report ({mode})", uuid.uuid4().hex
+    flaky.failing = True
+    try:
+        _run(mode, goal, False, run_id)
+        expect(False, "injected reflector failure did not surface")
+    except TimeoutError:
+        pass
+    flaky.failing = False
+
+    before, calls = _counts(), llm.calls
+    text = _run(mode, goal, False, run_id)
+    resumed = _delta(before, _counts())
+    expect(bool(text), "resume returned no plan")
+    expect(resumed == {"node.reflection_agent": 1}, f"resume ran {resumed}, expected only the reflector")
+    expect(llm.calls - calls == 1, f"resume made {llm.calls - calls} LLM calls, expected 1")
+    entries = [e for e in memory_manager.load_memory() if e["goal"] == goal]
+    expect(len(entries) == 2, f"{len(entries)} memory entries for the run, expected 2 (draft + reflection)")
+
+    before, calls = _counts(), llm.calls
+    again = _run(mode, goal, False, run_id)
+    expect(again == text and _delta(before, _counts()) == {} and llm.calls == calls,
+           "finished run with the same inputs ran again")
+
+    events_before = len(json.loads(mcp_client.CAL_PATH.read_text())["events"])
+    before, calls = _counts(), llm.calls
+    scheduled = _run(mode, goal, True, run_id)
+    rerun = _delta(before, _counts())
+    booked = len(json.loads(mcp_client.CAL_PATH.read_text())["events"]) - events_before
+    expect("context_agent" not in str(rerun) and "classifier" not in str(rerun),
+           f"auto_schedule change refetched context / reclassified: {rerun}")
+    expect(rerun.get("node.planner_agent") == 1 and rerun.get("mcp.calendar.add_event") == 1 and booked == 1,
+           f"auto_schedule change did not rerun the planner and book a slot: {rerun}")
+    expect(llm.calls - calls == 1, f"auto_schedule change made {llm.calls - calls} LLM calls (expected 1: reflector)")
+    expect("Scheduled focus block" in scheduled or rerun.get("node.reflection_agent") == 1, "no schedule in plan")
+
+    before = _counts()
+    _run(mode, goal, False, run_id)
+    rerun = _delta(before, _counts())
+    left = len(json.loads(mcp_client.CAL_PATH.read_text())["events"]) - events_before
+    expect(rerun.get("mcp.calendar.remove_events") == 1 and left == 0,
+           f"turning auto_schedule off again left {left} booked event(s): {rerun}")
+    drafts = [e for e in memory_manager.load_memory()
+              if e["goal"] == goal and e["reflection"] == "Initial plan (pre-reflection)"]
+    expect(len(drafts) == 1, f"{len(drafts)} pre-reflection memory entries after two redos, expected 1")
+    return failures
+
+
+def check_pruning(tmp: Path) -> list:
+    saver = graph_checkpoints.SqliteCheckpointer(tmp / "prune.sqlite3", ttl_seconds=60)
+    try:
+        def put(thread_id):
+            saver.put({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}, empty_checkpoint(), {}, {})
+
+        put("expired")
+        with saver._lock:
+            saver._conn.execute("UPDATE checkpoints SET created_at = 0")
+            saver._conn.commit()
+        for i in range(graph_checkpoints.PRUNE_EVERY):
+            put(f"live-{i}")
+        if saver.get_tuple({"configurable": {"thread_id": "expired"}}) is not None:
+            return [f"expired run still stored after {graph_checkpoints.PRUNE_EVERY} more checkpoints"]
+        return []
+    finally:
+        saver.close()
+
+
+def bench(runs: int) -> None:
+    print(f"\n{'run_focus_session_v4':<26}{'p50 ms':>9}{'p95 ms':>9}")
+    for label, checkpointed in (("plain", False), ("checkpointed (run_id)", True)):
+        timings = []
+        for i in range(runs):
+            t0 = time.perf_counter()
+            fbl.run_focus_session_v4(f"Plan chapter {i}", "1 hour", run_id=uuid.uuid4().hex if checkpointed else None)
+            timings.append((time.perf_counter() - t0) * 1000)
+        timings.sort()
+        print(f"{label:<26}{statistics.median(timings):>9.2f}{timings[int(0.95 * (len(timings) - 1))]:>9.2f}")
+    size = Path(fbl.CHECKPOINT_PATH).stat().st_size
+    print(f"checkpoint file: {size / 1024:.0f} KiB for {runs + 4} runs")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--check-only", action="store_true")
+    args = parser.parse_args(argv)
+
+    saved = fbl.__dict__.get("llm"), fbl.REFLECTION_MODE, fbl.CHECKPOINT_PATH, fbl.generate, fbl.agenerate
+    failures = []
+    with sandbox(calendar={"events": []}, tasks={"tasks": []}) as tmp:
+        fbl.CHECKPOINT_PATH = str(tmp / "checkpoints.sqlite3")
+        fbl.REFLECTION_MODE = "always"  # the reflector runs on every plan, so it can fail
+        fbl.llm = llm = StubLLM()
+        flaky = _FlakyReflector()
+        fbl.generate, fbl.agenerate = flaky.sync, flaky.async_
+        try:
+            for mode in ("run", "astream"):
+                failures += check(mode, flaky, llm)
+            failures += check_pruning(tmp)
+            if not args.check_only:
+                bench(args.runs)
+        finally:
+            llm_saved, fbl.REFLECTION_MODE, fbl.CHECKPOINT_PATH, fbl.generate, fbl.agenerate = saved
+            if llm_saved is None:
+                fbl.__dict__.pop("llm", None)
+            else:
+                fbl.llm = llm_saved
+            if "checkpointer" in fbl.__dict__:
+                fbl.get_checkpointer().close()
+            for name in _CHECKPOINTED:
+                fbl.__dict__.pop(name, None)
+                fbl._built.pop(name, None)
+    for f in failures:
+        print("FAIL", f)
+    print("checks: " + ("OK" if not failures else f"{len(failures)} failure(s)"))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
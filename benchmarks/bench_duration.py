@@ -0,0 +1,188 @@
+"""
+Duration parser: randomized property checks and a microbenchmark against the old
+character-filtering parser (kept below as _legacy_parse for comparison).
+
+    python -m benchmarks.bench_duration --cases 2000 --calls 100000
+    python -m benchmarks.bench_duration --check-only      # exit 1 on a failed property
+
+Properties (seeded random inputs): every formatting of h hours m minutes parses back
+to h*60+m; case, padding and filler words never change the result; spelled-out numbers
+equal digits; range midpoints lie inside the range; unparseable text yields confidence 0
+and the 60-minute default; nothing raises.
+
+These are seeded random checks, not Hypothesis tests (the repo has no test runner or dev
+dependencies): --seed reproduces a run, and a failing free-text input is shrunk by
+deleting characters while it still fails before it is reported.
+"""
+
+import argparse
+import random
+import string
+import sys
+import time
+
+from duration_parser import DEFAULT_MINUTES, parse_duration, _parse
+
+_ONES = ["", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten", "eleven",
+         "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen"]
+_TENS = ["", "", "twenty", "thirty", "forty", "fifty"]
+UI_STRINGS = ["1 hour", "2 hours", "90 minutes", "45 min", "1.5h", "30m", "1h30m", "half an hour", "2hrs", "1:30"]
+
+
+def _legacy_parse(text: str) -> int:
+    """parse_duration_to_minutes before duration_parser (returns 60 for anything it misreads)."""
+    t = (text or "").lower().strip()
+    try:
+        if any(k in t for k in ["hour", "hr", "h "]):
+            num_str = "".join(ch if (ch.isdigit() or ch in ". ") else " " for ch in t)
+            toks = [p for p in num_str.split() if p]
+            if toks:
+                return int(round(float(toks[0]) * 60))
+        if "min" in t or "m " in t or t.endswith("m"):
+            num_str = "".join(ch if (ch.isdigit() or ch in ". ") else " " for ch in t)
+            toks = [p for p in num_str.split() if p]
+            if toks:
+                return int(round(float(toks[0])))
+    except Exception:
+        pass
+    return 60
+
+
+def _words(n: int) -> str:
+    if n < 20:
+        return _ONES[n]
+    return _TENS[n // 10] + (f"-{_ONES[n % 10]}" if n % 10 else "")
+
+
+def _formats(h: int, m: int):
+    """(text, expected minutes) renderings of h hours m minutes."""
+    total = h * 60 + m
+    if h and m:
+        yield f"{h}h{m}m", total
+        yield f"{h}h {m}", total
+        yield f"{h} hr {m} min", total
+        yield f"{h} hours and {m} minutes", total
+        yield f"{h}:{m:02d}", total
+    if h and not m:
+        yield f"{h} hours", total
+        yield f"{h}hrs", total
+        yield f"{h}h", total
+        yield f"{_words(h)} hours", total
+    if not h and m:
+        yield f"{m} minutes", total
+        yield f"{m}min", total
+        yield f"{m}m", total
+        yield f"{_words(m)} minutes", total
+    if m == 30 and h:
+        yield f"{h} and a half hours", total
+        yield f"{h}.5 hours", total
+        yield f"{h}½ hours", total
+    if m == 30 and h == 1:
+        yield "an hour and a half", total
+    if m == 30 and not h:
+        yield "half an hour", total
+
+
+def _shrink(text: str, fails) -> str:
+    """Shortest text reachable by deleting chunks (halving down to single characters) that still fails."""
+    chunk = max(len(text) // 2, 1)
+    while True:
+        i = 0
+        while i < len(text):
+            candidate = text[:i] + text[i + chunk:]
+            if fails(candidate):
+                text = candidate
+            else:
+                i += chunk
+        if chunk == 1:
+            return text
+        chunk //= 2
+
+
+def _not_default(text: str) -> bool:
+    d = _parse(text)
+    return d.minutes != DEFAULT_MINUTES or d.confidence != 0.0
+
+
+def _invalid(text: str) -> bool:
+    try:
+        d = _parse(text)
+    except Exception:
+        return True
+    return not (isinstance(d.minutes, int) and d.minutes >= 1 and 0.0 <= d.confidence <= 1.0)
+
+
+def check_properties(cases: int, seed: int = 0) -> int:
+    rng = random.Random(seed)
+    failures = []
+
+    def expect(ok: bool, what: str) -> None:
+        if not ok and len(failures) < 20:
+            failures.append(what)
+
+    for _ in range(cases):
+        h, m = rng.randint(0, 5), rng.randint(0, 59)
+        if not h and not m:
+            continue
+        for text, minutes in _formats(h, m):
+            d = _parse(text)
+            expect(d.minutes == minutes and d.confidence >= 0.9, f"{text!r} -> {d}, expected {minutes}")
+            for variant in (text.upper(), f"  {text}  ", f"about {text}", f"{text} of focus", f"~{text}"):
+                v = _parse(variant)
+                expect(v.minutes == minutes, f"{variant!r} -> {v.minutes}, expected {minutes}")
+
+        lo, hi = sorted((rng.randint(5, 120), rng.randint(5, 120)))
+        d = _parse(f"{lo}-{hi} minutes")
+        expect(lo <= d.minutes <= hi and d.confidence < 1.0, f"range {lo}-{hi} -> {d}")
+
+        junk = "".join(rng.choice(string.ascii_lowercase.replace("h", "").replace("m", "").replace("s", ""))
+                       for _ in range(rng.randint(1, 12)))
+        if _not_default(junk):
+            small = _shrink(junk, _not_default)
+            expect(False, f"{junk!r} -> {_parse(junk)}, expected the default (shrunk: {small!r} -> {_parse(small)})")
+
+        noise = "".join(rng.choice(string.printable + "½¾–—") for _ in range(rng.randint(0, 20)))
+        if _invalid(noise):  # a bad result or any exception
+            expect(False, f"{noise!r} gives an invalid result or raises (shrunk: {_shrink(noise, _invalid)!r})")
+
+    for n in range(1, 60):
+        expect(_parse(f"{_words(n)} minutes").minutes == n, f"{_words(n)} minutes != {n}")
+
+    for f in failures:
+        print("FAIL", f)
+    print(f"properties: {cases} random cases, {len(failures)} failure(s)")
+    return len(failures)
+
+
+def bench(calls: int) -> None:
+    stream = [UI_STRINGS[i % len(UI_STRINGS)] for i in range(calls)]
+    wrong = sum(_legacy_parse(s) != _parse(s).minutes for s in UI_STRINGS)
+    print(f"\nlegacy parser disagrees on {wrong}/{len(UI_STRINGS)} common inputs:")
+    for s in UI_STRINGS:
+        if _legacy_parse(s) != _parse(s).minutes:
+            print(f"  {s!r:16} legacy {_legacy_parse(s):>4}   new {_parse(s).minutes:>4}")
+
+    print(f"\n{'parser':<22}{'µs/call':>10}")
+    for label, fn in (("legacy", _legacy_parse), ("new, uncached", _parse), ("new, LRU cached", parse_duration)):
+        parse_duration.cache_clear()
+        t0 = time.perf_counter()
+        for s in stream:
+            fn(s)
+        print(f"{label:<22}{(time.perf_counter() - t0) / calls * 1e6:>10.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", type=int, default=2000, help="random property cases")
+    parser.add_argument("--calls", type=int, default=100000, help="parses per parser in the microbenchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check-only", action="store_true")
+    args = parser.parse_args(argv)
+    failures = check_properties(args.cases, args.seed)
+    if not args.check_only:
+        bench(args.calls)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Linear vs fan-out graph: end-to-end latency of run_focus_session_v4 with a stub
+LLM and MCP servers of fixed latency.
+
+    python -m benchmarks.bench_graph_fanout --runs 5 --llm-latency 0.5 --mcp-latency 0.3
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-stub")  # never used: the LLM is stubbed
+
+import focus_buddy_langgraph as fbl  # noqa: E402
+from benchmarks.stubs import SlowServer, StubLLM, sandbox  # noqa: E402
+from mcp_client import SERVERS  # noqa: E402
+from mcp_transport import InProcessTransport  # noqa: E402
+
+
+def _time_runs(graph, runs: int, goal: str, duration: str):
+    fbl.graph = graph
+    timings = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fbl.run_focus_session_v4(goal, duration)
+        timings.append(time.perf_counter() - t0)
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per LLM call")
+    parser.add_argument("--mcp-latency", type=float, default=0.3, help="seconds per MCP tool call")
+    parser.add_argument("--goal", default="Finish my data analysis report")
+    parser.add_argument("--duration", default="2 hours")
+    args = parser.parse_args(argv)
+
+    original_graph, original_llm, original_transports = fbl.graph, fbl.llm, fbl.mcp._transports
+    with sandbox():
+        fbl.llm = StubLLM(latency=args.llm_latency)
+        fbl.mcp._transports = {
+            n: InProcessTransport(SlowServer(s, args.mcp_latency), fbl.mcp._executor) for n, s in SERVERS.items()
+        }
+        try:
+            results = {
+                "linear": _time_runs(fbl.build_graph(parallel=False).compile(), args.runs, args.goal, args.duration),
+                "fan-out": _time_runs(fbl.build_graph(parallel=True).compile(), args.runs, args.goal, args.duration),
+            }
+        finally:
+            fbl.graph, fbl.llm, fbl.mcp._transports = original_graph, original_llm, original_transports
+
+    print(f"{'graph':<10}{'mean s':>10}{'p50 s':>10}{'min s':>10}")
+    for name, t in results.items():
+        print(f"{name:<10}{statistics.mean(t):>10.3f}{statistics.median(t):>10.3f}{min(t):>10.3f}")
+    saved = statistics.mean(results["linear"]) - statistics.mean(results["fan-out"])
+    print(f"\nlatency saved per run_focus_session_v4 call: {saved:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
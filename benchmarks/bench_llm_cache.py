@@ -0,0 +1,91 @@
+"""
+LLM response cache: which planner prompts are served from the similarity tier.
+
+    python -m benchmarks.bench_llm_cache --goals 200
+    python -m benchmarks.bench_llm_cache --check-only      # exit 1 if a check fails
+
+Prompts are built by the real _planner_messages on an empty memory store and a fixed context.
+checks:  distinct short goals never hit each other (the fixed planner instruction is not part
+         of the similarity), near-identical wording does, a changed duration or context misses
+bench:   get() latency with a full cache (exact hits and similarity-tier misses)
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-stub")  # never used: nothing is sent
+
+import focus_buddy_langgraph as fbl  # noqa: E402
+from benchmarks.stubs import sandbox  # noqa: E402
+from llm_cache import ResponseCache  # noqa: E402
+
+CONTEXT = {"free_slots": [{"start": "2030-01-07T09:00", "end": "2030-01-07T10:00"}], "tasks": []}
+DISTINCT = [("Gym", "Tax"), ("Fix bug", "Fix car"), ("Study math", "Study French"),
+            ("Clean the kitchen", "Clean the garage"), ("Read chapter 3", "Read chapter 4")]
+SIMILAR = [("Write the report", "write the report!"), ("Study for exam", "Study for exams")]
+
+
+def _messages(goal, duration="1 hour", context=CONTEXT):
+    return fbl._planner_messages({"goal": goal, "duration": duration, "context": context})
+
+
+def check(threshold: float) -> list:
+    failures = []
+    for pairs, should_hit in ((DISTINCT, False), (SIMILAR, True)):
+        for cached, asked in pairs:
+            cache = ResponseCache(similarity_threshold=threshold)
+            cache.put(_messages(cached), f"plan for {cached}")
+            hit = cache.get(_messages(asked))
+            if (hit is not None) != should_hit:
+                failures.append(f"{asked!r} after {cached!r}: {'hit' if hit else 'miss'} "
+                                f"(expected {'hit' if should_hit else 'miss'})")
+    cache = ResponseCache(similarity_threshold=threshold)
+    cache.put(_messages("Write the report"), "plan")
+    if cache.get(_messages("Write the report", duration="2 hours")) is not None:
+        failures.append("a changed duration was served from the cache")
+    if cache.get(_messages("Write the report", context={**CONTEXT, "free_slots": []})) is not None:
+        failures.append("a changed context summary was served from the cache")
+    if cache.get(_messages("Write the report")) != "plan":
+        failures.append("an identical prompt missed")
+    return failures
+
+
+def bench(goals: int, threshold: float) -> None:
+    prompts = [_messages(f"Finish report section {i}") for i in range(goals)]
+    cache = ResponseCache(max_entries=goals, similarity_threshold=threshold)
+    for i, messages in enumerate(prompts):
+        cache.put(messages, i)
+    other = [_messages(f"Unrelated goal number {i}") for i in range(goals)]
+    print(f"{goals} cached planner prompts{'':<10}{'p50 µs':>10}")
+    for label, batch in (("get (exact hit)", prompts), ("get (similarity scan, miss)", other)):
+        timings = []
+        for messages in batch:
+            t0 = time.perf_counter()
+            cache.get(messages)
+            timings.append((time.perf_counter() - t0) * 1e6)
+        print(f"{label:<36}{statistics.median(timings):>10.0f}")
+    print(f"stats: {cache.stats()}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--goals", type=int, default=200)
+    parser.add_argument("--similarity", type=float, default=fbl.llm_cache.similarity_threshold or 0.9)
+    parser.add_argument("--check-only", action="store_true")
+    args = parser.parse_args(argv)
+
+    with sandbox():
+        failures = check(args.similarity)
+        if not args.check_only:
+            bench(args.goals, args.similarity)
+    for f in failures:
+        print("FAIL", f)
+    print("checks: " + ("OK" if not failures else f"{len(failures)} failure(s)"))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+MCP transports: the mock servers in-process vs as separate processes over stdio / a Unix socket.
+
+    python -m benchmarks.bench_mcp_transport --calls 2000 --threads 8
+    python -m benchmarks.bench_mcp_transport --check-only      # exit 1 if a check fails
+
+Servers run on a synthetic calendar / task list in a temp directory (socket servers are started
+as `python -m mcp_transport socket <server>`; stdio ones are spawned by the client).
+
+latency:     one call at a time (list_top_tasks: mostly transport cost; get_free_slots: real work)
+throughput:  `--threads` callers sharing the client's pool; pipelined (every call in flight on one
+             connection before the first reply); batched (JSON-RPC batches of 50)
+context:     the graph's context fetch (3 × get_free_slots + list_top_tasks) through MCPClient.gather
+checks:      same results on every transport, writes visible across processes, replies matched to
+             the right pipelined / batched request, JSON-RPC errors, a dead server fails fast, a sync
+             call to a server that never answers times out and stops counting as in flight
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import mcp_client
+from benchmarks.synthetic import make_calendar, make_tasks
+from data_repository import get_repository
+from mcp_client import MCPClient
+from mcp_transport import (INVALID_PARAMS, METHOD_NOT_FOUND, MCPError, RemoteTransport, SocketTransport,
+                           StdioTransport, _Connection)
+
+SERVERS = ("calendar", "tasks")
+CONTEXT_CALLS = {
+    **{f"free_slots:{d}": ("calendar", "get_free_slots", {"duration_minutes": d}) for d in (25, 50, 90)},
+    "tasks": ("tasks", "list_top_tasks", {"limit": 3}),
+}
+
+
+def _start_socket_servers(tmp: Path):
+    here = str(Path(mcp_client.__file__).resolve().parent)
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [here, os.environ.get("PYTHONPATH")]))}
+    procs = {
+        server: subprocess.Popen(
+            [sys.executable, "-m", "mcp_transport", "socket", server, "--path", str(tmp / f"{server}.sock")],
+            cwd=tmp, env=env,
+        )
+        for server in SERVERS
+    }
+    deadline = time.monotonic() + 15
+    while not all((tmp / f"{s}.sock").exists() for s in SERVERS):
+        if time.monotonic() > deadline or any(p.poll() is not None for p in procs.values()):
+            raise RuntimeError("socket servers did not start")
+        time.sleep(0.05)
+    return procs
+
+
+def _clients(tmp: Path, pool: int):
+    return {
+        "in-process": MCPClient({s: "inprocess" for s in SERVERS}),
+        "stdio": MCPClient({s: StdioTransport(s, pool, cwd=tmp) for s in SERVERS}),
+        "socket": MCPClient({s: SocketTransport(s, pool, path=tmp / f"{s}.sock") for s in SERVERS}),
+    }
+
+
+def _latency(client, server, tool, args, n):
+    client.call(server, tool, args)  # warm: connection / process, cached repository
+    timings = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        client.call(server, tool, args)
+        timings.append((time.perf_counter() - t0) * 1e6)
+    timings.sort()
+    return statistics.median(timings), timings[int(0.95 * (len(timings) - 1))]
+
+
+def _rate(fn, calls):
+    t0 = time.perf_counter()
+    fn()
+    return calls / (time.perf_counter() - t0)
+
+
+def bench(tmp: Path, calls: int, threads: int, pool: int) -> None:
+    clients = _clients(tmp, pool)
+    try:
+        print(f"{'latency (µs)':<34}" + "".join(f"{name + ' p50/p95':>22}" for name in clients))
+        for server, tool, args in (("tasks", "list_top_tasks", {"limit": 3}),
+                                   ("calendar", "get_free_slots", {"duration_minutes": 60})):
+            cells = [_latency(c, server, tool, args, min(calls, 1000)) for c in clients.values()]
+            print(f"{tool:<34}" + "".join(f"{f'{p50:.0f} / {p95:.0f}':>22}" for p50, p95 in cells))
+
+        args = {"limit": 3}
+        print(f"\n{'list_top_tasks throughput (calls/s)':<34}" + "".join(f"{name:>22}" for name in clients))
+
+        def threaded(client):
+            with ThreadPoolExecutor(max_workers=threads) as ex:
+                list(ex.map(lambda _: client.call("tasks", "list_top_tasks", args), range(calls)))
+
+        row = [_rate(lambda c=c: threaded(c), calls) for c in clients.values()]
+        print(f"{f'{threads} threads, pool {pool}':<34}" + "".join(f"{r:>22.0f}" for r in row))
+        for label, mode in (("pipelined, 1 connection", "pipelined"), ("batched (50 per request)", "batched")):
+            cells = ["-"]
+            for name in ("stdio", "socket"):
+                transport = (StdioTransport("tasks", 1, cwd=tmp) if name == "stdio"
+                             else SocketTransport("tasks", 1, path=tmp / "tasks.sock"))
+                transport.call("list_top_tasks", args)
+
+                def run(t=transport):
+                    if mode == "pipelined":
+                        futures = [t.submit("list_top_tasks", args) for _ in range(calls)]
+                    else:
+                        futures = [f for i in range(0, calls, 50)
+                                   for f in t.submit_batch([("list_top_tasks", args)] * min(50, calls - i))]
+                    for f in futures:
+                        f.result(30)
+
+                cells.append(f"{_rate(run, calls):.0f}")
+                transport.close()
+            print(f"{label:<34}" + "".join(f"{c:>22}" for c in cells))
+
+        print(f"\n{'context fetch via gather (ms)':<34}" + "".join(f"{name + ' p50':>22}" for name in clients))
+        cells = []
+        for client in clients.values():
+            client.gather(CONTEXT_CALLS, timeout=10)
+            timings = []
+            for _ in range(min(calls, 200)):
+                t0 = time.perf_counter()
+                client.gather(CONTEXT_CALLS, timeout=10)
+                timings.append((time.perf_counter() - t0) * 1000)
+            cells.append(statistics.median(timings))
+        print(f"{'3 × get_free_slots + list_top_tasks':<34}" + "".join(f"{c:>22.2f}" for c in cells))
+        for name, client in clients.items():
+            if client.transport_stats():
+                print(f"{name} pools: {client.transport_stats()}")
+    finally:
+        for client in clients.values():
+            client.close()
+
+
+class _SilentTransport(RemoteTransport):
+    """Connections to a peer that reads every request and never replies (a hung server)."""
+
+    kind = "silent"
+
+    def __init__(self, server: str):
+        super().__init__(server, pool_size=1)
+        self.peers = []
+
+    def _connect(self) -> _Connection:
+        ours, peer = socket.socketpair()
+        self.peers.append(peer)
+        return _Connection(ours.makefile("rb"), ours.makefile("wb"), ours.close)
+
+
+def check_hung(timeout: float = 0.2) -> list:
+    transport = _SilentTransport("calendar")
+    try:
+        t0 = time.perf_counter()
+        try:
+            transport.call("get_free_slots", {"duration_minutes": 25}, timeout=timeout)
+            return ["hung server: call returned"]
+        except TimeoutError:
+            elapsed = time.perf_counter() - t0
+        in_flight = transport.stats()["in_flight"]
+        if elapsed > timeout + 1 or in_flight:
+            return [f"hung server: call gave up after {elapsed:.1f}s with {in_flight} call(s) still in flight"]
+        return []
+    finally:
+        transport.close()
+        for peer in transport.peers:
+            peer.close()
+
+
+def check(tmp: Path, pool: int, procs) -> list:
+    failures = []
+
+    def expect(ok, what):
+        if not ok:
+            failures.append(what)
+
+    clients = _clients(tmp, pool)
+    try:
+        for server, tool, args in (("calendar", "get_free_slots", {"duration_minutes": 45, "horizon_hours": 72}),
+                                   ("tasks", "list_top_tasks", {"limit": 5})):
+            results = {name: c.call(server, tool, args) for name, c in clients.items()}
+            expect(len({json.dumps(r, sort_keys=True) for r in results.values()}) == 1,
+                   f"{tool} differs between transports: {results}")
+
+        event = {"title": "Via socket", "start_iso": "2031-05-05T09:00", "end_iso": "2031-05-05T10:00"}
+        added = clients["socket"].call("calendar", "add_event", event)["added"]
+        repo = get_repository(mcp_client.CAL_PATH, "calendar")
+        expect(any(e.get("id") == added["id"] for e in repo.snapshot()[0]["events"]),
+               "in-process: event added over the socket not seen")
+        removed = clients["stdio"].call("calendar", "remove_events", {"ids": [added["id"]]})["removed"]
+        expect(removed == 1 and not any(e.get("id") == added["id"] for e in repo.snapshot()[0]["events"]),
+               f"stdio: event added over the socket not removed for everyone ({removed} removed)")
+
+        for name in ("stdio", "socket"):
+            transport = clients[name]._transports["tasks"]
+            futures = [transport.submit("list_top_tasks", {"limit": i % 7}) for i in range(300)]
+            expect([len(f.result(30)) for f in futures] == [i % 7 for i in range(300)],
+                   f"{name}: pipelined replies matched to the wrong requests")
+            batch = transport.submit_batch([("list_top_tasks", {"limit": i % 7}) for i in range(50)])
+            expect([len(f.result(30)) for f in batch] == [i % 7 for i in range(50)],
+                   f"{name}: batched replies out of order")
+            try:
+                clients[name].call("tasks", "no_such_tool")
+                expect(False, f"{name}: unknown tool did not raise")
+            except MCPError as exc:
+                expect(exc.code == METHOD_NOT_FOUND, f"{name}: unknown tool gave code {exc.code}")
+            try:
+                clients[name].call("tasks", "list_top_tasks", {"bogus": 1})
+                expect(False, f"{name}: bad arguments did not raise")
+            except MCPError as exc:
+                expect(exc.code == INVALID_PARAMS, f"{name}: bad arguments gave code {exc.code}")
+
+        procs["calendar"].terminate()
+        procs["calendar"].wait(10)
+        t0 = time.perf_counter()
+        results, errors = clients["socket"].gather(CONTEXT_CALLS, timeout=5, defaults={"tasks": []})
+        expect(time.perf_counter() - t0 < 4 and len(errors) == 3 and results["tasks"],
+               f"dead calendar server: errors {errors} after {time.perf_counter() - t0:.1f}s")
+    finally:
+        for client in clients.values():
+            client.close()
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--pool", type=int, default=4, help="connections (stdio: processes) per server")
+    parser.add_argument("--check-only", action="store_true")
+    args = parser.parse_args(argv)
+
+    saved = mcp_client.CAL_PATH, mcp_client.TASK_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        mcp_client.CAL_PATH, mcp_client.TASK_PATH = tmp / "calendar_data.json", tmp / "tasks_data.json"
+        mcp_client.CAL_PATH.write_text(json.dumps(make_calendar(2000, seed=1)), encoding="utf-8")
+        mcp_client.TASK_PATH.write_text(json.dumps(make_tasks(2000, seed=1)), encoding="utf-8")
+        procs = _start_socket_servers(tmp)
+        try:
+            if not args.check_only:
+                bench(tmp, args.calls, args.threads, args.pool)
+            failures = check(tmp, args.pool, procs)  # last: stops the calendar server
+            failures += check_hung()
+        finally:
+            for proc in procs.values():
+                proc.terminate()
+                proc.wait(10)
+            mcp_client.CAL_PATH, mcp_client.TASK_PATH = saved
+    for f in failures:
+        print("FAIL", f)
+    print("checks: " + ("OK" if not failures else f"{len(failures)} failure(s)"))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+RAG retrieval cache: latency and web-search calls of focus_buddy_rag.run_agentic_rag
+with and without the retrieval cache, on a stub search (--search-latency) and stub LLM.
+
+    python -m benchmarks.bench_rag --requests 200 --search-latency 0.5 --ttl 3600
+
+The workload draws goals from benchmarks.synthetic.GOALS and rewrites some of them
+the way users do (case, punctuation, an extra word), so requests hit the exact tier,
+the snippet index, or miss. "uncached" clears the cache before every request, so each
+one calls the search like before the cache existed.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-stub")  # never used: the LLM is stubbed
+
+import focus_buddy_rag as rag  # noqa: E402
+from benchmarks.stubs import StubLLM, StubSearch  # noqa: E402
+from benchmarks.synthetic import GOALS  # noqa: E402
+from retrieval_cache import RetrievalCache  # noqa: E402
+
+
+class _CountingSearch(StubSearch):
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def run(self, query: str) -> str:
+        self.calls += 1
+        return super().run(query)
+
+
+def _variant(goal: str, rng: random.Random) -> str:
+    return rng.choice([
+        goal,
+        goal.lower(),
+        goal + ".",
+        f"  {goal.upper()}!  ",
+        goal + " today",
+        "Please " + goal.lower(),
+    ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--search-latency", type=float, default=0.5)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--ttl", type=float, default=3600)
+    parser.add_argument("--similarity", type=float, default=0.75)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    tasks = [_variant(rng.choice(GOALS), rng) for _ in range(args.requests)]
+    saved = dict(rag._tools)
+    rag._tools["llm"] = StubLLM(latency=args.llm_latency)
+    print(f"{'mode':<12}{'mean ms':>9}{'p95 ms':>9}{'searches':>10}{'exact':>7}{'index':>7}")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for mode in ("uncached", "cached"):
+                search = rag._tools["search"] = _CountingSearch(args.search_latency)
+                threshold = args.similarity if mode == "cached" else None
+                cache = rag._tools["cache"] = RetrievalCache(
+                    Path(tmp) / f"{mode}.sqlite3", ttl_seconds=args.ttl, similarity_threshold=threshold
+                )
+                timings = []
+                for task in tasks:
+                    if mode == "uncached":
+                        cache.clear()
+                    t0 = time.perf_counter()
+                    out = rag.run_agentic_rag(task, "1 hour")
+                    timings.append((time.perf_counter() - t0) * 1000)
+                    assert not out.startswith("Error:"), out
+                stats = cache.stats()
+                p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+                print(f"{mode:<12}{statistics.mean(timings):>9.1f}{p95:>9.1f}{search.calls:>10}"
+                      f"{stats['hits_exact']:>7}{stats['hits_index']:>7}")
+                cache.close()
+            print("\n" + json.dumps(stats))
+    finally:
+        rag._tools.clear()
+        rag._tools.update(saved)
+
+
+if __name__ == "__main__":
+    main()
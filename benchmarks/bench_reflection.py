@@ -0,0 +1,81 @@
+"""
+Reflection modes: latency of run_focus_session_v4 and how often the reflector runs
+under REFLECTION_MODE = always / adaptive / merged, with a stub LLM whose plans pass
+the local checks for a share (--good-ratio) of the sessions.
+
+    python -m benchmarks.bench_reflection --runs 20 --llm-latency 0.3 --good-ratio 0.7
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-stub")  # never used: the LLM is stubbed
+
+import focus_buddy_langgraph as fbl  # noqa: E402
+import plan_checks  # noqa: E402
+from benchmarks.stubs import StubLLM, sandbox  # noqa: E402
+
+
+class _AlternatingLLM(StubLLM):
+    """Planner drafts: a checks-passing plan for the first `good` of every 10, a vague one otherwise."""
+
+    def __init__(self, latency: float, good_plan: str, good_ratio: float):
+        super().__init__(latency=latency, reply=good_plan)
+        self.good_plan, self.good = good_plan, round(good_ratio * 10)
+        self.n = 0
+
+    def _next(self) -> str:
+        self.n += 1
+        return self.good_plan if (self.n - 1) % 10 < self.good else "Work on it until it is done. You can do this!"
+
+    def invoke(self, messages, **kwargs):
+        is_reflector = any("You are the Reflector" in str(m.get("content", "")) for m in messages)
+        self.reply = self.good_plan if is_reflector else self._next()  # only planner drafts alternate
+        return super().invoke(messages, **kwargs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--good-ratio", type=float, default=0.7, help="share of plans that pass the checks")
+    args = parser.parse_args(argv)
+
+    saved = fbl.__dict__.get("llm"), fbl.REFLECTION_MODE
+    with sandbox(calendar={"events": []}):
+        start = datetime.now().replace(second=0, microsecond=0)
+        good_plan = (
+            f"1. {start:%H:%M}-{start + timedelta(minutes=50):%H:%M} Deep work\n"
+            f"2. {start + timedelta(minutes=50):%H:%M}-{start + timedelta(minutes=60):%H:%M} Break"
+        )
+        print(f"{'mode':<10}{'mean s':>9}{'p50 s':>9}{'reflected':>11}{'skipped':>9}")
+        try:
+            for mode in ("always", "adaptive", "merged"):
+                fbl.REFLECTION_MODE = mode
+                fbl.llm = _AlternatingLLM(args.llm_latency, good_plan, args.good_ratio)
+                before = plan_checks.get_reflection_stats()
+                timings = []
+                for i in range(args.runs):
+                    t0 = time.perf_counter()
+                    fbl.run_focus_session_v4(f"Finish my report part {i}", "1 hour")
+                    timings.append(time.perf_counter() - t0)
+                after = plan_checks.get_reflection_stats()
+                reflected = after["reflected"] - before["reflected"]
+                skipped = after["skipped"] + after["merged"] - before["skipped"] - before["merged"]
+                print(f"{mode:<10}{statistics.mean(timings):>9.3f}{statistics.median(timings):>9.3f}"
+                      f"{reflected:>11}{skipped:>9}")
+        finally:
+            llm, fbl.REFLECTION_MODE = saved
+            if llm is None:
+                fbl.__dict__.pop("llm", None)
+            else:
+                fbl.llm = llm
+    print("\n" + json.dumps(plan_checks.get_reflection_stats()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Cold-start cost: wall time of importing each entry point in a fresh interpreter, which
+heavy packages that import pulled in, and whether it tried to open a socket.
+
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --modules focus_buddy_langgraph,app
+
+The child process blocks socket connections, so any network access on import shows
+up as an error. "first use" times building the compiled graph (langgraph import +
+compile), which is now paid on the first request instead of at import.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_MODULES = "focus_buddy_langgraph,focus_buddy,focus_buddy_rag,mcp_client,memory_manager,app"
+HEAVY = ("langgraph", "langchain_openai", "langchain_community", "openai", "gradio")
+
+_CHILD = r"""
+import json, os, socket, sys, time
+def _no_network(*args, **kwargs):
+    raise RuntimeError("network access during import")
+socket.socket.connect = socket.socket.connect_ex = _no_network
+socket.create_connection = _no_network
+t0 = time.perf_counter()
+error = None
+try:
+    {stmt}
+except BaseException as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+elapsed = time.perf_counter() - t0
+heavy = sorted(m for m in {heavy!r} if m in sys.modules)
+print(json.dumps({{"seconds": elapsed, "heavy": heavy, "error": error}}))
+"""
+
+
+def time_child(stmt: str) -> dict:
+    env = dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "sk-benchmark-stub"))
+    env["PYTHONWARNINGS"] = "ignore"
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD.format(stmt=stmt, heavy=HEAVY)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--modules", default=DEFAULT_MODULES)
+    args = parser.parse_args(argv)
+
+    cases = [(m, f"import {m}") for m in args.modules.split(",") if m]
+    cases.append(("first use: get_graph()", "import focus_buddy_langgraph as m; m.get_graph()"))
+
+    print(f"{'import':<26}{'p50 s':>8}{'min s':>8}  heavy modules loaded / error")
+    for label, stmt in cases:
+        runs = [time_child(stmt) for _ in range(args.runs)]
+        secs = [r["seconds"] for r in runs]
+        note = runs[-1]["error"] or ", ".join(runs[-1]["heavy"]) or "-"
+        print(f"{label:<26}{statistics.median(secs):>8.3f}{min(secs):>8.3f}  {note}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Offline benchmark suite: no OpenAI credits, no network. Every LLM / search client is a
+deterministic stub (benchmarks.stubs.offline_llms) and the calendar, tasks and memory
+are synthetic (benchmarks.synthetic) at each requested scale.
+
+    python -m benchmarks.bench_suite                                # 10^3 and 10^4
+    python -m benchmarks.bench_suite --scales 1000,100000,1000000 --runs 10
+    python -m benchmarks.bench_suite --json before.json             # save results
+    python -m benchmarks.bench_suite --baseline before.json         # exit 1 on regressions
+
+Reports ops/s and p50/p95/max latency for run_focus_session_v4, get_free_slots,
+list_top_tasks and the memory_manager functions ("cold" = first call after the data
+changed, i.e. index/aggregate rebuilds included).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-stub")  # never used: the LLM is stubbed
+
+import focus_buddy_langgraph as fbl  # noqa: E402
+import mcp_client  # noqa: E402
+import memory_manager  # noqa: E402
+from benchmarks.stubs import offline_llms, sandbox  # noqa: E402
+from benchmarks.synthetic import make_calendar, make_memory, make_tasks  # noqa: E402
+from memory_store import JsonlStore  # noqa: E402
+
+NOISE_FLOOR_MS = 0.05  # p50 changes below this are never reported as regressions
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    timings = []
+    t_start = time.perf_counter()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    total = time.perf_counter() - t_start
+    timings.sort()
+    return {
+        "n": repeat,
+        "ops_s": round(repeat / total, 1) if total else float("inf"),
+        "p50_ms": round(statistics.median(timings) * 1000, 3),
+        "p95_ms": round(timings[min(int(0.95 * len(timings)), len(timings) - 1)] * 1000, 3),
+        "max_ms": round(timings[-1] * 1000, 3),
+    }
+
+
+def _focus_by_goal_from_dicts(entries, days):
+    """The pre-columns way: loop over the parsed memory entries."""
+    since = (datetime.now() - timedelta(days=days)).isoformat()
+    groups = defaultdict(list)
+    for e in entries:
+        if e.get("actual_focus_minutes") and e.get("timestamp", "") >= since:
+            groups[e.get("goal")].append(float(e["actual_focus_minutes"]))
+    return {g: statistics.mean(v) for g, v in groups.items()}
+
+
+def bench_scale(scale: int, tmp: Path, args) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    cal_path, task_path = tmp / f"calendar_{scale}.json", tmp / f"tasks_{scale}.json"
+    cal_path.write_text(json.dumps(make_calendar(scale, seed=scale)), encoding="utf-8")
+    task_path.write_text(json.dumps(make_tasks(scale, seed=scale)), encoding="utf-8")
+    store = JsonlStore(tmp / f"memory_{scale}.jsonl")
+    store.extend(make_memory(scale, seed=scale))
+    memory_manager.set_store(store)
+    mcp_client.CAL_PATH, mcp_client.TASK_PATH = cal_path, task_path
+
+    cal, tasks = mcp_client.CalendarServerMock, mcp_client.TaskServerMock
+    results["get_free_slots (cold)"] = measure(lambda: cal.get_free_slots(60), 1)
+    results["get_free_slots"] = measure(lambda: cal.get_free_slots(60, horizon_hours=48), args.repeat)
+    results["list_top_tasks (cold)"] = measure(lambda: tasks.list_top_tasks(3), 1)
+    results["list_top_tasks"] = measure(lambda: tasks.list_top_tasks(3), args.repeat)
+
+    results["get_focus_stats (cold)"] = measure(lambda: memory_manager.get_focus_stats(), 1)
+    results["get_focus_stats"] = measure(
+        lambda: memory_manager.get_focus_stats("Finish my data analysis report"), args.repeat
+    )
+    results["get_focus_profile (cold)"] = measure(lambda: memory_manager.get_focus_profile(), 1)
+    results["get_focus_profile"] = measure(
+        lambda: memory_manager.get_focus_profile("Finish my data analysis report"), args.repeat
+    )
+    results["goal focus 90d (columns)"] = measure(
+        lambda: memory_manager.get_analytics().group_by_goal(days=90), args.repeat
+    )
+    results["goal focus 90d (dicts)"] = measure(
+        lambda: _focus_by_goal_from_dicts(memory_manager.load_memory(), 90), args.load_repeat
+    )
+    results["compute_average_focus_time"] = measure(memory_manager.compute_average_focus_time, args.repeat)
+    results["get_recent_sessions"] = measure(lambda: memory_manager.get_recent_sessions(3), args.repeat)
+    results["get_recent_digests"] = measure(lambda: memory_manager.get_recent_digests(3), args.repeat)
+    results["record_session"] = measure(
+        lambda: memory_manager.record_session("Benchmark goal", "1 hour", "bench", 45, 2, 1, "focus"),
+        max(args.repeat // 10, 1),
+    )
+    results["load_memory"] = measure(memory_manager.load_memory, args.load_repeat)
+
+    results["run_focus_session_v4"] = measure(
+        lambda: fbl.run_focus_session_v4("Finish my data analysis report", "2 hours"), args.runs
+    )
+    return results
+
+
+def bench_entry_points(tmp: Path, args) -> Dict[str, Dict[str, float]]:
+    """The v1 (focus_buddy.py) and v2 (focus_buddy_rag.py) entry points, stubbed the same way."""
+    results = {}
+    import focus_buddy
+
+    results["focus_buddy_agent"] = measure(
+        lambda: focus_buddy.focus_buddy_agent("Write a 2-page analysis report", "2 hours"), args.runs
+    )
+    try:
+        import focus_buddy_rag
+    except ImportError as e:
+        print(f"skipping focus_buddy_rag: {e}", file=sys.stderr)
+    else:
+        saved_path = focus_buddy_rag.RAG_CACHE_PATH
+        focus_buddy_rag.RAG_CACHE_PATH = tmp / "retrieval.sqlite3"  # keep the retrieval cache out of the cwd
+        try:
+            results["run_agentic_rag"] = measure(
+                lambda: focus_buddy_rag.run_agentic_rag("Write a 3-page research report", "2 hours"), args.runs
+            )
+        finally:
+            cache = focus_buddy_rag._tools.pop("cache", None)
+            if cache is not None:
+                cache.close()
+            focus_buddy_rag.RAG_CACHE_PATH = saved_path
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Dict[str, float]]], baseline_path: str, tolerance: float) -> int:
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+    regressions = 0
+    for scale, ops in results.items():
+        for op, cur in ops.items():
+            old = baseline.get(scale, {}).get(op)
+            if not old:
+                continue
+            if cur["p50_ms"] > old["p50_ms"] * (1 + tolerance) and cur["p50_ms"] - old["p50_ms"] > NOISE_FLOOR_MS:
+                regressions += 1
+                print(f"REGRESSION {scale:>8} {op}: p50 {old['p50_ms']} → {cur['p50_ms']} ms")
+    print(f"\n{regressions} regression(s) against {baseline_path} (tolerance {tolerance:.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default="1000,10000", help="comma-separated sizes (events = tasks = sessions)")
+    parser.add_argument("--repeat", type=int, default=200, help="calls per cheap operation")
+    parser.add_argument("--load-repeat", type=int, default=3, help="calls of load_memory (full scan)")
+    parser.add_argument("--runs", type=int, default=20, help="run_focus_session_v4 / entry-point calls")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per stubbed LLM call")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare p50s with a previous --json file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown vs baseline")
+    args = parser.parse_args(argv)
+    scales = [int(float(s)) for s in args.scales.split(",") if s.strip()]
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    with sandbox(memory=None) as tmp, offline_llms(latency=args.llm_latency):
+        for scale in scales:
+            results[str(scale)] = bench_scale(scale, tmp, args)
+        results["entry_points"] = bench_entry_points(tmp, args)
+
+    print(f"{'scale':>12}  {'operation':<30}{'n':>6}{'ops/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for scale, ops in results.items():
+        for op, r in ops.items():
+            print(f"{scale:>12}  {op:<30}{r['n']:>6}{r['ops_s']:>12}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['max_ms']:>10}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.baseline and compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
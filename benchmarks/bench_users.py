@@ -0,0 +1,102 @@
+"""
+Per-user stores vs one shared store: cost of loading / recording one user's sessions
+when `--users` users with `--sessions` sessions each share a deployment.
+
+    python -m benchmarks.bench_users --users 200 --sessions 200 --open 64
+
+shared:  every session in one memory log (the single-user layout, user_id=None)
+sharded: one log per user under a temp FOCUS_USER_DATA_DIR, at most `--open` stores
+         open at a time ("cold" = first touch of a user that is not in the LRU)
+"""
+
+import argparse
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import memory_manager
+import user_stores
+from benchmarks.stubs import sandbox
+from benchmarks.synthetic import make_memory
+from memory_store import JsonlStore, open_store
+
+
+def _ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=200, help="sessions per user")
+    parser.add_argument("--open", type=int, default=64, help="LRU capacity of open user stores")
+    parser.add_argument("--writes", type=int, default=400, help="record_session calls in the write test")
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    users = [f"user{i}" for i in range(args.users)]
+    rng = random.Random(0)
+    saved_dir, saved_users = user_stores.USER_DATA_DIR, memory_manager._users
+    with sandbox(memory=None) as tmp:
+        user_stores.USER_DATA_DIR = tmp / "users"
+        memory_manager._users = user_stores.LRUHandles(
+            memory_manager._open_user, args.open, closer=memory_manager.UserMemory.close
+        )
+        try:
+            shared = JsonlStore(tmp / "shared.jsonl")
+            for i, user in enumerate(users):
+                entries = make_memory(args.sessions, seed=i)
+                shared.extend(entries)
+                store = open_store(memory_manager.MEMORY_BACKEND, user_stores.user_path(user, memory_manager.MEMORY_FILE))
+                store.extend(entries)
+                store.close()
+            memory_manager.set_store(shared)
+            print(f"{args.users} users × {args.sessions} sessions, {args.open} open stores\n")
+            print(f"{'operation':<34}{'shared ms':>11}{'sharded ms':>12}")
+
+            def row(label, shared_fn, sharded_fn, repeat):
+                print(f"{label:<34}{_ms(shared_fn, repeat):>11.3f}{_ms(sharded_fn, repeat):>12.3f}")
+
+            row("load_memory (one user)", memory_manager.load_memory,
+                lambda: memory_manager.load_memory(user_id=users[0]), 3)
+            # the first call per user rebuilds its aggregates / columns once, like a cold start
+            cold = iter(users)
+            row("get_focus_stats (cold)", lambda: memory_manager.get_focus_stats(),
+                lambda: memory_manager.get_focus_stats(user_id=next(cold)), 1)
+            row("get_focus_stats (hot)", lambda: memory_manager.get_focus_stats(),
+                lambda: memory_manager.get_focus_stats(user_id=users[0]), 200)
+            row("get_focus_profile (hot)", lambda: memory_manager.get_focus_profile(),
+                lambda: memory_manager.get_focus_profile(user_id=users[0]), 50)
+            row("get_recent_sessions", lambda: memory_manager.get_recent_sessions(3),
+                lambda: memory_manager.get_recent_sessions(3, user_id=rng.choice(users)), 200)
+
+            def writes(user_id_of):
+                t0 = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=args.threads) as pool:
+                    list(pool.map(
+                        lambda i: memory_manager.record_session(
+                            "Bench goal", "1 hour", "bench", 45, 2, 1, "focus", user_id=user_id_of(i)
+                        ),
+                        range(args.writes),
+                    ))
+                return (time.perf_counter() - t0) * 1000 / args.writes
+
+            hot = users[:args.open]
+            print(f"{'record_session (threads, hot)':<34}{writes(lambda i: None):>11.3f}"
+                  f"{writes(lambda i: hot[i % len(hot)]):>12.3f}")
+            # round-robin over every user: each call opens an evicted store again
+            print(f"{'record_session (threads, churn)':<34}{'':>11}{writes(lambda i: users[i % len(users)]):>12.3f}")
+            print(f"\nuser store LRU: {memory_manager.get_user_store_stats()}")
+        finally:
+            memory_manager.close_user_stores()
+            user_stores.USER_DATA_DIR, memory_manager._users = saved_dir, saved_users
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Write-behind memory queue: caller latency, crash recovery and backpressure.
+
+    python -m benchmarks.bench_write_behind --writes 500
+    python -m benchmarks.bench_write_behind --check-only      # exit 1 if a crash loses or duplicates entries
+
+latency:      record_session as the graph nodes see it (returns once queued) vs waiting for the
+              commit after each call (flush_memory(), i.e. the old synchronous write)
+crash:        a child process queues --writes sessions and dies with os._exit before they are
+              committed; the next process must replay its journal so every session lands once
+backpressure: a deliberately slow commit behind a small queue; submitters block and are counted
+readers:      get_focus_profile / group_by_goal in several threads while the writer thread commits
+              batches, which must never fail and end up seeing every committed row
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import memory_manager
+from benchmarks.stubs import sandbox
+from memory_store import JsonlStore
+from write_queue import WriteBehindQueue
+
+
+def _percentiles(samples):
+    vals = sorted(samples)
+    return statistics.median(vals), vals[int(0.95 * (len(vals) - 1))]
+
+
+def bench_latency(tmp: Path, writes: int) -> None:
+    memory_manager.set_store(JsonlStore(tmp / "latency.jsonl"))
+    rows = {}
+    for label, wait in (("write-behind (returns when queued)", False), ("synchronous (waits for commit)", True)):
+        samples = []
+        for i in range(writes):
+            t0 = time.perf_counter()
+            memory_manager.record_session(f"Latency {i}", "1 hour", "bench", 45, 2, 1, "focus")
+            if wait:
+                memory_manager.flush_memory()
+            samples.append((time.perf_counter() - t0) * 1000)
+        memory_manager.flush_memory()
+        rows[label] = _percentiles(samples)
+    print(f"{'record_session':<38}{'p50 ms':>9}{'p95 ms':>9}")
+    for label, (p50, p95) in rows.items():
+        print(f"{label:<38}{p50:>9.3f}{p95:>9.3f}")
+    print(f"queue: {memory_manager.get_write_queue_stats()}")
+    memory_manager.set_store(None)
+
+
+def _crash_child(path: str, writes: int) -> None:
+    import memory_manager
+    from memory_store import JsonlStore
+
+    memory_manager.set_store(JsonlStore(Path(path)))
+    for i in range(writes):
+        memory_manager.record_session(f"Crash {i}", "1 hour", "bench", 45, 2, 1, "focus")
+    os._exit(0)  # no flush, no atexit: whatever is still queued only exists in the journal
+
+
+def check_crash(tmp: Path, writes: int) -> bool:
+    path = tmp / "crash.jsonl"
+    child = mp.get_context("spawn").Process(target=_crash_child, args=(str(path), writes))
+    child.start()
+    child.join()
+    committed = JsonlStore(path).count()
+
+    memory_manager.set_store(JsonlStore(path))  # the next process: starts the writer, replays the journal
+    memory_manager.flush_memory()
+    goals = Counter(e["goal"] for e in memory_manager.load_memory())
+    stats = memory_manager.get_write_queue_stats()
+    memory_manager.set_store(None)
+
+    lost = [i for i in range(writes) if goals[f"Crash {i}"] == 0]
+    duplicated = [g for g, n in goals.items() if n > 1]
+    leftover = list(path.with_suffix(".journal").glob("*.journal"))
+    print(f"\ncrash: {committed}/{writes} committed before os._exit, {stats['recovered']} replayed from the journal; "
+          f"lost {len(lost)}, duplicated {len(duplicated)}, journals left {len(leftover)}")
+    return not lost and not duplicated and not leftover
+
+
+def check_readers(tmp: Path, writes: int, threads: int) -> bool:
+    memory_manager.set_store(JsonlStore(tmp / "readers.jsonl"))
+    memory_manager.get_focus_profile()  # publish the (empty) columns the writer then extends
+    stop, errors, reads = threading.Event(), Counter(), [0] * threads
+
+    def read(slot: int) -> None:
+        while not stop.is_set():
+            try:
+                memory_manager.get_focus_profile(f"Reader {slot % 3}")
+                memory_manager.get_analytics().group_by_goal(days=90)
+            except Exception as e:
+                errors[f"{type(e).__name__}: {e}"] += 1
+            reads[slot] += 1
+
+    pool = [threading.Thread(target=read, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for i in range(writes):
+        memory_manager.record_session(f"Reader {i % 3}", "1 hour", "bench", 30 + i % 40, 1 + i % 5, i % 3, "focus")
+        if i % 4 == 3:
+            memory_manager.flush_memory()  # many small commits: each one extends the columns readers are using
+    memory_manager.flush_memory()
+    stop.set()
+    for t in pool:
+        t.join()
+    sessions = memory_manager.get_focus_profile()["sessions"]
+    memory_manager.set_store(None)
+    print(f"\nreaders: {sum(reads)} profile reads in {threads} threads during {writes} writes; "
+          f"{sum(errors.values())} failed, {sessions}/{writes} sessions seen afterwards")
+    for message, n in errors.most_common(3):
+        print(f"  {n} × {message}")
+    return not errors and sessions == writes
+
+
+def bench_backpressure(writes: int, threads: int) -> None:
+    def slow_commit(items):
+        time.sleep(0.005)  # ~200 batches/s, whatever the batch size
+
+    q = WriteBehindQueue(slow_commit, max_pending=32, max_batch=8, name="bench-backpressure")
+    t0 = time.perf_counter()
+    pool = [
+        threading.Thread(target=lambda: [q.submit({"i": i}) for i in range(writes // threads)])
+        for _ in range(threads)
+    ]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    q.close()
+    print(f"\nbackpressure ({threads} threads, queue 32, batch 8, 5 ms commits) in {time.perf_counter() - t0:.2f}s:")
+    print(f"  {q.stats()}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writes", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--check-only", action="store_true")
+    args = parser.parse_args(argv)
+    with sandbox(memory=None) as tmp:
+        if not args.check_only:
+            bench_latency(tmp, args.writes)
+        ok = check_crash(tmp, args.writes)
+        readers_ok = check_readers(tmp, args.writes, args.threads)
+        if not args.check_only:
+            bench_backpressure(args.writes, args.threads)
+    if not ok:
+        print("FAIL: crash recovery lost or duplicated entries")
+    if not readers_ok:
+        print("FAIL: analytics reads failed or missed rows while the writer committed")
+    if ok and readers_ok:
+        print("OK")
+    sys.exit(0 if ok and readers_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
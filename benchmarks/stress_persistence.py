@@ -0,0 +1,129 @@
+"""
+Stress check for concurrent persistence: several processes, each with several
+threads, hammer record_session, add_event and complete_task in a temp directory.
+Exits non-zero if any record is lost, or if a JSONL log with a torn last line (a crash
+mid-append) does not reopen with count() equal to the entries it holds.
+
+    python -m benchmarks.stress_persistence --processes 4 --threads 8 --writes 50
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+
+def _worker(workdir: str, proc_id: int, threads: int, writes: int) -> None:
+    os.chdir(workdir)  # MEMORY_FILE / CAL_PATH / TASK_PATH are relative paths
+    import memory_manager
+    from mcp_client import CalendarServerMock, TaskServerMock
+
+    def hammer(thread_id: int) -> None:
+        for i in range(writes):
+            tag = f"p{proc_id}-t{thread_id}-{i}"
+            memory_manager.record_session(goal=tag, duration="1 hour", reflection="stress")
+            CalendarServerMock.add_event(tag, "2030-01-01T09:00", "2030-01-01T09:30")
+            TaskServerMock.complete_task(tag)
+
+    pool = [threading.Thread(target=hammer, args=(t,)) for t in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    memory_manager.flush_memory()  # multiprocessing children skip atexit hooks
+
+
+def check_torn_tail(workdir: Path) -> list:
+    """Crash mid-append: the log ends in half a record, the index misses it (and, legacy, the old
+    rebuild newline-terminated such a line). Reopening must count only the decodable entries."""
+    from memory_store import JsonlStore
+
+    failures = []
+    for case, tail in (("torn", b'{"goal": "torn'), ("torn, newline-terminated", b'{"goal": "torn\n')):
+        path = workdir / f"torn-{len(tail)}.jsonl"
+        JsonlStore(path).extend([{"goal": f"g{i}"} for i in range(100)])
+        with open(path, "ab") as log:
+            log.write(tail)
+        store = JsonlStore(path)
+        if (store.count(), len(store.load_all())) != (100, 100):
+            failures.append(f"{case}: count() {store.count()} for {len(store.load_all())} entries")
+        store.append({"goal": "after"})
+        store = JsonlStore(path)
+        recent = [e["goal"] for e in store.recent(2)]
+        if store.count() != 101 or len(store.load_all()) != 101 or recent != ["g99", "after"]:
+            failures.append(f"{case}: after another append count() {store.count()}, "
+                            f"{len(store.load_all())} entries, recent {recent}")
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=50, help="writes per thread per store")
+    parser.add_argument("--backend", default=os.getenv("FOCUS_MEMORY_BACKEND", "jsonl"))
+    args = parser.parse_args(argv)
+    os.environ["FOCUS_MEMORY_BACKEND"] = args.backend
+    repo = str(Path(__file__).resolve().parent.parent)
+    os.environ["PYTHONPATH"] = repo + os.pathsep + os.environ.get("PYTHONPATH", "")
+    sys.path.insert(0, repo)
+
+    tags = [
+        f"p{p}-t{t}-{i}"
+        for p in range(args.processes) for t in range(args.threads) for i in range(args.writes)
+    ]
+    with tempfile.TemporaryDirectory() as workdir:
+        Path(workdir, "tasks_data.json").write_text(
+            json.dumps({"tasks": [{"id": tag, "title": tag, "done": False} for tag in tags]}),
+            encoding="utf-8",
+        )
+        t0 = time.perf_counter()
+        ctx = mp.get_context("spawn")
+        procs = [
+            ctx.Process(target=_worker, args=(workdir, p, args.threads, args.writes))
+            for p in range(args.processes)
+        ]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - t0
+
+        os.chdir(workdir)
+        import memory_manager
+
+        sessions = {e["goal"] for e in memory_manager.load_memory()}
+        stats_entries = memory_manager.get_stats().entries
+        events = {e["title"] for e in json.loads(Path("calendar_data.json").read_text())["events"]}
+        done = {t["id"] for t in json.loads(Path("tasks_data.json").read_text())["tasks"] if t["done"]}
+        memory_manager.set_store(None)
+        os.chdir(repo)
+
+    expected = set(tags)
+    report = {
+        "sessions": len(expected - sessions),
+        "aggregate entries": len(tags) - stats_entries,
+        "calendar events": len(expected - events),
+        "completed tasks": len(expected - done),
+    }
+    print(f"{len(tags)} writes per store from {args.processes} processes x {args.threads} threads "
+          f"in {elapsed:.2f}s ({args.backend} backend)")
+    for name, missing in report.items():
+        print(f"  {name:<18} missing: {missing}")
+    lost = any(report.values()) or any(p.exitcode for p in procs)
+    print("FAIL: records lost" if lost else "OK: no records lost")
+    with tempfile.TemporaryDirectory() as workdir:
+        torn = check_torn_tail(Path(workdir))
+    for f in torn:
+        print("FAIL torn tail:", f)
+    print("torn tail: " + ("OK" if not torn else f"{len(torn)} failure(s)"))
+    return 1 if lost or torn else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Minimal OpenAI-compatible HTTP server for offline tests of the real client code paths
+(ChatOpenAI / OpenAI / AsyncOpenAI with a pooled httpx client).
+
+    python -m benchmarks.stub_openai_server --port 8765 --latency 0.3
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=sk-stub python app.py
+
+Serves POST /v1/chat/completions (plain, streamed as SSE, JSON-schema / tool-call
+structured output) after `latency` seconds. HTTP/1.1 keep-alive; `server.connections`
+counts TCP connections opened, so tests can check that clients reuse a pool.
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Tuple
+
+from benchmarks.stubs import DEFAULT_REPLY
+
+STRUCTURED = {"task_type": "focus"}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):  # keep benchmark output clean
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+
+        model = body.get("model", "stub")
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages", []))
+        message: Dict[str, Any] = {"role": "assistant", "content": self.server.reply}
+        if body.get("tools"):
+            name = body["tools"][0]["function"]["name"]
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{
+                    "id": "call_stub",
+                    "type": "function",
+                    "function": {"name": name, "arguments": json.dumps(STRUCTURED)},
+                }],
+            }
+        elif body.get("response_format", {}).get("type") in ("json_schema", "json_object"):
+            message["content"] = json.dumps(STRUCTURED)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(str(message.get("content") or "").split()),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        base = {"id": "chatcmpl-stub", "created": int(time.time()), "model": model}
+
+        if not body.get("stream"):
+            self._send_json(200, {
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": message, "finish_reason": "stop", "logprobs": None}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = (message["content"] or "").split(" ")
+        for i, word in enumerate(words):
+            delta = {"role": "assistant", "content": word} if i == 0 else {"content": " " + word}
+            chunk = {**base, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        done = {**base, "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        self._write_chunk(f"data: {json.dumps(done)}\n\n".encode("utf-8"))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self._write_chunk(
+                f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n"
+                .encode("utf-8")
+            )
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+
+class StubOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address, latency: float = 0.0, reply: str = DEFAULT_REPLY):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.reply = reply
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+
+
+def start_stub_server(latency: float = 0.0, port: int = 0) -> Tuple[StubOpenAIServer, str]:
+    """Start in a daemon thread; returns (server, base_url). Call server.shutdown() when done."""
+    server = StubOpenAIServer(("127.0.0.1", port), latency=latency)
+    threading.Thread(target=server.serve_forever, name="stub-openai", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before each response")
+    args = parser.parse_args(argv)
+    server = StubOpenAIServer(("127.0.0.1", args.port), latency=args.latency)
+    print(f"stub OpenAI API on http://127.0.0.1:{args.port}/v1 (latency {args.latency}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
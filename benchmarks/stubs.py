@@ -0,0 +1,226 @@
+"""
+Stand-ins used by the benchmarks:
+- StubLLM: mimics ChatOpenAI.(a)invoke / (a)stream / with_structured_output with a fixed latency
+- StubOpenAI / StubAsyncOpenAI: mimic (Async)OpenAI().chat.completions.create (used by focus_buddy.py)
+- StubSearch: mimics SerpAPIWrapper.run (used by focus_buddy_rag.py)
+- offline_llms(): patches all three in before the entry-point modules are imported
+- SlowServer: wraps an MCP mock server and adds latency to every tool call
+- sandbox(): a temp directory holding the memory store and calendar / task files
+"""
+
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, Optional
+
+_MISSING = object()
+DEFAULT_REPLY = "Stub plan:\n1. 09:00-09:50 Deep work\n2. 09:50-10:00 Break"
+
+
+class StubReply:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class _StructuredStub:
+    def __init__(self, llm: "StubLLM", schema):
+        self._llm = llm
+        self._schema = schema
+
+    def invoke(self, messages, **kwargs):
+        self._llm._wait()
+        return self._schema(**self._llm.structured)
+
+    async def ainvoke(self, messages, **kwargs):
+        await self._llm._await()
+        return self._schema(**self._llm.structured)
+
+
+class StubLLM:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        reply: str = DEFAULT_REPLY,
+        structured: Optional[Dict[str, Any]] = None,
+    ):
+        self.latency = latency
+        self.reply = reply
+        self.structured = structured or {"task_type": "focus"}
+        self.calls = 0
+
+    def _wait(self) -> None:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    async def _await(self) -> None:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def invoke(self, messages, **kwargs) -> StubReply:
+        self._wait()
+        return StubReply(self.reply)
+
+    async def ainvoke(self, messages, **kwargs) -> StubReply:
+        await self._await()
+        return StubReply(self.reply)
+
+    def stream(self, messages, **kwargs):
+        """Same total latency as invoke(), spread over word-sized chunks."""
+        self.calls += 1
+        words = self.reply.split(" ")
+        for i, word in enumerate(words):
+            if self.latency:
+                time.sleep(self.latency / len(words))
+            yield StubReply(word if i == 0 else " " + word)
+
+    async def astream(self, messages, **kwargs):
+        self.calls += 1
+        words = self.reply.split(" ")
+        for i, word in enumerate(words):
+            if self.latency:
+                await asyncio.sleep(self.latency / len(words))
+            yield StubReply(word if i == 0 else " " + word)
+
+    def with_structured_output(self, schema):
+        return _StructuredStub(self, schema)
+
+
+class StubOpenAI:
+    """openai.OpenAI look-alike; accepts (and ignores) the real constructor arguments."""
+
+    latency = 0.0
+    reply = DEFAULT_REPLY
+
+    def __init__(self, *args, **kwargs):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str, messages, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.reply))])
+
+
+class StubAsyncOpenAI(StubOpenAI):
+    """openai.AsyncOpenAI look-alike."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._acreate))
+
+    async def _acreate(self, model: str, messages, **kwargs):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.reply))])
+
+
+class StubSearch:
+    """SerpAPIWrapper look-alike returning a fixed snippet."""
+
+    latency = 0.0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def run(self, query: str) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return f"Stub search results for: {query}. Work in 50-minute blocks with short breaks."
+
+
+@contextmanager
+def offline_llms(latency: float = 0.0) -> Iterator[StubLLM]:
+    """
+    Swap every network client for a stub with `latency` seconds per call:
+    langchain_openai.ChatOpenAI, openai.(Async)OpenAI and SerpAPIWrapper are patched before
+    focus_buddy / focus_buddy_rag are imported, and an already imported
+    focus_buddy_langgraph gets its `llm` replaced. Everything is restored on exit.
+    """
+    import langchain_openai
+    import openai
+
+    stub = StubLLM(latency=latency)
+    patches = [
+        (langchain_openai, "ChatOpenAI", lambda *a, **k: stub),
+        (openai, "OpenAI", type("StubOpenAI", (StubOpenAI,), {"latency": latency})),
+        (openai, "AsyncOpenAI", type("StubAsyncOpenAI", (StubAsyncOpenAI,), {"latency": latency})),
+    ]
+    try:
+        import langchain_community.utilities as community_utilities
+
+        patches.append((community_utilities, "SerpAPIWrapper", type("StubSearch", (StubSearch,), {"latency": latency})))
+    except ImportError:  # focus_buddy_rag cannot be imported without it anyway
+        pass
+    fbl = sys.modules.get("focus_buddy_langgraph")
+    if fbl is not None:
+        patches.append((fbl, "llm", stub))
+    # vars() rather than getattr(): reading a lazy attribute would build the real client
+    saved = [(obj, name, vars(obj).get(name, _MISSING)) for obj, name, _ in patches]
+    for obj, name, value in patches:
+        setattr(obj, name, value)
+    try:
+        yield stub
+    finally:
+        for obj, name, value in saved:
+            if value is _MISSING:
+                delattr(obj, name)
+            else:
+                setattr(obj, name, value)
+
+
+class SlowServer:
+    """Proxy for an MCP mock server class; each tool call sleeps `latency` seconds first."""
+
+    def __init__(self, server, latency: float):
+        self._server = server
+        self._latency = latency
+        self.name = server.name
+
+    def __getattr__(self, tool: str):
+        fn = getattr(self._server, tool)
+
+        def call(**kwargs):
+            time.sleep(self._latency)
+            return fn(**kwargs)
+
+        return call
+
+
+@contextmanager
+def sandbox(
+    memory: Optional[str] = "bench_memory.jsonl",
+    calendar: Optional[Dict[str, Any]] = None,
+    tasks: Optional[Dict[str, Any]] = None,
+) -> Iterator[Path]:
+    """
+    A temp directory for one benchmark run. memory_manager's store becomes the JsonlStore `memory`
+    in it (None: the benchmark sets its own stores); `calendar` / `tasks` data are written there and
+    mcp_client.CAL_PATH / TASK_PATH point at them. The store is reset and the paths restored on exit.
+    """
+    import mcp_client
+    import memory_manager
+    from memory_store import JsonlStore
+
+    saved = mcp_client.CAL_PATH, mcp_client.TASK_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        try:
+            if memory is not None:
+                memory_manager.set_store(JsonlStore(tmp / memory))
+            for attr, name, data in (("CAL_PATH", "calendar.json", calendar), ("TASK_PATH", "tasks.json", tasks)):
+                if data is not None:
+                    setattr(mcp_client, attr, tmp / name)
+                    (tmp / name).write_text(json.dumps(data), encoding="utf-8")
+            yield tmp
+        finally:
+            memory_manager.set_store(None)
+            mcp_client.CAL_PATH, mcp_client.TASK_PATH = saved
@@ -0,0 +1,85 @@
+"""
+Deterministic synthetic data for the benchmarks (same seed → same files).
+- make_calendar(n): back-to-back-ish events starting a day before now
+- make_tasks(n): tasks with random due dates, ~30% already done
+- make_memory(n): session entries shaped like record_session() output
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from memory_manager import make_digest
+
+GOALS = [
+    "Finish my data analysis report",
+    "Write the quarterly summary",
+    "Read two papers on retrieval",
+    "Study for the statistics exam",
+    "Refactor the billing module",
+    "Clean up the inbox",
+    "Prepare slides for Monday",
+    "Review pull requests",
+]
+DURATIONS = ["30 minutes", "1 hour", "90 minutes", "2 hours", "3 hours"]
+TITLES = ["Standup", "1:1", "Planning", "Review", "Lunch", "Sync", "Interview", "Demo"]
+REFLECTIONS = [
+    "User feedback after execution.",
+    "Keep 50/10 pacing; take a break after the second block.",
+    "Shorter blocks worked better late in the day.",
+]
+
+
+def _fmt(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M")
+
+
+def make_calendar(n: int, seed: int = 0, start: Optional[datetime] = None) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    t = (start or datetime.now()).replace(second=0, microsecond=0) - timedelta(days=1)
+    events = []
+    for _ in range(n):
+        t += timedelta(minutes=rng.choice([0, 0, 15, 30, 60, 120]))
+        end = t + timedelta(minutes=rng.choice([15, 30, 45, 60, 90]))
+        events.append({"title": rng.choice(TITLES), "start": _fmt(t), "end": _fmt(end)})
+        t = end
+    rng.shuffle(events)  # the file order of real calendars is arbitrary too
+    return {"events": events}
+
+
+def make_tasks(n: int, seed: int = 0) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    today = datetime.now().date()
+    return {
+        "tasks": [
+            {
+                "id": f"T-{i:07d}",
+                "title": f"{rng.choice(GOALS)} (part {i})",
+                "due": (today + timedelta(days=rng.randint(-30, 365))).isoformat(),
+                "done": rng.random() < 0.3,
+            }
+            for i in range(n)
+        ]
+    }
+
+
+def make_memory(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    t = datetime.now() - timedelta(hours=3 * n)
+    entries = []
+    for _ in range(n):
+        t += timedelta(hours=rng.uniform(1, 5))
+        feedback = rng.random() < 0.5
+        entry = {
+            "goal": rng.choice(GOALS),
+            "duration": rng.choice(DURATIONS),
+            "reflection": rng.choice(REFLECTIONS),
+            "actual_focus_minutes": rng.randint(10, 150) if feedback else None,
+            "breaks_taken": rng.randint(0, 4) if feedback else 0,
+            "fatigue_score": rng.randint(1, 5) if feedback else None,
+            "task_type": rng.choice(["focus", "research", "motivation"]),
+            "timestamp": t.isoformat(),
+        }
+        entry["digest"] = make_digest(entry)
+        entries.append(entry)
+    return entries
@@ -0,0 +1,323 @@
+"""
+Calendar engine behind CalendarServerMock.get_free_slots.
+- Events are parsed once and kept as a sorted, merged list of busy intervals
+- The parsed index is reused until the calendar data changes (the shared
+  repository reloads the file only when its mtime/size changes)
+- Free slots come from one sweep over the busy intervals inside the window,
+  optionally with a working-hours mask and a minimum gap around events
+- Recurring events are stored as one record with an RRULE and expanded lazily:
+  only the days a query touches are computed (jumping straight to them instead
+  of walking each series from its first occurrence) and kept until the data changes
+"""
+
+from __future__ import annotations
+import calendar
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from data_repository import get_repository
+from user_stores import MAX_OPEN_USERS, LRUHandles
+
+Interval = Tuple[datetime, datetime]
+
+RECURRING_CACHE_DAYS = 370  # expanded days of recurring events kept per calendar
+
+
+def merge_intervals(intervals: Sequence[Interval]) -> List[Interval]:
+    """Sort and merge strictly overlapping intervals (touching ones stay separate)."""
+    merged: List[Interval] = []
+    for s, f in sorted(intervals):
+        if merged and s < merged[-1][1]:
+            if f > merged[-1][1]:
+                merged[-1] = (merged[-1][0], f)
+        else:
+            merged.append((s, f))
+    return merged
+
+
+def working_hours_mask(start: datetime, end: datetime, working_hours: Sequence[int]) -> List[Interval]:
+    """Busy intervals covering everything outside [open, close) hours on each day of the window."""
+    open_h, close_h = working_hours
+    mask: List[Interval] = []
+    day = start.replace(hour=0, minute=0)
+    while day < end:
+        nxt = day + timedelta(days=1)
+        if open_h > 0:
+            mask.append((day, day + timedelta(hours=open_h)))
+        if close_h < 24:
+            mask.append((day + timedelta(hours=close_h), nxt))
+        day = nxt
+    return mask
+
+
+def find_free_slots(
+    busy: Sequence[Interval],
+    start: datetime,
+    end: datetime,
+    duration_minutes: int,
+    max_slots: int = 3,
+) -> List[Dict[str, str]]:
+    """
+    Earliest-fit sweep over merged busy intervals. Same results as the old
+    5-minute greedy scan: each slot starts at the earliest conflict-free time,
+    and the next search starts half a block later to stagger suggestions.
+    """
+    block = timedelta(minutes=duration_minutes)
+    stagger = timedelta(minutes=duration_minutes // 2 or 1)
+    ends = [f for _, f in busy]
+    i = bisect_right(ends, start)  # first interval ending after `start`
+    cur = start
+    slots: List[Dict[str, str]] = []
+    while cur + block <= end and len(slots) < max_slots:
+        while i < len(busy) and busy[i][1] <= cur:
+            i += 1
+        if i < len(busy) and busy[i][0] < cur + block:
+            cur = busy[i][1]  # jump past conflict
+            i += 1
+            continue
+        slots.append({
+            "start": cur.isoformat(timespec="minutes"),
+            "end": (cur + block).isoformat(timespec="minutes"),
+        })
+        cur += stagger
+    return slots
+
+
+# ------------------ Recurring events ----------------------
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+FREQS = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+
+
+def _parse_until(value: str) -> datetime:
+    """RRULE UNTIL (20261231T170000, 20261231 or ISO). A date alone covers that whole day; a trailing
+    Z is dropped, since event times here are naive local times."""
+    value = value.rstrip("Z")
+    for fmt in ("%Y%m%dT%H%M%S", "%Y%m%dT%H%M", "%Y%m%d"):
+        try:
+            until = datetime.strptime(value, fmt)
+            break
+        except ValueError:
+            continue
+    else:
+        until = datetime.fromisoformat(value)
+    return until if "T" in value else until.replace(hour=23, minute=59, second=59)
+
+
+class Recurrence:
+    """
+    One RRULE series; the event's start/end are its first occurrence. Supported: FREQ=DAILY|WEEKLY|
+    MONTHLY|YEARLY with INTERVAL, COUNT, UNTIL, BYDAY (weekly, or daily every day) and BYMONTHDAY
+    (monthly / yearly; negative days count from the month's end, missing days are skipped), plus
+    EXDATE occurrence starts. Anything else raises ValueError rather than being silently ignored.
+    """
+
+    __slots__ = ("start", "duration", "freq", "interval", "count", "until", "days", "exdates",
+                 "_anchor", "_step", "_offsets", "_clock", "_first")
+
+    def __init__(self, start: datetime, end: datetime, rule: str, exdates: Iterable[str] = ()):
+        parts = {}
+        for part in rule.upper().removeprefix("RRULE:").split(";"):
+            if part:
+                key, _, value = part.partition("=")
+                parts[key.strip()] = value.strip()
+        freq = parts.pop("FREQ", None)
+        if freq not in FREQS:
+            raise ValueError(f"RRULE needs FREQ={'|'.join(FREQS)}, got {freq!r}")
+        self.start, self.duration = start, end - start
+        self.interval = int(parts.pop("INTERVAL", "1"))
+        self.count = int(parts.pop("COUNT")) if "COUNT" in parts else None
+        self.until = _parse_until(parts.pop("UNTIL")) if "UNTIL" in parts else None
+        if self.interval < 1 or (self.count is not None and self.count < 1):
+            raise ValueError("RRULE INTERVAL and COUNT must be positive")
+        if parts.pop("WKST", "MO") != "MO":
+            raise ValueError("RRULE WKST other than MO is not supported")
+        byday, bymonthday = parts.pop("BYDAY", None), parts.pop("BYMONTHDAY", None)
+        if parts:
+            raise ValueError(f"unsupported RRULE part(s): {', '.join(sorted(parts))}")
+        if byday and freq == "DAILY" and self.interval == 1:
+            freq = "WEEKLY"  # every day, restricted to some weekdays == weekly on those days
+        if byday and freq != "WEEKLY":
+            raise ValueError(f"BYDAY is only supported with FREQ=WEEKLY, not {freq}")
+        if bymonthday and freq not in ("MONTHLY", "YEARLY"):
+            raise ValueError(f"BYMONTHDAY is only supported with FREQ=MONTHLY/YEARLY, not {freq}")
+        if freq == "YEARLY":
+            freq, self.interval = "MONTHLY", self.interval * 12
+        self.freq = freq
+        if freq == "WEEKLY":
+            days = [WEEKDAYS.index(d.strip()) for d in byday.split(",")] if byday else [start.weekday()]
+        elif freq == "MONTHLY":
+            days = [int(d) for d in bymonthday.split(",")] if bymonthday else [start.day]
+            if any(d == 0 or abs(d) > 31 for d in days):
+                raise ValueError("BYMONTHDAY must be 1..31 or -31..-1")
+        else:
+            days = [0]
+        self.days = sorted(set(days))
+        self.exdates = {datetime.fromisoformat(x) for x in exdates}
+
+        # period 0 starts at the first occurrence's day / Monday / month; later ones are `_step` apart
+        midnight = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        self._clock = start - midnight
+        if freq == "MONTHLY":
+            self._anchor, self._step, self._offsets = start.year * 12 + start.month - 1, None, []
+        else:
+            weekly = freq == "WEEKLY"
+            self._anchor = midnight - timedelta(days=start.weekday()) if weekly else midnight
+            self._step = timedelta(weeks=self.interval) if weekly else timedelta(days=self.interval)
+            self._offsets = [timedelta(days=d) + self._clock for d in self.days] if weekly else [self._clock]
+        self._first = sum(1 for s in self._period(0)[1] if s >= start)
+
+    def _period(self, k: int) -> Tuple[datetime, List[datetime]]:
+        """(period start, candidate occurrence starts) of the k-th period after the first one."""
+        if self._step is not None:
+            begin = self._anchor + k * self._step
+            return begin, [begin + offset for offset in self._offsets]
+        year, month = divmod(self._anchor + k * self.interval, 12)
+        length = calendar.monthrange(year, month + 1)[1]
+        first = datetime(year, month + 1, 1)
+        days = sorted({d if d > 0 else length + d + 1 for d in self.days if abs(d) <= length})
+        return first, [first + timedelta(days=d - 1) + self._clock for d in days]
+
+    def _seek(self, lo: datetime) -> Tuple[int, int]:
+        """(k, occurrences before period k) for the first period that may hold an occurrence >= `lo`."""
+        if lo <= self.start:
+            return 0, 0
+        if self._step is None:
+            if self.count is not None:
+                return 0, 0  # months skip missing days, so counting needs the walk (≤ COUNT steps)
+            return (lo.year * 12 + lo.month - 1 - self._anchor) // self.interval, 0
+        k = (lo - self._anchor) // self._step
+        return k, (self._first + (k - 1) * len(self._offsets) if k else 0)
+
+    def between(self, lo: datetime, hi: datetime) -> Iterator[Interval]:
+        """Occurrences (start, end) with end > lo and start <= hi, in order."""
+        k, n = self._seek(lo - self.duration)
+        while True:
+            period_start, candidates = self._period(k)
+            if period_start > hi:
+                return
+            for s in candidates:
+                if s < self.start:
+                    continue
+                if (self.count is not None and n >= self.count) or (self.until and s > self.until) or s > hi:
+                    return
+                n += 1
+                if s + self.duration > lo and s not in self.exdates:
+                    yield s, s + self.duration
+            k += 1
+
+
+class _IndexState:
+    """One immutable parse of a calendar's events (only the `days` expansion cache fills in later)."""
+
+    __slots__ = ("version", "busy", "ends", "series", "longest", "days")
+
+    def __init__(self, events: Sequence[Dict[str, str]] = (), version: Optional[int] = None):
+        parsed: List[Interval] = []
+        series: List[Recurrence] = []
+        for e in events:
+            try:
+                s = datetime.fromisoformat(e["start"])
+                f = datetime.fromisoformat(e["end"])
+                # tz-aware events cannot be compared with the naive window, so they are skipped (the old
+                # scan dropped them too); inverted ones (end before start) are skipped as malformed
+                if s.tzinfo is not None or f.tzinfo is not None or f < s:
+                    continue
+                if e.get("rrule"):
+                    series.append(Recurrence(s, f, e["rrule"], e.get("exdate", ())))
+                else:
+                    parsed.append((s, f))
+            except Exception:
+                continue
+        self.version = version
+        self.busy = merge_intervals(parsed)
+        self.ends = [f for _, f in self.busy]
+        self.series = sorted(series, key=lambda r: r.start)
+        self.longest = max((r.duration for r in series), default=timedelta(0))  # how far back a window looks
+        self.days: Dict[datetime, List[Interval]] = {}
+
+
+class CalendarIndex:
+    """
+    Parsed, merged busy intervals of one calendar file, rebuilt when the file's data changes.
+    A rebuild makes a new _IndexState and publishes it with one assignment, so a concurrent
+    reader always works on one consistent parse.
+    """
+
+    def __init__(self, path):
+        self.repo = get_repository(path, "calendar")
+        self._state = _IndexState()
+
+    def refresh(self) -> _IndexState:
+        data, version = self.repo.snapshot()
+        state = self._state
+        if version != state.version:
+            state = self._state = _IndexState(data.get("events", []), version)
+        return state
+
+    def load_events(self, events: Sequence[Dict[str, str]]) -> None:
+        """Replaces the parsed events (kept until the file's data changes)."""
+        self._state = _IndexState(events, self._state.version)
+
+    def busy_between(self, start: datetime, end: datetime, min_gap_minutes: int = 0) -> List[Interval]:
+        """Busy intervals that touch [start, end], padded by `min_gap_minutes` (unmerged if padded)."""
+        state = self.refresh()
+        gap = timedelta(minutes=min_gap_minutes)
+        window = []
+        for i in range(bisect_right(state.ends, start - gap), len(state.busy)):
+            s, f = state.busy[i]
+            if s - gap > end:
+                break
+            window.append((s - gap, f + gap))
+        if not state.series:
+            return window
+        lo, hi = start - gap, end + gap
+        day = (lo - state.longest).replace(hour=0, minute=0, second=0, microsecond=0)
+        while day <= hi:
+            window += [(s - gap, f + gap) for s, f in self._recurring_day(day, state.series, state.days)
+                       if f > lo and s <= hi]
+            day += timedelta(days=1)
+        return sorted(window)
+
+    @staticmethod
+    def _recurring_day(day: datetime, series: List[Recurrence], days: Dict[datetime, List[Interval]]):
+        """Occurrences of every series that start on `day` (a midnight), expanded on first use."""
+        found = days.get(day)
+        if found is None:
+            nxt = day + timedelta(days=1)
+            found = []
+            for rule in series:
+                if rule.start >= nxt:
+                    break
+                found += [(s, f) for s, f in rule.between(day, nxt) if day <= s < nxt]
+            if len(days) >= RECURRING_CACHE_DAYS:
+                days.clear()
+            days[day] = found
+        return found
+
+    def free_slots(
+        self,
+        duration_minutes: int,
+        start: datetime,
+        end: datetime,
+        working_hours: Optional[Sequence[int]] = None,
+        min_gap_minutes: int = 0,
+        max_slots: int = 3,
+    ) -> List[Dict[str, str]]:
+        busy = self.busy_between(start, end, min_gap_minutes)
+        if working_hours:
+            busy += working_hours_mask(start, end, working_hours)
+        # clip to the window like the original scan did (matters for zero-length blocks)
+        clipped = [(max(s, start), min(f, end)) for s, f in busy]
+        busy = merge_intervals([(s, f) for s, f in clipped if s <= f])
+        return find_free_slots(busy, start, end, duration_minutes, max_slots)
+
+
+# one per open user's calendar; the least recently used ones are dropped
+_indexes = LRUHandles(CalendarIndex, MAX_OPEN_USERS)
+
+
+def get_calendar_index(path) -> CalendarIndex:
+    """One shared index per calendar file."""
+    return _indexes.get(Path(path).resolve())
@@ -0,0 +1,182 @@
+"""
+In-memory data layer for the MCP mock servers.
+- JsonRepository: parsed JSON file kept in memory; reloaded only when the file's
+  mtime/size changes, written through (locked + atomic) on every update
+- TaskRepository: also keeps tasks ordered by (done, due) so top-k is a slice
+- CalendarRepository: writes one event per line; bulk adds / removals are one write
+Repositories are shared per file path via get_repository(), which keeps the most
+recently used ones (one calendar + one task file per open user).
+"""
+
+from __future__ import annotations
+import json
+import os
+import threading
+from bisect import bisect_left, insort
+from copy import deepcopy
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from locking import atomic_write_text, locked
+from user_stores import MAX_OPEN_USERS, LRUHandles
+
+
+class JsonRepository:
+    def __init__(self, path, default: Dict[str, Any]):
+        self.path = Path(os.path.abspath(str(path)))
+        self._default = default
+        self._data: Dict[str, Any] = deepcopy(default)
+        self._signature: Optional[Tuple[int, int]] = ("unloaded",)  # never equals a real signature
+        self._lock = threading.RLock()
+        self.version = 0  # bumped on every reload or write; lets dependents cache derived data
+        self.reloads = 0
+
+    def _current_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _refresh(self) -> None:
+        sig = self._current_signature()
+        if sig == self._signature:
+            return
+        data = deepcopy(self._default)
+        if sig is not None:
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (json.JSONDecodeError, FileNotFoundError):
+                pass
+        self._data = data
+        self._signature = sig
+        self.version += 1
+        self.reloads += 1
+        self._on_change()
+
+    def _on_change(self) -> None:
+        """Hook for subclasses to rebuild derived indexes after a reload."""
+
+    def _dumps(self, data: Dict[str, Any]) -> str:
+        return json.dumps(data, indent=2, ensure_ascii=False)
+
+    def snapshot(self) -> Tuple[Dict[str, Any], int]:
+        """(data, version). Treat `data` as read-only; use update() to change it."""
+        with self._lock:
+            self._refresh()
+            return self._data, self.version
+
+    def update(self, mutate: Callable[[Dict[str, Any]], Any], reindex: bool = True) -> Any:
+        """Apply `mutate` to the latest data and write it through; returns mutate's result."""
+        with self._lock, locked(self.path):
+            self._refresh()  # pick up writes from other processes first
+            result = mutate(self._data)
+            atomic_write_text(self.path, self._dumps(self._data))
+            self._signature = self._current_signature()
+            self.version += 1
+            if reindex:
+                self._on_change()
+            return result
+
+
+class TaskRepository(JsonRepository):
+    """Tasks plus a sorted (done, due, position) index; top-k never re-sorts the list."""
+
+    def __init__(self, path):
+        self._order: List[Tuple[Any, str, int]] = []
+        self._by_id: Dict[str, int] = {}
+        super().__init__(path, {"tasks": []})
+
+    @staticmethod
+    def _key(task: Dict[str, Any], pos: int) -> Tuple[Any, str, int]:
+        # same priority as before: incomplete first, then earlier due date, then file order
+        return (task.get("done", False), task.get("due", "9999-12-31"), pos)
+
+    def _on_change(self) -> None:
+        tasks = self._data.get("tasks", [])
+        self._order = sorted(self._key(t, i) for i, t in enumerate(tasks))
+        self._by_id = {}
+        for i, t in enumerate(tasks):
+            self._by_id.setdefault(t.get("id"), i)
+
+    def top(self, limit: int = 3) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            tasks = self._data.get("tasks", [])
+            return [dict(tasks[pos]) for _, _, pos in self._order[:max(limit, 0)]]
+
+    def complete(self, task_id: str) -> bool:
+        def mark_done(data):
+            pos = self._by_id.get(task_id)
+            if pos is None:
+                return False
+            task = data["tasks"][pos]
+            old_key = self._key(task, pos)
+            task["done"] = True
+            # move just this task inside the sorted index
+            del self._order[bisect_left(self._order, old_key)]
+            insort(self._order, self._key(task, pos))
+            return True
+
+        with self._lock:
+            self._refresh()
+            if self._by_id.get(task_id) is None:
+                # nothing to change; the old server still rewrote the file, we skip it
+                return False
+            return self.update(mark_done, reindex=False)
+
+
+class CalendarRepository(JsonRepository):
+    """Calendar events; a recurring event is one record with an `rrule` (expanded by calendar_engine)."""
+
+    def __init__(self, path):
+        super().__init__(path, {"events": []})
+
+    def _dumps(self, data: Dict[str, Any]) -> str:
+        # one event per line, like the sample file: a third of indent=2's size and still diffable
+        def value(key, v):
+            if key == "events" and v:
+                return "[\n" + ",\n".join("    " + json.dumps(e, ensure_ascii=False) for e in v) + "\n  ]"
+            return json.dumps(v, ensure_ascii=False)
+
+        return "{\n" + ",\n".join(f"  {json.dumps(k)}: {value(k, v)}" for k, v in data.items()) + "\n}\n"
+
+    def add_many(self, events: List[Dict[str, Any]]) -> int:
+        if not events:
+            return 0
+        self.update(lambda data: data.setdefault("events", []).extend(events))
+        return len(events)
+
+    def remove(self, match: Callable[[Dict[str, Any]], bool]) -> int:
+        """Drops every event `match` accepts in one write; returns how many."""
+        def drop(data):
+            events = data.get("events", [])
+            data["events"] = [e for e in events if not match(e)]
+            return len(events) - len(data["events"])
+
+        with self._lock:
+            self._refresh()
+            if not any(match(e) for e in self._data.get("events", [])):
+                return 0  # nothing matches: skip the write
+            return self.update(drop)
+
+
+MAX_OPEN_REPOSITORIES = 2 * MAX_OPEN_USERS  # a calendar and a task file per open user
+
+
+def _open_repository(key: Tuple[str, str]) -> JsonRepository:
+    path, kind = key
+    if kind == "tasks":
+        return TaskRepository(path)
+    if kind == "calendar":
+        return CalendarRepository(path)
+    return JsonRepository(path, {})
+
+
+# least recently used repositories are dropped (nothing to close: writes go straight to disk)
+_repositories = LRUHandles(_open_repository, MAX_OPEN_REPOSITORIES)
+
+
+def get_repository(path, kind: str = "json") -> JsonRepository:
+    """Shared repository for `path` ("tasks" / "calendar" → Task- / CalendarRepository, else JsonRepository)."""
+    return _repositories.get((os.path.abspath(str(path)), kind))
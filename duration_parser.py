@@ -0,0 +1,174 @@
+"""
+Session-length parser for free-text durations typed in the UI.
+- Compound and short forms: "1h30m", "1 hr 30", "2 hours 15 minutes", "2hrs", "90'"
+- Clock form: "1:30" (hours:minutes, confidence 0.9)
+- Colloquial: "half an hour", "an hour and a half", "one and a half hours",
+  "three quarters of an hour", "a couple of hours", "forty-five minutes", "2 pomodoros"
+- Ranges take the midpoint: "1-2 hours" -> 90, "30 to 45 min" -> 38
+parse_duration() returns a Duration with a confidence in [0, 1] (0 = nothing understood,
+minutes then falls back to DEFAULT_MINUTES) and is memoized, since the UI resends the
+same few strings on every run.
+"""
+
+from __future__ import annotations
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict
+
+DEFAULT_MINUTES = 60
+POMODORO_MINUTES = 25
+CACHE_SIZE = 1024
+
+_ONES = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19,
+}
+_TENS = {"twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90}
+_VAGUE = {"a couple of": "2", "a couple": "2", "couple of": "2", "a few": "3", "few": "3", "several": "3"}
+
+_NUM = r"\d+(?:\.\d+)?"
+_H = r"(?:hours?|hrs?|hs|h)"
+_M = r"(?:minutes?|mins?|mns?|m|')"
+_S = r"(?:seconds?|secs?|s|\")"
+_P = r"(?:pomodoros?|pomos?)"
+_UNITS = {"h": 60.0, "m": 1.0, "s": 1 / 60, "p": float(POMODORO_MINUTES)}
+
+_WORD_NUM = re.compile(
+    rf"\b(?:({'|'.join(_TENS)})(?:[\s-]+({'|'.join(k for k in _ONES if _ONES[k] < 10)}))?|({'|'.join(_ONES)}))\b"
+)
+_VAGUE_RE = re.compile(rf"\b({'|'.join(sorted(_VAGUE, key=len, reverse=True))})\b")
+_ESTIMATE = re.compile(r"\b(?:few|several)\b")
+_FRACTION = re.compile(r"(\d+)?\s*(?:(\d+)/(\d+)|½|¼|¾)")
+# phrases rewritten to plain "<number> <unit>" before the component scan
+_PHRASES = [
+    (re.compile(rf"\b(?:an?|one|1)\s+{_H}\s+and\s+an?\s+half\b"), "1.5 h"),
+    (re.compile(rf"\b({_NUM})\s+{_H}\s+and\s+an?\s+half\b"), lambda m: f"{float(m.group(1)) + 0.5:g} h"),
+    (re.compile(rf"\b({_NUM})\s+and\s+an?\s+half\b"), lambda m: f"{float(m.group(1)) + 0.5:g}"),
+    (re.compile(rf"\b(?:an?|one|1)\s+and\s+an?\s+half\b"), "1.5"),
+    (re.compile(rf"\bthree\s+quarters?\s+(?:of\s+)?an?\s+{_H}\b|\b3\s+quarters?\s+(?:of\s+)?an?\s+{_H}\b"), "45 m"),
+    (re.compile(rf"\b(?:an?\s+|one\s+|1\s+)?quarter\s+(?:of\s+)?(?:an?\s+)?{_H}\b"), "15 m"),
+    (re.compile(rf"\b(?:an?\s+)?half\s+(?:of\s+)?(?:an?\s+)?{_H}\b"), "30 m"),
+    (re.compile(rf"\b(?:an?\s+)?half\s+(?:an?\s+)?{_M}\b"), "30 s"),
+    (re.compile(rf"\b(?:an?|one)\s+(?={_H}\b|{_M}\b|{_P}\b)"), "1 "),
+]
+_CLOCK = re.compile(rf"(?<![\d:.])(\d{{1,2}}):([0-5]\d)(?:\s*{_H}(?![a-z]))?(?![\d:])")
+_TIME_OF_DAY_BEFORE = re.compile(r"\b(?:at|from|until|till|by|starting|start)\s*$")
+_TIME_OF_DAY_AFTER = re.compile(r"\s*(?:am|pm|a\.m\.|p\.m\.)")
+_RANGE = re.compile(rf"({_NUM})\s*(?:-|–|—|to|or)\s*({_NUM})\s*(?=[a-z'\"])")
+_COMPONENT = re.compile(rf"({_NUM})\s*(?:({_H})|({_M})|({_S})|({_P}))(?![a-z])")
+_TRAILING = re.compile(rf"^\s*(?:and\s+)?({_NUM})(?![\d.:])")  # "1h 30" -> 30 more minutes
+_BARE = re.compile(rf"^\s*({_NUM})\s*$")
+_FILLER = re.compile(
+    r"\b(?:about|around|approx(?:imately)?|roughly|maybe|like|just|only|for|of|and|at|least|most|max(?:imum)?|"
+    r"total|in|a|an|or so|session|focus|work(?:ing)?|please|long|the|next|~)\b|[~,.+&()\s-]"
+)
+
+
+@dataclass(frozen=True)
+class Duration:
+    minutes: int
+    confidence: float  # 1.0 fully understood … 0.0 nothing understood (minutes = DEFAULT_MINUTES)
+    text: str = ""
+
+
+def _words_to_digits(t: str) -> str:
+    t = _VAGUE_RE.sub(lambda m: _VAGUE[m.group(1)], t)
+
+    def number(m: re.Match) -> str:
+        if m.group(3):
+            return str(_ONES[m.group(3)])
+        return str(_TENS[m.group(1)] + (_ONES[m.group(2)] if m.group(2) else 0))
+
+    return _WORD_NUM.sub(number, t)
+
+
+def _fractions(t: str) -> str:
+    def value(m: re.Match) -> str:
+        whole = float(m.group(1) or 0)
+        if m.group(2):
+            denominator = float(m.group(3))
+            frac = float(m.group(2)) / denominator if denominator else 0.0
+        else:
+            frac = {"½": 0.5, "¼": 0.25, "¾": 0.75}[m.group(0)[-1]]
+        return f"{whole + frac:g}"
+
+    return _FRACTION.sub(value, t)
+
+
+def _normalize(text: str) -> str:
+    t = _fractions(_words_to_digits(text.lower().strip()))
+    for pattern, repl in _PHRASES:
+        t = pattern.sub(repl, t)
+    return t
+
+
+def _parse(text: str) -> Duration:
+    text = text or ""
+    t = _normalize(text)
+    if not t:
+        return Duration(DEFAULT_MINUTES, 0.0, text)
+    confidence = 0.6 if _ESTIMATE.search(text.lower()) else 1.0
+    t, ranges = _RANGE.subn(lambda m: f"{(float(m.group(1)) + float(m.group(2))) / 2:g} ", t)
+    if ranges:
+        confidence = min(confidence, 0.8)
+
+    clocks = 0
+
+    def clock(m: re.Match) -> str:  # "1:30" is h:mm, "at 10:30" / "10:30 am" a time of day (ignored)
+        nonlocal clocks
+        if _TIME_OF_DAY_BEFORE.search(t, 0, m.start()) or _TIME_OF_DAY_AFTER.match(t, m.end()):
+            return " "
+        clocks += 1
+        return f"{m.group(1)} h {m.group(2)} m"
+
+    t = _CLOCK.sub(clock, t)
+    if clocks:
+        confidence = min(confidence, 0.9)
+
+    minutes, last_unit, end = 0.0, None, 0
+    leftover = []
+    for m in _COMPONENT.finditer(t):
+        leftover.append(t[end:m.start()])
+        unit = "h" if m.group(2) else "m" if m.group(3) else "s" if m.group(4) else "p"
+        minutes += float(m.group(1)) * _UNITS[unit]
+        last_unit, end = unit, m.end()
+    rest = t[end:]
+    if last_unit == "h":
+        trailing = _TRAILING.match(rest)
+        if trailing:  # "1h 30" / "2 hours and 15"
+            minutes += float(trailing.group(1))
+            rest = rest[trailing.end():]
+    leftover.append(rest)
+
+    if last_unit is None:
+        bare = _BARE.match(t)
+        if not bare:
+            return Duration(DEFAULT_MINUTES, 0.0, text)
+        value = float(bare.group(1))
+        # a lone number: "2" is most likely hours, "45" minutes
+        if value <= 8:
+            return Duration(max(round(value * 60), 1), min(confidence, 0.5), text)
+        return Duration(max(round(value), 1), min(confidence, 0.6), text)
+
+    if _FILLER.sub("", "".join(leftover)):
+        confidence = min(confidence, 0.7)  # words we did not understand around the numbers
+    return Duration(max(int(round(minutes)), 1), confidence, text)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_duration(text: str) -> Duration:
+    """Structured parse of a duration string (memoized)."""
+    return _parse(text)
+
+
+def get_duration_cache_stats() -> Dict[str, Any]:
+    info = parse_duration.cache_info()
+    calls = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "hit_rate": round(info.hits / calls, 3) if calls else None,
+    }
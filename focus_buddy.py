@@ -1,12 +1,58 @@
 from dotenv import load_dotenv
+import asyncio
 import os
-from openai import OpenAI
+import time
+import weakref
+
+from duration_parser import parse_duration
+from plan_checks import record_reflection, should_reflect
 
 load_dotenv()
 api_key = os.getenv("OPEN_API_KEY")
-client = OpenAI(api_key=api_key)
+MODEL = "gpt-4o-mini"
+# "adaptive": reflect only when the local plan checks fail; "merged": one act prompt that
+# includes the review; "always": reason → act → reflect
+REFLECTION_MODE = os.getenv("REFLECTION_MODE", "adaptive")
+MERGED_REVIEW = """
+    Before answering, review the plan critically (is it realistic for the duration,
+    are breaks reasonable, can any step be improved) and give only the REVISED FINAL PLAN.
+    """
+MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+_client = None
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncOpenAI
+
+
+def get_client():
+    """OpenAI client, created (and the openai package imported) on first use."""
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI(api_key=api_key)
+    return _client
+
+
+def get_async_client():
+    """AsyncOpenAI client whose keep-alive connection pool is shared by all sessions on this event loop."""
+    loop = asyncio.get_running_loop()
+    if loop not in _async_clients:
+        import httpx
+        from openai import AsyncOpenAI
+        limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+        _async_clients[loop] = AsyncOpenAI(api_key=api_key, http_client=httpx.AsyncClient(limits=limits))
+    return _async_clients[loop]
+
+
+def _complete(messages):
+    response = get_client().chat.completions.create(model=MODEL, messages=messages)
+    return response.choices[0].message.content
+
+
+async def _acomplete(messages):
+    response = await get_async_client().chat.completions.create(model=MODEL, messages=messages)
+    return response.choices[0].message.content
 
-def reason(task,duration):
+
+def reason_messages(task,duration):
     prompt = f""" 
     You are a focus buddy, an Agentic AI helping users plan focused work sessions.
 
@@ -21,18 +67,11 @@ def reason(task,duration):
     Write your reasoning clearly and concisely.
     """
 
-    response = client.chat.completions.create(
-        model='gpt-4o-mini',
-        messages=[{"role":"system", "content":"You are a reasoning assisstant"},
-                  {"role":"user","content":prompt}]
-    )
-
-    reasoning = response.choices[0].message.content
-
-    return reasoning
+    return [{"role":"system", "content":"You are a reasoning assisstant"},
+            {"role":"user","content":prompt}]
 
 
-def act(reasoning, task, duration):
+def act_messages(reasoning, task, duration, merged=False):
     prompt = f"""
     Using this reasoning:
     {reasoning}
@@ -46,17 +85,12 @@ def act(reasoning, task, duration):
     2. Breaks
     3. One motivational line at the end
     """
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role":"assistant","content":"reasoning"},
-                  {"role":"user","content":prompt}]
-    )
-
-    plan = response.choices[0].message.content
-
-    return plan
+    if merged:
+        prompt += MERGED_REVIEW
+    return [{"role":"assistant","content":"reasoning"},
+            {"role":"user","content":prompt}]
 
-def reflect(plan, duration):
+def reflect_messages(plan, duration):
     prompt=f"""
     Here is your initial plan:
     {plan}
@@ -69,20 +103,65 @@ def reflect(plan, duration):
     Give me the REVISED FINAL PLAN.
     """
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role":"assistant","content":plan},
-                  {"role":"user","content":prompt}]
-    )
+    return [{"role":"assistant","content":plan},
+            {"role":"user","content":prompt}]
+
+
+def reason(task, duration):
+    return _complete(reason_messages(task, duration))
+
 
-    reflection = response.choices[0].message.content
+def act(reasoning, task, duration, merged=False):
+    return _complete(act_messages(reasoning, task, duration, merged))
 
-    return reflection
 
-def focus_buddy_agent(task,duration):
+def reflect(plan, duration):
+    return _complete(reflect_messages(plan, duration))
+
+
+async def areason(task, duration):
+    return await _acomplete(reason_messages(task, duration))
+
+
+async def aact(reasoning, task, duration, merged=False):
+    return await _acomplete(act_messages(reasoning, task, duration, merged))
+
+
+async def areflect(plan, duration):
+    return await _acomplete(reflect_messages(plan, duration))
+
+
+def _needs_reflection(plan, duration, mode):
+    return should_reflect(mode, plan, parse_duration(duration).minutes)
+
+
+def focus_buddy_agent(task, duration, mode=None):
+    mode = mode or REFLECTION_MODE
     reasoning = reason(task, duration)
-    initial_plan = act(reasoning, task, duration)
-    final_plan = reflect(initial_plan, duration)
+    initial_plan = act(reasoning, task, duration, merged=mode == "merged")
+    final_plan = initial_plan
+    if _needs_reflection(initial_plan, duration, mode):
+        t0 = time.perf_counter()
+        final_plan = reflect(initial_plan, duration)
+        record_reflection(time.perf_counter() - t0)
+
+    return {
+        "reasoning": reasoning,
+        "initial_plan": initial_plan,
+        "final_plan": final_plan
+    }
+
+
+async def afocus_buddy_agent(task, duration, mode=None):
+    """Async focus_buddy_agent: same calls, awaited on the pooled AsyncOpenAI client."""
+    mode = mode or REFLECTION_MODE
+    reasoning = await areason(task, duration)
+    initial_plan = await aact(reasoning, task, duration, merged=mode == "merged")
+    final_plan = initial_plan
+    if _needs_reflection(initial_plan, duration, mode):
+        t0 = time.perf_counter()
+        final_plan = await areflect(initial_plan, duration)
+        record_reflection(time.perf_counter() - t0)
 
     return {
         "reasoning": reasoning,
@@ -91,6 +170,7 @@ def focus_buddy_agent(task,duration):
     }
 
 
-focus_buddy_agent("Write a 2-page analysis report", "2 hours")
+if __name__ == "__main__":
+    print(focus_buddy_agent("Write a 2-page analysis report", "2 hours")["final_plan"])
 
 
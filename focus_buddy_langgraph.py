@@ -7,62 +7,178 @@ Focus Buddy v4.0 : MCP-ready, Context-Aware Focus Agent
 - Optional auto-scheduling of a focus block into the calendar mock
 """
 
+import asyncio
 import os
-from typing import Annotated, Literal, Dict, Any
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Literal, Dict, Any, AsyncIterator, Iterator, List, Sequence, Tuple
 
 from dotenv import load_dotenv
-from langgraph.graph import StateGraph, START, END
-from langgraph.graph.message import add_messages
-from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field
 from typing_extensions import TypedDict
 
 from memory_manager import (
     record_session,
-    compute_average_focus_time,
-    get_recent_sessions,
+    get_focus_profile,
+    get_focus_stats,
+    get_recent_digests,
 )
+from duration_parser import parse_duration
+from goal_classifier import aclassify_goal, classify_goal
+from llm_cache import CachedLLM, ResponseCache
 from mcp_client import MCPClient
+from plan_checks import record_reflection, should_reflect
+from metrics import instrument, run_trace
+from prompt_builder import PromptBuilder, Trim
 
 # --- Setup ---
+# langchain_openai / langgraph and the clients below are only imported and built on
+# first use (get_llm / get_mcp / get_graph), so importing this module stays cheap
+# and never touches the network.
 load_dotenv()
 openai_api_key = os.getenv("OPEN_API_KEY")
 
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.6, api_key=openai_api_key)
+# Responses are cached by exact message list (which includes the context summary),
+# plus a similarity tier for near-identical goals; LLM_CACHE_SIMILARITY=0 disables it.
+llm_cache = ResponseCache(
+    max_entries=int(os.getenv("LLM_CACHE_SIZE", "512")),
+    ttl_seconds=float(os.getenv("LLM_CACHE_TTL", "3600")),
+    similarity_threshold=float(os.getenv("LLM_CACHE_SIMILARITY", "0.9")),
+)
+MCP_CALL_TIMEOUT = float(os.getenv("MCP_CALL_TIMEOUT", "5"))  # seconds per context source
+# keep-alive connection pools shared by all sessions (one for sync calls, one per event
+# loop for async calls); OPENAI_BASE_URL points the client at e.g. a local stub server
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+# after planning: "adaptive" = reflect only when the local plan checks fail,
+# "merged" = reflection instructions folded into the planner prompt (one LLM call),
+# "always" = the original plan → reflect chain
+REFLECTION_MODE = os.getenv("REFLECTION_MODE", "adaptive")
+# runs given a run_id are checkpointed here after every node, so a retry resumes where it failed
+CHECKPOINT_PATH = os.getenv("FOCUS_CHECKPOINT_PATH", "focus_checkpoints.sqlite3")
+CHECKPOINT_TTL = float(os.getenv("FOCUS_CHECKPOINT_TTL", str(7 * 24 * 3600)))  # seconds a run is kept
+
+
+def _http_limits():
+    import httpx
+
+    return httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)
+
+
+def _chat_model(**http_clients):
+    from langchain_openai import ChatOpenAI
+
+    chat = ChatOpenAI(model="gpt-4o-mini", temperature=0.6, api_key=openai_api_key, **http_clients)
+    return CachedLLM(chat, llm_cache)
+
+
+def _make_llm():
+    import httpx
+
+    return _chat_model(http_client=httpx.Client(limits=_http_limits()))
+
+
+def _make_checkpointer():
+    from graph_checkpoints import SqliteCheckpointer
+
+    return SqliteCheckpointer(CHECKPOINT_PATH, ttl_seconds=CHECKPOINT_TTL)
+
+
+_LAZY = {
+    "llm": _make_llm,
+    "mcp": MCPClient,
+    "graph_builder": lambda: build_graph(),
+    "graph": lambda: get_graph_builder().compile(),
+    "async_graph": lambda: build_graph(use_async=True).compile(),
+    "checkpointer": _make_checkpointer,
+    "checkpointed_graph": lambda: get_graph_builder().compile(checkpointer=get_checkpointer()),
+    "async_checkpointed_graph": lambda: build_graph(use_async=True).compile(checkpointer=get_checkpointer()),
+}
+_lazy_lock = threading.RLock()
+
+
+_built: Dict[str, Any] = {}
+# async connections belong to the loop that opened them: one pooled client per running loop
+_async_llms: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+
+def _lazy(name: str):
+    """Build a module-level singleton on first use; assigning e.g. `module.llm = stub` overrides it."""
+    g = globals()
+    if name not in g:
+        with _lazy_lock:
+            if name not in g:
+                g[name] = _built[name] = _LAZY[name]()
+    return g[name]
+
+
+def get_llm():
+    return _lazy("llm")
+
+
+def get_async_llm():
+    """LLM for async nodes: an assigned `module.llm` if any, else this loop's pooled client."""
+    override = globals().get("llm")
+    if override is not None and override is not _built.get("llm"):
+        return override
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    with _lazy_lock:
+        llm = _async_llms.get(loop)
+        if llm is None:
+            llm = _async_llms[loop] = _chat_model(http_async_client=httpx.AsyncClient(limits=_http_limits()))
+    return llm
 
-mcp = MCPClient()
+
+def get_mcp() -> MCPClient:
+    return _lazy("mcp")
+
+
+def get_graph_builder():
+    return _lazy("graph_builder")
+
+
+def get_graph(checkpointed: bool = False):
+    """checkpointed=True: the same graph saving a checkpoint per node (needs a thread_id / run id)."""
+    return _lazy("checkpointed_graph" if checkpointed else "graph")
+
+
+def get_async_graph(checkpointed: bool = False):
+    """Same topology as get_graph(), with async nodes (for ainvoke / astream)."""
+    return _lazy("async_checkpointed_graph" if checkpointed else "async_graph")
+
+
+def get_checkpointer():
+    return _lazy("checkpointer")
+
+
+def __getattr__(name: str):
+    # keeps `focus_buddy_langgraph.llm / .mcp / .graph / .graph_builder` working
+    if name in _LAZY:
+        return _lazy(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ---------------------- Helpers --------------------
 def parse_duration_to_minutes(text: str) -> int:
     """
-    Very small parser: '2 hours' -> 120, '90 min' -> 90, '1.5h' -> 90.
+    '2 hours' -> 120, '1h30m' -> 90, 'half an hour' -> 30 (see duration_parser).
     Defaults to 60 if unclear.
     """
-    t = (text or "").lower().strip()
-    try:
-        if any(k in t for k in ["hour", "hr", "h "]):
-            # extract first number-ish token
-            num_str = "".join(ch if (ch.isdigit() or ch in ". ") else " " for ch in t)
-            toks = [p for p in num_str.split() if p]
-            if toks:
-                return int(round(float(toks[0]) * 60))
-        if "min" in t or "m " in t or t.endswith("m"):
-            num_str = "".join(ch if (ch.isdigit() or ch in ". ") else " " for ch in t)
-            toks = [p for p in num_str.split() if p]
-            if toks:
-                return int(round(float(toks[0])))
-    except Exception:
-        pass
-    return 60
+    return parse_duration(text).minutes
 
 
 def summarize_context(context: Dict[str, Any]) -> str:
     slots = context.get("free_slots", []) or []
     tasks = context.get("top_tasks", []) or []
+    errors = context.get("errors", {})
 
     if slots:
         slot_lines = [f"- {s['start']} → {s['end']}" for s in slots]
+    elif "free_slots" in errors:
+        slot_lines = [f"(calendar unavailable: {errors['free_slots']})"]
     else:
         slot_lines = ["(no free slots found)"]
 
@@ -72,53 +188,217 @@ def summarize_context(context: Dict[str, Any]) -> str:
             f"(due {t.get('due','—')}){' ✅' if t.get('done') else ''}"
             for t in tasks
         ]
+    elif "top_tasks" in errors:
+        task_lines = [f"(tasks unavailable: {errors['top_tasks']})"]
     else:
         task_lines = ["(no tasks found)"]
 
     return "Free slots:\n" + "\n".join(slot_lines) + "\n\nTop tasks:\n" + "\n".join(task_lines)
 
 
+def summarize_focus_stats(stats: Dict[str, Any], profile: Dict[str, Any] | None = None) -> str:
+    if stats.get("avg_focus") is None:
+        return "No historical focus data yet."
+    lines = [f"User’s average focus window: ~{stats['avg_focus']} minutes."]
+    if stats.get("focus_stdev"):
+        lines.append(f"Typical spread: ±{stats['focus_stdev']} minutes.")
+    if stats.get("ewma_focus") is not None:
+        lines.append(f"Recent focus trend (EWMA): ~{stats['ewma_focus']} minutes.")
+    if stats.get("goal_avg_focus") is not None:
+        lines.append(f"Average focus on this goal: ~{stats['goal_avg_focus']} minutes.")
+    trend = stats.get("fatigue_trend")
+    if trend is not None and abs(trend) >= 0.5:
+        lines.append("Fatigue has been rising lately." if trend > 0 else "Fatigue has been easing lately.")
+    if profile:
+        lines.extend(summarize_focus_profile(profile))
+    return "\n".join(lines)
+
+
+def summarize_focus_profile(profile: Dict[str, Any]) -> List[str]:
+    days = profile.get("window_days")
+    lines = []
+    if profile.get("focus_p25") is not None:
+        low, high = profile["focus_p25"], profile["focus_p75"]
+        lines.append(f"Last {days} days: focus sessions usually last {low:.0f}–{high:.0f} minutes.")
+    if profile.get("focus_7d") is not None:
+        lines.append(f"Past week average: ~{profile['focus_7d']} minutes.")
+    if profile.get("goal_focus") is not None:
+        lines.append(f"On this goal in the last {days} days: ~{profile['goal_focus']} minutes.")
+    if profile.get("best_hours"):
+        hours = " or ".join(f"{h:02d}:00" for h in profile["best_hours"])
+        lines.append(f"Best focus usually starts around {hours}.")
+    with_breaks, without = profile.get("fatigue_with_breaks"), profile.get("fatigue_no_breaks")
+    if with_breaks is not None and without is not None and abs(with_breaks - without) >= 0.3:
+        lines.append(f"Fatigue averages {with_breaks}/5 with breaks vs {without}/5 without.")
+    return lines
+
+
 # ---------------------- State & Classifier ----------------------
 class TaskClassifier(BaseModel):
     task_type: Literal["focus", "research", "motivation"] = Field(...)
 
 
+def merge_context(left: Dict[str, Any] | None, right: Dict[str, Any] | None) -> Dict[str, Any]:
+    """Reducer for `context`: parallel branches contribute keys instead of overwriting each other."""
+    return {**(left or {}), **(right or {})}
+
+
+def add_messages(left, right):
+    """langgraph's add_messages, imported on first use."""
+    from langgraph.graph.message import add_messages as _add_messages
+
+    return _add_messages(left, right)
+
+
 class State(TypedDict):
     goal: str
     duration: str
     messages: Annotated[list, add_messages]
     task_type: str | None
-    context: Dict[str, Any]
+    context: Annotated[Dict[str, Any], merge_context]
     auto_schedule: bool
+    stream: bool
+    reflect: bool  # set by the planner; False ends the run without the reflector
+    plan_draft: str | None  # planner LLM output before scheduling; reused when a run is redone with a new auto_schedule
+    scheduled_event: str | None  # id of the calendar event the planner booked; removed by a redo without auto_schedule
+    user_id: str | None  # scopes memory, calendar and tasks to one user (None = shared files)
+
+
+def generate(messages, node: str, stream: bool = False) -> str:
+    """Run the LLM; when streaming, forward each token chunk to the graph's custom stream."""
+    if not stream:
+        reply = get_llm().invoke(messages)
+        return reply.content if hasattr(reply, "content") else str(reply)
+    from langgraph.config import get_stream_writer
+
+    writer = get_stream_writer()
+    parts = []
+    for chunk in get_llm().stream(messages):
+        text = chunk.content if hasattr(chunk, "content") else str(chunk)
+        if text:
+            parts.append(text)
+            writer({"node": node, "text": text})
+    return "".join(parts)
+
+
+async def agenerate(messages, node: str, stream: bool = False) -> str:
+    """Async generate(): the event loop is free while the request is in flight."""
+    if not stream:
+        reply = await get_async_llm().ainvoke(messages)
+        return reply.content if hasattr(reply, "content") else str(reply)
+    from langgraph.config import get_stream_writer
+
+    writer = get_stream_writer()
+    parts = []
+    async for chunk in get_async_llm().astream(messages):
+        text = chunk.content if hasattr(chunk, "content") else str(chunk)
+        if text:
+            parts.append(text)
+            writer({"node": node, "text": text})
+    return "".join(parts)
 
 
 # ---------------------- Nodes ----------------------
+def _context_calls(durations_min: List[int], max_slots: int = 3) -> Dict[str, Any]:
+    calls = {
+        f"free_slots:{d}": ("calendar", "get_free_slots", {"duration_minutes": d, "max_slots": max_slots})
+        for d in set(durations_min)
+    }
+    calls["top_tasks"] = ("tasks", "list_top_tasks", {"limit": 3})
+    return calls
+
+
+def fetch_contexts(
+    durations_min: List[int], user_id: str | None = None, max_slots: int = 3
+) -> Dict[int, Dict[str, Any]]:
+    """One concurrent MCP round for several slot lengths; the task list is fetched once and shared."""
+    calls = _context_calls(durations_min, max_slots)
+    results, errors = get_mcp().gather(
+        calls,
+        timeout=MCP_CALL_TIMEOUT,
+        defaults={key: [] for key in calls},
+        user_id=user_id,
+    )
+    return _build_contexts(durations_min, results, errors)
+
+
+async def afetch_contexts(durations_min: List[int], user_id: str | None = None) -> Dict[int, Dict[str, Any]]:
+    calls = _context_calls(durations_min)
+    results, errors = await get_mcp().agather(
+        calls,
+        timeout=MCP_CALL_TIMEOUT,
+        defaults={key: [] for key in calls},
+        user_id=user_id,
+    )
+    return _build_contexts(durations_min, results, errors)
+
+
+def _build_contexts(durations_min, results, errors) -> Dict[int, Dict[str, Any]]:
+    contexts = {}
+    for d in set(durations_min):
+        context = {
+            "duration_min": d,
+            "free_slots": results[f"free_slots:{d}"],
+            "top_tasks": results["top_tasks"],
+        }
+        ctx_errors = {
+            name: errors[key]
+            for name, key in (("free_slots", f"free_slots:{d}"), ("top_tasks", "top_tasks"))
+            if key in errors
+        }
+        if ctx_errors:
+            context["errors"] = ctx_errors  # a slow/broken source degrades the context, not the run
+        contexts[d] = context
+    return contexts
+
+
+def _has_snapshot(state: State, duration_min: int) -> bool:
+    given = state.get("context") or {}
+    return given.get("duration_min") == duration_min and "free_slots" in given and "top_tasks" in given
+
+
 def context_agent(state: State):
-    """Fetch external context (calendar slots + top tasks) via MCP client."""
+    """Fetch external context (calendar slots + top tasks) concurrently via MCP client."""
     duration_min = parse_duration_to_minutes(state["duration"])
-    free_slots = mcp.call("calendar", "get_free_slots", {"duration_minutes": duration_min})
-    top_tasks = mcp.call("tasks", "list_top_tasks", {"limit": 3})
-    return {
-        "context": {
-            "duration_min": duration_min,
-            "free_slots": free_slots,
-            "top_tasks": top_tasks,
-        }
-    }
+    if _has_snapshot(state, duration_min):
+        return {"context": {}}  # pre-fetched snapshot (batch runs)
+    return {"context": fetch_contexts([duration_min], state.get("user_id"))[duration_min]}
+
+
+async def acontext_agent(state: State):
+    duration_min = parse_duration_to_minutes(state["duration"])
+    if _has_snapshot(state, duration_min):
+        return {"context": {}}
+    return {"context": (await afetch_contexts([duration_min], state.get("user_id")))[duration_min]}
+
+
+def _classify_messages(goal: str) -> List[Dict[str, str]]:
+    return [
+        {
+            "role": "system",
+            "content": "Classify the goal as 'focus', 'research', or 'motivation'.",
+        },
+        {"role": "user", "content": goal},
+    ]
+
+
+def llm_classify(goal: str) -> str:
+    cls = get_llm().with_structured_output(TaskClassifier)
+    return cls.invoke(_classify_messages(goal)).task_type
+
+
+async def allm_classify(goal: str) -> str:
+    cls = get_async_llm().with_structured_output(TaskClassifier)
+    return (await cls.ainvoke(_classify_messages(goal))).task_type
 
 
 def classify_task(state: State):
-    cls = llm.with_structured_output(TaskClassifier)
-    res = cls.invoke(
-        [
-            {
-                "role": "system",
-                "content": "Classify the goal as 'focus', 'research', or 'motivation'.",
-            },
-            {"role": "user", "content": state["goal"]},
-        ]
-    )
-    return {"task_type": res.task_type}
+    """Local rules/model first; the LLM is only asked when they are not confident."""
+    return {"task_type": classify_goal(state["goal"], fallback=llm_classify)}
+
+
+async def aclassify_task(state: State):
+    return {"task_type": await aclassify_goal(state["goal"], fallback=allm_classify)}
 
 
 def router(state: State):
@@ -130,191 +410,537 @@ def router(state: State):
     return {"next": "planner_agent"}
 
 
-def planner_agent(state: State):
-    goal = state["goal"]
-    duration = state["duration"]
-    context = state.get("context", {})
-    avg_focus = compute_average_focus_time()
-    avg_msg = (
-        f"User’s average focus window: ~{avg_focus} minutes."
-        if avg_focus is not None
-        else "No historical focus data yet."
+def _planner_messages(state: State) -> List[Dict[str, str]]:
+    goal, user_id = state["goal"], state.get("user_id")
+    avg_msg = summarize_focus_stats(get_focus_stats(goal, user_id=user_id), get_focus_profile(goal, user_id=user_id))
+    ctx_summary = summarize_context(state.get("context", {}))
+    system = (
+        "You are Focus Buddy. Create a realistic, time-bounded plan "
+        "using both user history and context (calendar slots + tasks)."
+    )
+    if REFLECTION_MODE == "merged":
+        # the reflector's checklist, applied before answering instead of in a second call
+        system += (
+            "\nBefore answering, review your draft for pacing and realism, the user’s past "
+            "focus patterns and the current context; reply with the final plan only."
+        )
+    history = [avg_msg, Trim(f"Context:\n{ctx_summary}")]
+    if REFLECTION_MODE == "merged":
+        history.append(Trim(f"Recent sessions:\n{get_recent_digests(user_id=user_id)}"))
+    return (
+        PromptBuilder("planner_agent")
+        .add("system", system)
+        .add("assistant", *history)
+        .add(
+            "user",
+            f"Goal: {goal}\n"
+            f"Duration: {state['duration']}\n"
+            "Use one of the free slots if possible. Break the work into steps with times.",
+        )
+        .build()
     )
-    ctx_summary = summarize_context(context)
 
-    messages = [
-        {
-            "role": "system",
-            "content": (
-                "You are Focus Buddy. Create a realistic, time-bounded plan "
-                "using both user history and context (calendar slots + tasks)."
-            ),
-        },
-        {
-            "role": "assistant",
-            "content": f"{avg_msg}\n\nContext:\n{ctx_summary}",
-        },
-        {
-            "role": "user",
-            "content": (
-                f"Goal: {goal}\n"
-                f"Duration: {duration}\n"
-                "Use one of the free slots if possible. Break the work into steps with times."
-            ),
-        },
-    ]
 
-    reply = llm.invoke(messages)
-    plan_text = reply.content if hasattr(reply, "content") else str(reply)
-
-    scheduled_info = None
-    if state.get("auto_schedule") and context.get("free_slots"):
-        first = context["free_slots"][0]
-        scheduled_info = mcp.call(
-            "calendar",
-            "add_event",
-            {
-                "title": f"Focus: {goal}",
-                "start_iso": first["start"],
-                "end_iso": first["end"],
-            },
-        )
-        if scheduled_info.get("ok"):
-            added = scheduled_info["added"]
-            plan_text += (
-                f"\n\n📅 Scheduled focus block: {added['start']} → {added['end']}"
-            )
-
-    # record a basic session entry (user feedback can add richer data later)
-    record_session(
-        goal=goal,
-        duration=duration,
-        reflection="Initial plan (pre-reflection)",
-        actual_focus=None,
-        fatigue_score=None,
-        breaks_taken=0,
+def _needs_reflection(state: State, plan_text: str) -> bool:
+    """Whether the reflector should run on this plan (see REFLECTION_MODE). Pass the LLM's draft:
+    the text with the scheduled-block line appended always names a free slot."""
+    stats = get_focus_stats(state["goal"], user_id=state.get("user_id"))
+    return should_reflect(
+        REFLECTION_MODE,
+        plan_text,
+        parse_duration_to_minutes(state["duration"]),
+        avg_focus=stats.get("goal_avg_focus") or stats.get("avg_focus"),
+        free_slots=state.get("context", {}).get("free_slots"),
     )
 
-    return {"messages": [{"role": "assistant", "content": plan_text}]}
 
+def _schedule_args(state: State) -> Dict[str, str] | None:
+    """add_event arguments for the first free slot, when auto-scheduling is on."""
+    context = state.get("context", {})
+    if not (state.get("auto_schedule") and context.get("free_slots")):
+        return None
+    first = context["free_slots"][0]
+    return {"title": f"Focus: {state['goal']}", "start_iso": first["start"], "end_iso": first["end"]}
 
-def research_agent(state: State):
-    goal = state["goal"]
-    ctx_summary = summarize_context(state.get("context", {}))
-    reply = llm.invoke(
-        [
-            {
-                "role": "system",
-                "content": (
-                    "You are a research-focused assistant. Use the given context only "
-                    "as background; propose concise research strategies."
-                ),
-            },
-            {"role": "assistant", "content": f"Context:\n{ctx_summary}"},
-            {"role": "user", "content": goal},
-        ]
+
+def _calendar_change(state: State) -> Tuple[str, Dict[str, Any]] | None:
+    """(tool, arguments) of the planner's calendar call: book the first free slot, or, when a run is
+    redone with auto_schedule turned off, remove the block the earlier run booked."""
+    args = _schedule_args(state)
+    if args:
+        return "add_event", args
+    if state.get("scheduled_event"):
+        return "remove_events", {"ids": [state["scheduled_event"]]}
+    return None
+
+
+def _with_schedule(plan_text: str, tool: str, result: Dict[str, Any]) -> Tuple[str, str | None]:
+    """(plan text, id of the booked event) after a _calendar_change call."""
+    if tool != "add_event" or not result.get("ok"):
+        return plan_text, None
+    added = result["added"]
+    return plan_text + f"\n\n📅 Scheduled focus block: {added['start']} → {added['end']}", added.get("id")
+
+
+def _session(state: State, reflection: str) -> Dict[str, Any]:
+    """record_session() arguments for an automatically stored entry."""
+    return {
+        "goal": state["goal"],
+        "duration": state["duration"],
+        "reflection": reflection,
+        "actual_focus": None,
+        "fatigue_score": None,
+        "breaks_taken": 0,
+        "task_type": state.get("task_type"),
+        "user_id": state.get("user_id"),
+    }
+
+
+def planner_agent(state: State):
+    draft = state.get("plan_draft") or generate(_planner_messages(state), "planner_agent", state.get("stream", False))
+    plan_text, booked = draft, None
+
+    change = _calendar_change(state)
+    if change:
+        result = get_mcp().call("calendar", *change, user_id=state.get("user_id"))
+        plan_text, booked = _with_schedule(plan_text, change[0], result)
+
+    # record a basic session entry (user feedback can add richer data later);
+    # a redo reuses the draft of a session that is already recorded
+    if not state.get("plan_draft"):
+        record_session(**_session(state, "Initial plan (pre-reflection)"))
+
+    return {
+        "messages": [{"role": "assistant", "content": plan_text}],
+        "plan_draft": draft,
+        "scheduled_event": booked,
+        "reflect": _needs_reflection(state, draft),
+    }
+
+
+async def aplanner_agent(state: State):
+    # the prompt and reflection check read memory stats, which may rebuild under the store's file lock
+    draft = state.get("plan_draft") or await agenerate(
+        await asyncio.to_thread(_planner_messages, state), "planner_agent", state.get("stream", False)
     )
-    return {"messages": [{"role": "assistant", "content": reply.content}]}
+    plan_text, booked = draft, None
 
+    change = _calendar_change(state)
+    if change:
+        result = await get_mcp().acall("calendar", *change, user_id=state.get("user_id"))
+        plan_text, booked = _with_schedule(plan_text, change[0], result)
 
-def motivator_agent(state: State):
-    goal = state["goal"]
-    reply = llm.invoke(
-        [
-            {
-                "role": "system",
-                "content": (
-                    "You are a motivational coach. Encourage the user and give a short, "
-                    "grounding affirmation tied to their goal."
-                ),
-            },
-            {"role": "user", "content": goal},
-        ]
+    # returns once queued, but blocks while the write queue is full, so keep it off the event loop
+    if not state.get("plan_draft"):
+        await asyncio.to_thread(record_session, **_session(state, "Initial plan (pre-reflection)"))
+
+    return {
+        "messages": [{"role": "assistant", "content": plan_text}],
+        "plan_draft": draft,
+        "scheduled_event": booked,
+        "reflect": await asyncio.to_thread(_needs_reflection, state, draft),
+    }
+
+
+def _research_messages(state: State) -> List[Dict[str, str]]:
+    ctx_summary = summarize_context(state.get("context", {}))
+    return (
+        PromptBuilder("research_agent")
+        .add(
+            "system",
+            "You are a research-focused assistant. Use the given context only "
+            "as background; propose concise research strategies.",
+        )
+        .add("assistant", Trim(f"Context:\n{ctx_summary}"))
+        .add("user", state["goal"])
+        .build()
     )
+
+
+def research_agent(state: State):
+    reply = get_llm().invoke(_research_messages(state))
     return {"messages": [{"role": "assistant", "content": reply.content}]}
 
 
-def reflection_agent(state: State):
-    last = state["messages"][-1]
-    text = last.content if hasattr(last, "content") else str(last)
-    recent = get_recent_sessions()
-    ctx_summary = summarize_context(state.get("context", {}))
+async def aresearch_agent(state: State):
+    reply = await get_async_llm().ainvoke(_research_messages(state))
+    return {"messages": [{"role": "assistant", "content": reply.content}]}
+
 
-    messages = [
+def _motivator_messages(state: State) -> List[Dict[str, str]]:
+    return [
         {
             "role": "system",
             "content": (
-                "You are the Reflector. Improve the plan using:\n"
-                "- pacing and realism\n"
-                "- user’s past focus patterns\n"
-                "- current context (calendar + tasks)\n"
-                "Keep edits small but meaningful."
+                "You are a motivational coach. Encourage the user and give a short, "
+                "grounding affirmation tied to their goal."
             ),
         },
-        {"role": "assistant", "content": text},
-        {
-            "role": "user",
-            "content": f"Recent sessions:\n{recent}\n\nContext recap:\n{ctx_summary}",
-        },
+        {"role": "user", "content": state["goal"]},
     ]
-    reflection = llm.invoke(messages)
-    reflection_text = reflection.content if hasattr(reflection, "content") else str(reflection)
 
-    # store reflection as another memory entry
-    record_session(
-        goal=state["goal"],
-        duration=state["duration"],
-        reflection=reflection_text,
-        actual_focus=None,
-        fatigue_score=None,
-        breaks_taken=0,
+
+def motivator_agent(state: State):
+    reply = get_llm().invoke(_motivator_messages(state))
+    return {"messages": [{"role": "assistant", "content": reply.content}]}
+
+
+async def amotivator_agent(state: State):
+    reply = await get_async_llm().ainvoke(_motivator_messages(state))
+    return {"messages": [{"role": "assistant", "content": reply.content}]}
+
+
+def _reflection_messages(state: State) -> List[Dict[str, str]]:
+    last = state["messages"][-1]
+    text = last.content if hasattr(last, "content") else str(last)
+    recent = get_recent_digests(user_id=state.get("user_id"))
+    ctx_summary = summarize_context(state.get("context", {}))
+
+    # the plan under review is never trimmed; memory digests and context recap are
+    return (
+        PromptBuilder("reflection_agent")
+        .add(
+            "system",
+            "You are the Reflector. Improve the plan using:\n"
+            "- pacing and realism\n"
+            "- user’s past focus patterns\n"
+            "- current context (calendar + tasks)\n"
+            "Keep edits small but meaningful.",
+        )
+        .add("assistant", text)
+        .add("user", Trim(f"Recent sessions:\n{recent}"), Trim(f"Context recap:\n{ctx_summary}"))
+        .build()
     )
 
+
+def reflection_agent(state: State):
+    t0 = time.perf_counter()
+    reflection_text = generate(_reflection_messages(state), "reflection_agent", state.get("stream", False))
+    record_reflection(time.perf_counter() - t0)
+
+    # store reflection as another memory entry
+    record_session(**_session(state, reflection_text))
+
+    return {"messages": [{"role": "assistant", "content": reflection_text}]}
+
+
+async def areflection_agent(state: State):
+    t0 = time.perf_counter()
+    messages = await asyncio.to_thread(_reflection_messages, state)
+    reflection_text = await agenerate(messages, "reflection_agent", state.get("stream", False))
+    record_reflection(time.perf_counter() - t0)
+    await asyncio.to_thread(record_session, **_session(state, reflection_text))
     return {"messages": [{"role": "assistant", "content": reflection_text}]}
 
 
 # ------------------ Build Graph ----------------------
-graph_builder = StateGraph(State)
-graph_builder.add_node("context_agent", context_agent)
-graph_builder.add_node("classifier", classify_task)
-graph_builder.add_node("router", router)
-graph_builder.add_node("planner_agent", planner_agent)
-graph_builder.add_node("research_agent", research_agent)
-graph_builder.add_node("motivator_agent", motivator_agent)
-graph_builder.add_node("reflection_agent", reflection_agent)
-
-graph_builder.add_edge(START, "context_agent")
-graph_builder.add_edge("context_agent", "classifier")
-graph_builder.add_edge("classifier", "router")
-
-graph_builder.add_conditional_edges(
-    "router",
-    lambda st: st.get("next"),
-    {
-        "planner_agent": "planner_agent",
-        "research_agent": "research_agent",
-        "motivator_agent": "motivator_agent",
-    },
-)
+def build_graph(parallel: bool = True, use_async: bool = False) -> "StateGraph":
+    """
+    parallel=True: context_agent and classifier fan out from START and join at router
+    (classification only needs the goal). parallel=False keeps the old linear chain,
+    which the fan-out benchmark uses as its baseline.
+    use_async=True wires the async node variants (run with ainvoke / astream).
+    """
+    from langgraph.graph import StateGraph, START, END
+
+    builder = StateGraph(State)
+    nodes = {
+        "context_agent": acontext_agent if use_async else context_agent,
+        "classifier": aclassify_task if use_async else classify_task,
+        "router": router,
+        "planner_agent": aplanner_agent if use_async else planner_agent,
+        "research_agent": aresearch_agent if use_async else research_agent,
+        "motivator_agent": amotivator_agent if use_async else motivator_agent,
+        "reflection_agent": areflection_agent if use_async else reflection_agent,
+    }
+    for name, fn in nodes.items():
+        builder.add_node(name, instrument(f"node.{name}")(fn))
 
-graph_builder.add_edge("planner_agent", "reflection_agent")
-graph_builder.add_edge("research_agent", "reflection_agent")
-graph_builder.add_edge("motivator_agent", "reflection_agent")
-graph_builder.add_edge("reflection_agent", END)
+    if parallel:
+        builder.add_edge(START, "context_agent")
+        builder.add_edge(START, "classifier")
+        builder.add_edge(["context_agent", "classifier"], "router")
+    else:
+        builder.add_edge(START, "context_agent")
+        builder.add_edge("context_agent", "classifier")
+        builder.add_edge("classifier", "router")
+
+    builder.add_conditional_edges(
+        "router",
+        lambda st: st.get("next"),
+        {
+            "planner_agent": "planner_agent",
+            "research_agent": "research_agent",
+            "motivator_agent": "motivator_agent",
+        },
+    )
 
-graph = graph_builder.compile()
+    builder.add_conditional_edges(
+        "planner_agent",
+        lambda st: "reflection_agent" if st.get("reflect", True) else END,
+        {"reflection_agent": "reflection_agent", END: END},
+    )
+    builder.add_edge("research_agent", "reflection_agent")
+    builder.add_edge("motivator_agent", "reflection_agent")
+    builder.add_edge("reflection_agent", END)
+    return builder
 
 
 # --------------- Public Runner ----------------------
-def run_focus_session_v4(goal: str, duration: str = "2 hours", auto_schedule: bool = False) -> str:
-    state: State = {
+def _initial_state(
+    goal: str,
+    duration: str,
+    auto_schedule: bool,
+    stream: bool = False,
+    context: Dict[str, Any] | None = None,
+    user_id: str | None = None,
+) -> State:
+    return {
         "goal": goal,
         "duration": duration,
         "messages": [],
         "task_type": None,
-        "context": {},
+        "context": context or {},
         "auto_schedule": auto_schedule,
+        "stream": stream,
+        "user_id": user_id,
+        "plan_draft": None,
+        "scheduled_event": None,
+    }
+
+
+def _content(message) -> str:
+    if isinstance(message, dict):
+        return message.get("content", "")
+    return message.content if hasattr(message, "content") else str(message)
+
+
+def _prepare(graph, state: State, run_id: str | None):
+    """
+    (input, config, finished text) for one run. Without a run_id: a fresh run, nothing saved.
+    With one (checkpointed graph), depending on what is stored under it:
+      nothing                    -> the initial state
+      an unfinished run          -> None: continue after the last completed node
+      only auto_schedule changed -> None from a fork of the checkpoint before the planner,
+                                    which reuses the stored draft instead of calling the LLM,
+                                    books a slot or removes the earlier booking, and does not
+                                    record the session a second time
+      a finished run             -> its final text; nothing runs again
+    """
+    if run_id is None:
+        return state, None, None
+    config = {"configurable": {"thread_id": run_id}}
+    saved = graph.get_state(config)
+    values = saved.values
+    if not values:
+        return state, config, None
+    if any(values.get(key) != state[key] for key in ("goal", "duration", "user_id")):
+        raise ValueError(f"run {run_id!r} was started for another goal, duration or user")
+    if values.get("auto_schedule") != state["auto_schedule"]:
+        for snapshot in graph.get_state_history(config):
+            if snapshot.next == ("planner_agent",):
+                update = {
+                    "auto_schedule": state["auto_schedule"],
+                    "plan_draft": values.get("plan_draft"),
+                    "scheduled_event": values.get("scheduled_event"),  # removed by the planner when turned off
+                    "next": "planner_agent",  # the router's output, which picks the branch
+                }
+                return None, graph.update_state(snapshot.config, update, as_node="router"), None
+        if saved.next:
+            return state, config, None  # failed before the planner: start over with the new setting
+    if saved.next:
+        return None, config, None
+    return None, config, _content(values["messages"][-1])
+
+
+def _final_text(graph, config, streamed: str) -> str:
+    """Text of the last message: what streamed, else (a resumed run that only redid silent nodes) the saved state."""
+    if streamed or config is None:
+        return streamed
+    return _content(graph.get_state(config).values["messages"][-1])
+
+
+def run_focus_session_v4(
+    goal: str,
+    duration: str = "2 hours",
+    auto_schedule: bool = False,
+    user_id: str | None = None,
+    run_id: str | None = None,
+) -> str:
+    """
+    Plan one session; `user_id` selects that user's memory, calendar and tasks (None = shared files).
+    `run_id` checkpoints the run (CHECKPOINT_PATH): calling again with the same id resumes a
+    failed run, reuses the plan when only auto_schedule changed, or returns the finished answer.
+    """
+    graph = get_graph(checkpointed=run_id is not None)
+    state, config, finished = _prepare(graph, _initial_state(goal, duration, auto_schedule, user_id=user_id), run_id)
+    if finished is not None:
+        return finished
+    with run_trace("run_focus_session_v4"):
+        final_state = graph.invoke(state, config)
+    return _content(final_state["messages"][-1])
+
+
+async def arun_focus_session_v4(
+    goal: str,
+    duration: str = "2 hours",
+    auto_schedule: bool = False,
+    user_id: str | None = None,
+    run_id: str | None = None,
+) -> str:
+    """Async run_focus_session_v4: LLM and MCP calls are awaited, so one event loop can serve many sessions."""
+    graph = get_async_graph(checkpointed=run_id is not None)
+    state, config, finished = await asyncio.to_thread(
+        _prepare, graph, _initial_state(goal, duration, auto_schedule, user_id=user_id), run_id
+    )
+    if finished is not None:
+        return finished
+    with run_trace("arun_focus_session_v4"):
+        final_state = await graph.ainvoke(state, config)
+    return _content(final_state["messages"][-1])
+
+
+def _stream_events(mode: str, chunk: Dict[str, Any], final: List[str]) -> Iterator[Dict[str, Any]]:
+    if mode == "custom":
+        yield {"type": "token", **chunk}
+        return
+    for node, update in chunk.items():
+        messages = (update or {}).get("messages") or []
+        if messages:
+            final[0] = _content(messages[-1])
+        yield {"type": "node", "node": node}
+
+
+def stream_focus_session_v4(
+    goal: str,
+    duration: str = "2 hours",
+    auto_schedule: bool = False,
+    user_id: str | None = None,
+    run_id: str | None = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Same run as run_focus_session_v4, but yields progress as it happens:
+      {"type": "node", "node": name}                 when a node finishes
+      {"type": "token", "node": name, "text": chunk} planner / reflector output chunks
+      {"type": "final", "text": final_text, "run": breakdown}
+                                                     once, at the end; `breakdown` is this run's
+                                                     run_trace record (None if nothing ran)
+    A resumed run (run_id) only reports the nodes it still had to run.
+    """
+    final, run = [""], None
+    graph = get_graph(checkpointed=run_id is not None)
+    state = _initial_state(goal, duration, auto_schedule, stream=True, user_id=user_id)
+    state, config, finished = _prepare(graph, state, run_id)
+    if finished is None:
+        with run_trace("stream_focus_session_v4") as run:
+            for mode, chunk in graph.stream(state, config, stream_mode=["updates", "custom"]):
+                yield from _stream_events(mode, chunk, final)
+        finished = _final_text(graph, config, final[0])
+    yield {"type": "final", "text": finished, "run": run}
+
+
+async def astream_focus_session_v4(
+    goal: str,
+    duration: str = "2 hours",
+    auto_schedule: bool = False,
+    user_id: str | None = None,
+    run_id: str | None = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Async stream_focus_session_v4 (same events)."""
+    final, run = [""], None
+    graph = get_async_graph(checkpointed=run_id is not None)
+    state = _initial_state(goal, duration, auto_schedule, stream=True, user_id=user_id)
+    state, config, finished = await asyncio.to_thread(_prepare, graph, state, run_id)
+    if finished is None:
+        with run_trace("astream_focus_session_v4") as run:
+            async for mode, chunk in graph.astream(state, config, stream_mode=["updates", "custom"]):
+                for event in _stream_events(mode, chunk, final):
+                    yield event
+        finished = await asyncio.to_thread(_final_text, graph, config, final[0])
+    yield {"type": "final", "text": finished, "run": run}
+
+
+def _batch_contexts(items, snapshots, durations) -> List[Dict[str, Any]]:
+    """
+    Each item's context, in request order. An auto-scheduling item books the first of its free
+    slots that no earlier item of the same user booked, and later items of that user no longer
+    see slots overlapping it; an item left without a free slot is planned but not booked.
+    """
+    booked: Dict[str | None, List[tuple]] = {}
+    contexts = []
+    for _, duration, auto_schedule, user_id in items:
+        context = dict(snapshots[user_id][durations[duration]])
+        taken = booked.setdefault(user_id, [])
+        # ISO minute strings of one calendar compare in time order
+        context["free_slots"] = [
+            slot for slot in context.get("free_slots") or []
+            if all(slot["end"] <= start or slot["start"] >= end for start, end in taken)
+        ]
+        if auto_schedule and context["free_slots"]:
+            taken.append((context["free_slots"][0]["start"], context["free_slots"][0]["end"]))
+        contexts.append(context)
+    return contexts
+
+
+def _failed_item(request, error: Exception) -> Dict[str, Any]:
+    """Result of a batch request that could not be read (bad shape or duration)."""
+    fields = list(request[:2]) if isinstance(request, (list, tuple)) else []
+    fields += [None] * (2 - len(fields))
+    return {"goal": fields[0], "duration": fields[1], "ok": False, "result": None,
+            "error": f"{type(error).__name__}: {error}", "seconds": 0.0}
+
+
+def run_focus_sessions_batch(requests: Sequence, max_concurrency: int = 4) -> Dict[str, Any]:
+    """
+    Plan many goals at once. `requests` holds (goal, duration[, auto_schedule[, user_id]]) tuples.
+    Calendar/task context is fetched once per batch (one snapshot per user and distinct
+    duration) and shared by that user's items; graph runs use at most `max_concurrency` threads.
+    Auto-scheduling items book distinct slots, allocated in request order (see _batch_contexts).
+    Returns {"items": [...in request order...], "context_seconds", "total_seconds"};
+    each item has goal, duration, ok, result, error and seconds. One failing item (a
+    malformed request or duration included) never fails the batch.
+    """
+    t_start = time.perf_counter()
+    prepared, durations = [], {}
+    for request in requests:
+        try:
+            item = (request[0], request[1], bool(request[2]) if len(request) > 2 else False,
+                    request[3] if len(request) > 3 else None)
+            durations[item[1]] = parse_duration_to_minutes(item[1])
+            prepared.append(item)
+        except Exception as e:
+            prepared.append(_failed_item(request, e))
+    items = [item for item in prepared if isinstance(item, tuple)]
+    per_user: Dict[str | None, set] = {}
+    bookings: Dict[str | None, int] = {}
+    for _, duration, auto_schedule, user_id in items:
+        per_user.setdefault(user_id, set()).add(durations[duration])
+        bookings[user_id] = bookings.get(user_id, 0) + auto_schedule
+    # suggested slots overlap their neighbour (staggered by half a block): two more per booking
+    snapshots = {
+        user_id: fetch_contexts(list(mins), user_id, max_slots=3 + 2 * bookings[user_id])
+        for user_id, mins in per_user.items()
+    }
+    context_seconds = time.perf_counter() - t_start
+
+    contexts = _batch_contexts(items, snapshots, durations)
+
+    def run_one(item, context):
+        goal, duration, auto_schedule, user_id = item
+        t0 = time.perf_counter()
+        out = {"goal": goal, "duration": duration, "ok": True, "result": None, "error": None}
+        try:
+            state = _initial_state(goal, duration, auto_schedule, context=context, user_id=user_id)
+            out["result"] = _content(get_graph().invoke(state)["messages"][-1])
+        except Exception as e:
+            out["ok"], out["error"] = False, f"{type(e).__name__}: {e}"
+        out["seconds"] = round(time.perf_counter() - t0, 3)
+        return out
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+        results = iter(pool.map(run_one, items, contexts))
+    return {
+        "items": [next(results) if isinstance(item, tuple) else item for item in prepared],
+        "context_seconds": round(context_seconds, 3),
+        "total_seconds": round(time.perf_counter() - t_start, 3),
     }
-    final_state = graph.invoke(state)
-    last = final_state["messages"][-1]
-    return last.content if hasattr(last, "content") else str(last)
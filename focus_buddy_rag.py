@@ -7,18 +7,70 @@ It searches for focus/productivity insights and integrates them into the plan.
 
 import os
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_community.utilities import SerpAPIWrapper
-from langchain_core.prompts import PromptTemplate
 
 # Load environment variables
 load_dotenv()
 openai_api_key = os.getenv("OPEN_API_KEY")
 serpapi_api_key = os.getenv("SERPAPI_API_KEY")
 
-# Initialize tools
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.6, api_key=openai_api_key)
-search = SerpAPIWrapper(serpapi_api_key= serpapi_api_key)
+# Retrieval cache: web search only runs when neither the exact query nor the local snippet index match
+RAG_CACHE_PATH = os.getenv("RAG_CACHE_PATH", "focus_retrieval.sqlite3")
+RAG_CACHE_TTL = float(os.getenv("RAG_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+RAG_CACHE_SIMILARITY = float(os.getenv("RAG_CACHE_SIMILARITY", "0.75"))  # 0 = exact tier only
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "5"))
+SEARCH_QUERY = "focus and productivity strategies for {task}"
+
+# Tools are created (and langchain imported) on first use, not at import
+_tools = {}
+
+
+def get_llm():
+    if "llm" not in _tools:
+        from langchain_openai import ChatOpenAI
+        _tools["llm"] = ChatOpenAI(model="gpt-4o-mini", temperature=0.6, api_key=openai_api_key)
+    return _tools["llm"]
+
+
+def get_search():
+    if "search" not in _tools:
+        from langchain_community.utilities import SerpAPIWrapper
+        _tools["search"] = SerpAPIWrapper(serpapi_api_key=serpapi_api_key)
+    return _tools["search"]
+
+
+def get_retrieval_cache():
+    if "cache" not in _tools:
+        from retrieval_cache import RetrievalCache
+        _tools["cache"] = RetrievalCache(
+            RAG_CACHE_PATH,
+            ttl_seconds=RAG_CACHE_TTL,
+            similarity_threshold=RAG_CACHE_SIMILARITY,
+            top_k=RAG_TOP_K,
+        )
+    return _tools["cache"]
+
+
+def retrieve(task: str) -> str:
+    """Search context for a task: cached result, similar indexed snippets, or a web search on a miss."""
+    context, _ = get_retrieval_cache().retrieve(
+        task, lambda t: get_search().run(SEARCH_QUERY.format(task=t))
+    )
+    return context
+
+
+def get_retrieval_stats():
+    """{queries, snippets, hits_exact, hits_index, hits_stale, misses, hit_rate}."""
+    return get_retrieval_cache().stats()
+
+
+def get_prompt():
+    if "prompt" not in _tools:
+        from langchain_core.prompts import PromptTemplate
+        _tools["prompt"] = PromptTemplate(
+            input_variables=["task", "duration", "context"],
+            template=template,
+        )
+    return _tools["prompt"]
 
 # Prompt Template 
 template = """
@@ -50,27 +102,21 @@ Format output as:
 ...
 """
 
-prompt = PromptTemplate(
-    input_variables=["task", "duration", "context"],
-    template=template,
-)
-
 # Core Function 
 def run_agentic_rag(task: str, duration: str) -> str:
     """
     Runs a simple Retrieval-Augmented Generation (RAG) pipeline.
-    1. Searches the web for relevant insights.
+    1. Retrieves relevant insights (local cache/index first, web search on a miss).
     2. Injects context into the LLM.
     3. Generates a structured focus plan.
     """
     try:
         # Step 1 - Retrieve relevant info
-        query = f"focus and productivity strategies for {task}"
-        context = search.run(query)
+        context = retrieve(task)
 
         # Step 2 - Reason & generate plan
-        final_prompt = prompt.format(task=task, duration=duration, context=context)
-        result = llm.invoke(final_prompt)
+        final_prompt = get_prompt().format(task=task, duration=duration, context=context)
+        result = get_llm().invoke(final_prompt)
 
         return result.content
 
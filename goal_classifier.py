@@ -0,0 +1,229 @@
+"""
+Local fast-path goal classifier in front of the LLM classifier.
+Tiers, cheapest first:
+  1. keyword/regex rules
+  2. bag-of-words naive Bayes trained from goals in the memory store
+  3. LLM fallback (only when both local tiers are unsure); its answer is fed back into tier 2
+Hit rate and per-tier latency are available via get_classifier_stats().
+"""
+
+from __future__ import annotations
+import asyncio
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from typing import Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from memory_manager import get_store
+
+LABELS = ("focus", "research", "motivation")
+RULE_MIN_CONFIDENCE = 0.75
+MODEL_MIN_CONFIDENCE = 0.8
+MODEL_MIN_EXAMPLES = 20      # don't trust the model before it has seen this many goals
+LATENCY_WINDOW = 1000        # latency samples kept per tier
+
+# (pattern, weight) per label; research/motivation cues outweigh generic "do the work" verbs
+RULES: Dict[str, List[Tuple[re.Pattern, float]]] = {
+    "research": [
+        (re.compile(r"\b(research|literature|lit review|survey|investigat\w*|explor\w*)\b"), 2.0),
+        (re.compile(r"\b(learn (about|how)|read (up|papers?|about)|compare|find out|look into|understand)\b"), 1.5),
+        (re.compile(r"\b(papers?|sources|references|state of the art)\b"), 1.0),
+    ],
+    "motivation": [
+        (re.compile(r"\b(motivat\w*|procrastinat\w*|unmotivated|overwhelm\w*|burn(ed|t)? ?out)\b"), 2.0),
+        (re.compile(r"\b(stuck|lazy|anxious|stressed|can'?t (start|focus|get started)|get started|encourage\w*)\b"), 1.5),
+        (re.compile(r"\b(confidence|mood|tired|exhausted)\b"), 1.0),
+    ],
+    "focus": [
+        (re.compile(r"\b(finish|complete|write|draft|build|implement|code|fix|debug|ship|prepare|edit|revise)\b"), 1.0),
+        (re.compile(r"\b(report|essay|slides|deck|presentation|assignment|homework|chapter|pr|feature)\b"), 0.5),
+        (re.compile(r"\b(deep work|focus session|pomodoro|study)\b"), 1.5),
+    ],
+}
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+def _features(goal: str) -> List[str]:
+    words = _WORD.findall(goal.lower())
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+class RuleClassifier:
+    def predict(self, goal: str) -> Tuple[Optional[str], float]:
+        text = goal.lower()
+        scores = {
+            label: sum(w for pat, w in pats if pat.search(text))
+            for label, pats in RULES.items()
+        }
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        (top, top_score), (_, second) = ranked[0], ranked[1]
+        if top_score == 0:
+            return None, 0.0
+        if second == 0:
+            return top, min(0.6 + 0.15 * top_score, 0.95)
+        return top, 0.95 * (top_score - second) / top_score
+
+
+class NaiveBayesClassifier:
+    """Multinomial naive Bayes over word + bigram counts; supports incremental updates."""
+
+    def __init__(self):
+        self.doc_counts: Counter = Counter()
+        self.token_counts: Dict[str, Counter] = defaultdict(Counter)
+        self.token_totals: Counter = Counter()
+        self.vocab: set = set()
+
+    @property
+    def n_examples(self) -> int:
+        return sum(self.doc_counts.values())
+
+    def learn(self, goal: str, label: str) -> None:
+        feats = _features(goal)
+        self.doc_counts[label] += 1
+        self.token_counts[label].update(feats)
+        self.token_totals[label] += len(feats)
+        self.vocab.update(feats)
+
+    def predict(self, goal: str) -> Tuple[Optional[str], float]:
+        if not self.n_examples:
+            return None, 0.0
+        feats = _features(goal)
+        v = len(self.vocab) or 1
+        logp = {}
+        for label in LABELS:
+            prior = (self.doc_counts[label] + 1) / (self.n_examples + len(LABELS))
+            denom = self.token_totals[label] + v
+            counts = self.token_counts[label]
+            logp[label] = math.log(prior) + sum(math.log((counts[f] + 1) / denom) for f in feats)
+        top = max(logp, key=logp.get)
+        z = sum(math.exp(lp - logp[top]) for lp in logp.values())
+        return top, 1.0 / z
+
+
+def _percentile(sorted_vals: List[float], q: float) -> float:
+    idx = min(int(round(q * (len(sorted_vals) - 1))), len(sorted_vals) - 1)
+    return sorted_vals[idx]
+
+
+class GoalClassifier:
+    def __init__(self):
+        self.rules = RuleClassifier()
+        self.model = NaiveBayesClassifier()
+        self._trained = False
+        self._lock = threading.Lock()
+        self._train_lock = threading.Lock()  # one memory scan, however many first requests race
+        self._hits: Counter = Counter()
+        self._latency: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def train(self, examples: Iterable[Tuple[str, str]]) -> int:
+        n = 0
+        with self._lock:
+            for goal, label in examples:
+                if goal and label in LABELS:
+                    self.model.learn(goal, label)
+                    n += 1
+            self._trained = True
+        return n
+
+    def _ensure_trained(self) -> None:
+        if not self._trained:
+            with self._train_lock:
+                if not self._trained:
+                    self.train(examples_from_memory())
+
+    def predict(self, goal: str) -> Tuple[Optional[str], float, str]:
+        """Local tiers only: (label, confidence, tier); label is None when both are unsure."""
+        label, conf = self.rules.predict(goal)
+        if label and conf >= RULE_MIN_CONFIDENCE:
+            return label, conf, "rules"
+        self._ensure_trained()
+        if self.model.n_examples >= MODEL_MIN_EXAMPLES:
+            m_label, m_conf = self.model.predict(goal)
+            if m_label and m_conf >= MODEL_MIN_CONFIDENCE:
+                return m_label, m_conf, "model"
+        return None, max(conf, 0.0), "none"
+
+    def classify(self, goal: str, fallback: Optional[Callable[[str], str]] = None) -> str:
+        t0 = time.perf_counter()
+        label, _, tier = self.predict(goal)
+        if label is None:
+            if fallback is None:
+                label, tier = "focus", "default"
+            else:
+                label, tier = fallback(goal), "llm"
+                with self._lock:
+                    self.model.learn(goal, label)
+        self._record(tier, time.perf_counter() - t0)
+        return label
+
+    async def aclassify(self, goal: str, fallback: Optional[Callable[[str], Awaitable[str]]] = None) -> str:
+        """classify() with an async fallback, awaited only when the local tiers are unsure.
+        Until the model is trained, predict() may scan the memory store, so it runs in a thread."""
+        t0 = time.perf_counter()
+        label, _, tier = self.predict(goal) if self._trained else await asyncio.to_thread(self.predict, goal)
+        if label is None:
+            if fallback is None:
+                label, tier = "focus", "default"
+            else:
+                label, tier = await fallback(goal), "llm"
+                with self._lock:
+                    self.model.learn(goal, label)
+        self._record(tier, time.perf_counter() - t0)
+        return label
+
+    def _record(self, tier: str, elapsed: float) -> None:
+        with self._lock:
+            self._hits[tier] += 1
+            self._latency[tier].append(elapsed)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            total = sum(self._hits.values())
+            local = self._hits["rules"] + self._hits["model"]
+            latency = {}
+            for tier, samples in self._latency.items():
+                vals = sorted(samples)
+                latency[tier] = {
+                    "count": len(vals),
+                    "p50_ms": round(_percentile(vals, 0.50) * 1000, 3),
+                    "p95_ms": round(_percentile(vals, 0.95) * 1000, 3),
+                    "max_ms": round(vals[-1] * 1000, 3),
+                }
+            return {
+                "requests": total,
+                "by_tier": dict(self._hits),
+                "local_hit_rate": round(local / total, 3) if total else None,
+                "model_examples": self.model.n_examples,
+                "latency": latency,
+            }
+
+
+def examples_from_memory() -> List[Tuple[str, str]]:
+    """(goal, task_type) pairs from the memory store, one per distinct pair."""
+    seen = set()
+    for e in get_store().iter_entries():
+        goal = (e.get("goal") or "").strip()
+        label = e.get("task_type")
+        if label is None and e.get("reflection") == "Initial plan (pre-reflection)":
+            label = "focus"  # only the planner writes this entry
+        if goal and label in LABELS:
+            seen.add((goal.lower(), label))
+    return sorted(seen)
+
+
+classifier = GoalClassifier()
+
+
+def classify_goal(goal: str, fallback: Optional[Callable[[str], str]] = None) -> str:
+    return classifier.classify(goal, fallback)
+
+
+async def aclassify_goal(goal: str, fallback: Optional[Callable[[str], Awaitable[str]]] = None) -> str:
+    return await classifier.aclassify(goal, fallback)
+
+
+def get_classifier_stats() -> Dict[str, object]:
+    return classifier.stats()
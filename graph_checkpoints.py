@@ -0,0 +1,259 @@
+"""
+SQLite checkpointer for the focus graph (a LangGraph BaseCheckpointSaver).
+- One thread per run id: every super-step's checkpoint, the writes of nodes that
+  finished inside a failed step, and channel values stored once per version
+  (the context snapshot and messages are not copied into every checkpoint)
+- Resuming a run id continues after the last completed node; nodes that already
+  finished are not called again
+- Runs older than CHECKPOINT_TTL are pruned when the file is opened and again every
+  PRUNE_EVERY checkpoints, so a long-lived server's file stops growing
+Same role as langgraph-checkpoint-sqlite's SqliteSaver, without the extra dependency.
+"""
+
+from __future__ import annotations
+import asyncio
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+DEFAULT_TTL = 7 * 24 * 3600
+PRUNE_EVERY = 500  # checkpoints written between prunes of expired runs
+
+
+def _config(thread_id: str, ns: str, checkpoint_id: str) -> Dict[str, Any]:
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint_id}}
+
+
+class SqliteCheckpointer(BaseCheckpointSaver):
+    def __init__(self, path, ttl_seconds: Optional[float] = DEFAULT_TTL):
+        super().__init__()
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self._puts = 0
+        self._lock = threading.Lock()  # guards the shared connection
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")  # survives an app crash; a retry aid, not a ledger
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                parent_id TEXT,
+                type TEXT NOT NULL,
+                checkpoint BLOB NOT NULL,
+                metadata_type TEXT NOT NULL,
+                metadata BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (thread_id, ns, checkpoint_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_checkpoints_created ON checkpoints(created_at);
+            CREATE TABLE IF NOT EXISTS blobs (
+                thread_id TEXT NOT NULL,
+                ns TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                version TEXT NOT NULL,
+                type TEXT NOT NULL,
+                value BLOB,
+                PRIMARY KEY (thread_id, ns, channel, version)
+            );
+            CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT NOT NULL,
+                ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                channel TEXT NOT NULL,
+                type TEXT NOT NULL,
+                value BLOB,
+                task_path TEXT NOT NULL,
+                PRIMARY KEY (thread_id, ns, checkpoint_id, task_id, idx)
+            );
+            """
+        )
+        self._conn.commit()
+        if ttl_seconds:
+            self.prune_older_than(ttl_seconds)
+
+    # ------------------ Reads ----------------------
+    def _tuple(self, thread_id: str, ns: str, row: Tuple) -> CheckpointTuple:
+        """Row of (checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata). Caller holds the lock."""
+        checkpoint_id, parent_id, type_, blob, meta_type, meta = row
+        checkpoint = self.serde.loads_typed((type_, blob))
+        values = {}
+        for channel, version in checkpoint["channel_versions"].items():
+            found = self._conn.execute(
+                "SELECT type, value FROM blobs WHERE thread_id = ? AND ns = ? AND channel = ? AND version = ?",
+                (thread_id, ns, channel, str(version)),
+            ).fetchone()
+            if found and found[0] != "empty":
+                values[channel] = self.serde.loads_typed(found)
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM writes WHERE thread_id = ? AND ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_path, task_id, idx",
+            (thread_id, ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config=_config(thread_id, ns, checkpoint_id),
+            checkpoint={**checkpoint, "channel_values": values},
+            metadata=self.serde.loads_typed((meta_type, meta)),
+            parent_config=_config(thread_id, ns, parent_id) if parent_id else None,
+            pending_writes=[(task_id, channel, self.serde.loads_typed((t, v))) for task_id, channel, t, v in writes],
+        )
+
+    def get_tuple(self, config) -> Optional[CheckpointTuple]:
+        """The checkpoint named in `config`, or the thread's latest one."""
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        columns = "checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id:
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND ns = ? AND checkpoint_id = ?",
+                    (thread_id, ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, ns),
+                ).fetchone()
+            return self._tuple(thread_id, ns, row) if row else None
+
+    def list(self, config, *, filter: Optional[Dict[str, Any]] = None, before=None,
+             limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        """Newest first; `filter` matches metadata keys."""
+        query = "SELECT thread_id, ns, checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata FROM checkpoints"
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                where.append("ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(get_checkpoint_id(config))
+        if before and get_checkpoint_id(before):
+            where.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            out: List[CheckpointTuple] = []
+            for thread_id, ns, *row in rows:
+                if limit is not None and len(out) >= limit:
+                    break
+                if filter:
+                    metadata = self.serde.loads_typed((row[4], row[5]))
+                    if not all(metadata.get(k) == v for k, v in filter.items()):
+                        continue
+                out.append(self._tuple(thread_id, ns, tuple(row)))
+        yield from out
+
+    # ------------------ Writes ----------------------
+    def put(self, config, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> Dict[str, Any]:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        stored = dict(checkpoint)
+        values = stored.pop("channel_values")
+        blobs = [
+            (thread_id, ns, channel, str(version),
+             *(self.serde.dumps_typed(values[channel]) if channel in values else ("empty", None)))
+            for channel, version in new_versions.items()
+        ]
+        type_, blob = self.serde.dumps_typed(stored)
+        meta_type, meta = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blobs)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 type_, blob, meta_type, meta, time.time()),
+            )
+            self._conn.commit()
+            self._puts += 1
+            prune = self.ttl_seconds and self._puts % PRUNE_EVERY == 0
+        if prune:
+            self.prune_older_than(self.ttl_seconds)
+        return _config(thread_id, ns, checkpoint["id"])
+
+    def put_writes(self, config, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        """Writes of a task that finished inside a step that has not completed (kept so a resume skips it)."""
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = [
+            (thread_id, ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx), channel,
+             *self.serde.dumps_typed(value), task_path)
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        # special writes (errors, interrupts) replace the previous one; regular writes are written once
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        with self._lock:
+            self._conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            for table in ("checkpoints", "blobs", "writes"):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            self._conn.commit()
+
+    def prune_older_than(self, seconds: float) -> int:
+        """Deletes runs whose latest checkpoint is older than `seconds`; returns how many."""
+        with self._lock:
+            stale = [
+                r[0] for r in self._conn.execute(
+                    "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?",
+                    (time.time() - seconds,),
+                )
+            ]
+        for thread_id in stale:
+            self.delete_thread(thread_id)
+        return len(stale)
+
+    def get_next_version(self, current, channel=None) -> str:
+        # random suffix: a run forked from an older checkpoint never reuses a stored blob's version
+        current_v = 0 if current is None else current if isinstance(current, int) else int(str(current).split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ------------------ Async (the async graph) ----------------------
+    async def aget_tuple(self, config) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None) -> AsyncIterator[CheckpointTuple]:
+        for item in await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit))):
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id: str, task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
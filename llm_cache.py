@@ -0,0 +1,257 @@
+"""
+Response cache around the chat LLM.
+- Exact tier: hash of the normalized message list (+ model settings)
+- Similarity tier (optional): cosine similarity of a local hashed n-gram embedding of
+  the goal (the `Goal:` field of the last user message, else the whole message), only
+  among entries whose other messages and instruction text are identical and whose
+  numbers (durations, times) match — so a changed context summary (calendar slots,
+  tasks, memory) or duration is always a miss
+- TTL expiry and LRU eviction
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from metrics import span, usage_of
+
+EMBED_DIM = 256
+_WS = re.compile(r"\s+")
+_NUM = re.compile(r"\d+(?:[.:]\d+)?")
+_WORD = re.compile(r"\w+")
+_GOAL = re.compile(r"^Goal:[ \t]*(.*)$", re.MULTILINE)
+
+
+def normalize_messages(messages) -> List[Tuple[str, str]]:
+    """(role, text) pairs with whitespace collapsed; accepts a prompt string, dicts or message objects."""
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+    out = []
+    for m in messages:
+        if isinstance(m, dict):
+            role, content = m.get("role", "user"), m.get("content", "")
+        else:
+            role, content = getattr(m, "type", "user"), getattr(m, "content", str(m))
+        out.append((role, _WS.sub(" ", str(content)).strip()))
+    return out
+
+
+def _raw_content(messages, i: int) -> str:
+    """Content of message `i` before whitespace normalization (field lines are still separate)."""
+    if isinstance(messages, str):
+        return messages
+    m = messages[i]
+    return str(m.get("content", "") if isinstance(m, dict) else getattr(m, "content", m))
+
+
+def _digest(obj: Any) -> str:
+    return hashlib.sha256(json.dumps(obj, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def embed(text: str) -> List[float]:
+    """Unit-length hashed bag of words + character trigrams (no model download, no network)."""
+    vec = [0.0] * EMBED_DIM
+    text = text.lower()
+    grams = _WORD.findall(text) + [text[i:i + 3] for i in range(max(len(text) - 2, 0))]
+    for g in grams:
+        h = int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little")
+        vec[h % EMBED_DIM] += 1.0 if h & 0x80000000 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600, similarity_threshold: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold  # None/0 disables the similarity tier
+        self._entries: "OrderedDict[str, Tuple[float, str, List[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits_exact = 0
+        self.hits_similar = 0
+        self.misses = 0
+
+    @staticmethod
+    def keys(messages, namespace: str = "") -> Tuple[str, str, str]:
+        """(exact key, scope key, query text). The query is the goal; the scope is every other message,
+        the rest of the last user turn and its numbers, so fixed instructions never count as similarity."""
+        norm = normalize_messages(messages)
+        exact = _digest([namespace, norm])
+        last_user = max((i for i, (role, _) in enumerate(norm) if role in ("user", "human")), default=None)
+        if last_user is None:
+            return exact, exact, ""
+        text, raw = norm[last_user][1], _raw_content(messages, last_user)
+        goal = _GOAL.search(raw)
+        query, instructions = text, ""
+        if goal:
+            query, instructions = _WS.sub(" ", goal.group(1)).strip(), _WS.sub(" ", _GOAL.sub("Goal:", raw)).strip()
+        rest = norm[:last_user] + norm[last_user + 1:]
+        scope = _digest([namespace, rest, instructions, _NUM.findall(text)])
+        return exact, scope, query
+
+    def get(self, messages, namespace: str = "") -> Optional[Any]:
+        exact, scope, query = self.keys(messages, namespace)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            hit = self._entries.get(exact)
+            if hit is not None:
+                self._entries.move_to_end(exact)
+                self.hits_exact += 1
+                return hit[3]
+            if self.similarity_threshold and query:
+                qvec = embed(query)
+                best_key, best_sim = None, self.similarity_threshold
+                for key, (_, entry_scope, vec, _) in self._entries.items():
+                    if entry_scope == scope and vec:
+                        sim = _cosine(qvec, vec)
+                        if sim >= best_sim:
+                            best_key, best_sim = key, sim
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    self.hits_similar += 1
+                    return self._entries[best_key][3]
+            self.misses += 1
+            return None
+
+    def put(self, messages, value: Any, namespace: str = "") -> None:
+        exact, scope, query = self.keys(messages, namespace)
+        vec = embed(query) if (self.similarity_threshold and query) else []
+        with self._lock:
+            self._entries[exact] = (time.monotonic() + self.ttl_seconds, scope, vec, value)
+            self._entries.move_to_end(exact)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _expire(self, now: float) -> None:
+        expired = [k for k, (exp, *_rest) in self._entries.items() if exp <= now]
+        for k in expired:
+            del self._entries[k]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits_exact + self.hits_similar + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits_exact": self.hits_exact,
+                "hits_similar": self.hits_similar,
+                "misses": self.misses,
+                "hit_rate": round((self.hits_exact + self.hits_similar) / lookups, 3) if lookups else None,
+            }
+
+
+class CachedLLM:
+    """Wraps a chat model; (a)invoke()/(a)stream() are served from the cache when possible, everything else passes through."""
+
+    def __init__(self, llm, cache: Optional[ResponseCache] = None):
+        self.llm = llm
+        self.cache = cache or ResponseCache()
+        self.namespace = "|".join(
+            str(getattr(llm, attr, "")) for attr in ("model_name", "temperature")
+        )
+
+    def invoke(self, messages, *args, **kwargs):
+        with span("llm.invoke") as sp:
+            cached = self.cache.get(messages, self.namespace)
+            if cached is not None:
+                sp["cache_hit"] = True
+                return cached
+            reply = self.llm.invoke(messages, *args, **kwargs)
+            sp.update(usage_of(reply))
+            self.cache.put(messages, reply, self.namespace)
+            return reply
+
+    def stream(self, messages, *args, **kwargs) -> Iterator[Any]:
+        """A hit is replayed as one chunk; a miss streams through and caches the assembled reply."""
+        with span("llm.stream") as sp:
+            cached = self.cache.get(messages, self.namespace)
+            if cached is not None:
+                sp["cache_hit"] = True
+                yield cached
+                return
+            parts = []
+            for chunk in self.llm.stream(messages, *args, **kwargs):
+                parts.append(chunk.content if hasattr(chunk, "content") else str(chunk))
+                for key, n in usage_of(chunk).items():  # usage arrives on the last chunk, if at all
+                    sp[key] = sp.get(key, 0) + n
+                yield chunk
+            from langchain_core.messages import AIMessage  # imported here to keep module import light
+
+            self.cache.put(messages, AIMessage(content="".join(parts)), self.namespace)
+
+    async def ainvoke(self, messages, *args, **kwargs):
+        with span("llm.ainvoke") as sp:
+            cached = self.cache.get(messages, self.namespace)
+            if cached is not None:
+                sp["cache_hit"] = True
+                return cached
+            reply = await self.llm.ainvoke(messages, *args, **kwargs)
+            sp.update(usage_of(reply))
+            self.cache.put(messages, reply, self.namespace)
+            return reply
+
+    async def astream(self, messages, *args, **kwargs):
+        """Async stream(); same caching rules."""
+        with span("llm.astream") as sp:
+            cached = self.cache.get(messages, self.namespace)
+            if cached is not None:
+                sp["cache_hit"] = True
+                yield cached
+                return
+            parts = []
+            async for chunk in self.llm.astream(messages, *args, **kwargs):
+                parts.append(chunk.content if hasattr(chunk, "content") else str(chunk))
+                for key, n in usage_of(chunk).items():
+                    sp[key] = sp.get(key, 0) + n
+                yield chunk
+            from langchain_core.messages import AIMessage
+
+            self.cache.put(messages, AIMessage(content="".join(parts)), self.namespace)
+
+    def with_structured_output(self, schema, **kwargs):
+        """Not cached, but timed (with token usage) under the same llm.* spans as invoke()."""
+        return _TracedStructured(self.llm, schema, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+class _TracedStructured:
+    """llm.with_structured_output(schema) whose (a)invoke() records an llm.* span like CachedLLM does."""
+
+    def __init__(self, llm, schema, include_raw: bool = False, **kwargs):
+        self.runnable = llm.with_structured_output(schema, include_raw=True, **kwargs)
+        self.include_raw = include_raw
+
+    def _parsed(self, out, sp):
+        sp.update(usage_of(out["raw"]))
+        if self.include_raw:
+            return out
+        if out.get("parsing_error") is not None:
+            raise out["parsing_error"]
+        return out["parsed"]
+
+    def invoke(self, messages, *args, **kwargs):
+        with span("llm.invoke", structured=True) as sp:
+            return self._parsed(self.runnable.invoke(messages, *args, **kwargs), sp)
+
+    async def ainvoke(self, messages, *args, **kwargs):
+        with span("llm.ainvoke", structured=True) as sp:
+            return self._parsed(await self.runnable.ainvoke(messages, *args, **kwargs), sp)
+
+    def __getattr__(self, name):
+        return getattr(self.runnable, name)
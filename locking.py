@@ -0,0 +1,114 @@
+"""
+Locks and atomic writes for the JSON/JSONL data files.
+- locked(path): in-process RLock + cross-process advisory lock on `<path>.lock`
+  (fcntl.flock on POSIX, msvcrt.locking on Windows); re-entrant per thread
+- atomic_write_text(path, text): write a temp file, fsync, then os.replace
+- try_lock_fd(fd): non-blocking exclusive lock on an open file, held until it is closed
+"""
+
+from __future__ import annotations
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class PathLock:
+    """One per lock file per process; the OS lock is taken only by the outermost holder."""
+
+    def __init__(self, lock_path: Path):
+        self.lock_path = lock_path
+        self._rlock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self) -> None:
+        self._rlock.acquire()
+        if self._depth == 0:
+            try:
+                self._fd = os.open(str(self.lock_path), os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX)
+                else:
+                    msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+            except BaseException:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                self._rlock.release()
+                raise
+        self._depth += 1
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(self._fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        self._rlock.release()
+
+
+def try_lock_fd(fd: int) -> bool:
+    """True if this process now holds an exclusive lock on `fd` (False: another process has it)."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+_locks: Dict[str, PathLock] = {}
+_locks_guard = threading.Lock()
+
+
+def get_lock(path) -> PathLock:
+    lock_path = Path(os.path.abspath(str(path) + ".lock"))
+    key = str(lock_path)
+    with _locks_guard:
+        if key not in _locks:
+            _locks[key] = PathLock(lock_path)
+        return _locks[key]
+
+
+@contextmanager
+def locked(path) -> Iterator[None]:
+    """Exclusive access to `path` across threads and processes."""
+    lock = get_lock(path)
+    lock.acquire()
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+def atomic_write_text(path, text: str, encoding: str = "utf-8") -> None:
+    """Readers see either the old or the new file, never a partial write."""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding=encoding) as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
@@ -1,31 +1,57 @@
 """
 MCP-style client with local mock servers.
-- CalendarServerMock: returns free slots; can "add" events
+- CalendarServerMock: returns free slots; can "add" events (one-off or recurring
+  via an RRULE), in bulk, and remove them
 - TaskServerMock: returns top tasks; can "complete" a task
 These simulate MCP servers so we can wire LangGraph to real context now,
-and swap in real MCP servers later.
+and swap in real MCP servers later. MCPClient reaches them in-process or, through
+mcp_transport, as separate stdio / Unix-socket server processes.
 """
 
 from __future__ import annotations
-import json
+import asyncio
+import contextvars
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-# Local “data layer” (simple JSON files)
+from calendar_engine import Recurrence, get_calendar_index
+from data_repository import get_repository
+from mcp_transport import MCP_TRANSPORT, RemoteTransport, make_transport, parse_transports
+from metrics import span
+from user_stores import user_path
+
+# Local “data layer” (simple JSON files, cached in memory by data_repository)
 CAL_PATH = Path("calendar_data.json")
 TASK_PATH = Path("tasks_data.json")
 
-def _load_json(path: Path, default):
-    if path.exists():
-        try:
-            return json.loads(path.read_text(encoding="utf-8"))
-        except json.JSONDecodeError:
-            return default
-    return default
 
-def _save_json(path: Path, obj):
-    path.write_text(json.dumps(obj, indent=2, ensure_ascii=False), encoding="utf-8")
+def calendar_path(user_id: Optional[str] = None) -> Path:
+    """CAL_PATH, or the user's own calendar file."""
+    return user_path(user_id, CAL_PATH.name, default=CAL_PATH)
+
+
+def task_path(user_id: Optional[str] = None) -> Path:
+    """TASK_PATH, or the user's own task file."""
+    return user_path(user_id, TASK_PATH.name, default=TASK_PATH)
+
+
+def _event(title: str, start: str, end: str, rrule: Optional[str] = None,
+           exdate: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Validated event record (raises ValueError). A recurring event stays one record: its first
+    occurrence plus the rule, never the expanded occurrences."""
+    s, f = datetime.fromisoformat(start), datetime.fromisoformat(end)
+    if f < s:
+        raise ValueError(f"event ends before it starts: {start} → {end}")
+    event = {"id": uuid.uuid4().hex[:12], "title": title, "start": start, "end": end}
+    if rrule:
+        Recurrence(s, f, rrule, exdate or ())
+        event["rrule"] = rrule
+        if exdate:
+            event["exdate"] = list(exdate)
+    return event
 
 
 # ------------------ Mock Calendar Server ----------------------
@@ -33,52 +59,74 @@ class CalendarServerMock:
     name = "calendar"
 
     @staticmethod
-    def get_free_slots(duration_minutes: int, horizon_hours: int = 8) -> List[Dict[str, str]]:
+    def get_free_slots(
+        duration_minutes: int,
+        horizon_hours: int = 8,
+        working_hours: Optional[List[int]] = None,
+        min_gap_minutes: int = 0,
+        max_slots: int = 3,
+        user_id: Optional[str] = None,
+    ) -> List[Dict[str, str]]:
         """
-        Return a few free slots today within `horizon_hours` window.
-        Very naive: pretends existing events in CAL_PATH occupy time.
+        Return a few free slots within the next `horizon_hours` (may span days).
+        Existing events in the user's calendar (CAL_PATH by default) occupy time; optionally only inside
+        `working_hours` ([open_hour, close_hour]) and `min_gap_minutes` away from events.
         """
         now = datetime.now().replace(second=0, microsecond=0)
         end = now + timedelta(hours=horizon_hours)
-        events = _load_json(CAL_PATH, {"events": []}).get("events", [])
+        return get_calendar_index(calendar_path(user_id)).free_slots(
+            duration_minutes,
+            now,
+            end,
+            working_hours=working_hours,
+            min_gap_minutes=min_gap_minutes,
+            max_slots=max_slots,
+        )
 
-        # Build a simple timeline minute-by-minute “occupied” mask
-        occupied = []
-        for e in events:
-            try:
-                s = datetime.fromisoformat(e["start"])
-                f = datetime.fromisoformat(e["end"])
-                occupied.append((max(s, now), min(f, end)))
-            except Exception:
-                continue
+    @staticmethod
+    def add_event(
+        title: str,
+        start_iso: str,
+        end_iso: str,
+        rrule: Optional[str] = None,
+        exdate: Optional[List[str]] = None,
+        user_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        One event; with `rrule` (e.g. "FREQ=WEEKLY;BYDAY=MO,WE;COUNT=20") it repeats from start_iso/end_iso,
+        skipping the `exdate` occurrence starts.
+        """
+        event = _event(title, start_iso, end_iso, rrule, exdate)
+        get_repository(calendar_path(user_id), "calendar").add_many([event])
+        return {"ok": True, "added": event}
 
-        # Greedy scan for free windows
-        cur = now
-        slots = []
-        step = timedelta(minutes=5)
-        block = timedelta(minutes=duration_minutes)
-
-        while cur + block <= end and len(slots) < 3:  # return up to 3 options
-            conflict = False
-            for (s, f) in occupied:
-                if cur < f and (cur + block) > s:
-                    conflict = True
-                    cur = max(cur, f)  # jump past conflict
-                    break
-            if not conflict:
-                slots.append({
-                    "start": cur.isoformat(timespec="minutes"),
-                    "end": (cur + block).isoformat(timespec="minutes")
-                })
-                cur += timedelta(minutes=duration_minutes // 2 or 1)  # stagger suggestions
-        return slots
+    @staticmethod
+    def add_events_bulk(events: List[Dict[str, Any]], user_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Add many events ({"title", "start", "end"[, "rrule", "exdate"]}) in one write. Invalid ones
+        are reported in `rejected` (index + reason) instead of failing the whole import.
+        """
+        valid, rejected = [], []
+        for i, e in enumerate(events):
+            try:
+                valid.append(_event(e["title"], e["start"], e["end"], e.get("rrule"), e.get("exdate")))
+            except (KeyError, TypeError, ValueError) as exc:
+                rejected.append({"index": i, "error": f"{type(exc).__name__}: {exc}"})
+        get_repository(calendar_path(user_id), "calendar").add_many(valid)
+        return {"ok": not rejected, "added": len(valid), "ids": [e["id"] for e in valid], "rejected": rejected}
 
     @staticmethod
-    def add_event(title: str, start_iso: str, end_iso: str) -> Dict[str, Any]:
-        data = _load_json(CAL_PATH, {"events": []})
-        data["events"].append({"title": title, "start": start_iso, "end": end_iso})
-        _save_json(CAL_PATH, data)
-        return {"ok": True, "added": {"title": title, "start": start_iso, "end": end_iso}}
+    def remove_events(
+        ids: Optional[List[str]] = None, title: Optional[str] = None, user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Remove the events with these ids and/or this exact title (a whole series for a recurring one)."""
+        if not ids and title is None:
+            raise ValueError("remove_events needs ids or a title")
+        wanted = set(ids or ())
+        removed = get_repository(calendar_path(user_id), "calendar").remove(
+            lambda e: e.get("id") in wanted or (title is not None and e.get("title") == title)
+        )
+        return {"ok": True, "removed": removed}
 
 
 # ---------------- Mock Task Server ------------------------
@@ -86,42 +134,154 @@ class TaskServerMock:
     name = "tasks"
 
     @staticmethod
-    def list_top_tasks(limit: int = 3) -> List[Dict[str, Any]]:
-        tasks = _load_json(TASK_PATH, {"tasks": []}).get("tasks", [])
-        # naive priority sort: earlier due date first, then incomplete
-        tasks.sort(key=lambda t: (t.get("done", False), t.get("due", "9999-12-31")))
-        return tasks[:limit]
+    def list_top_tasks(limit: int = 3, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        # priority: incomplete first, then earlier due date (kept pre-sorted by the repository)
+        return get_repository(task_path(user_id), "tasks").top(limit)
 
     @staticmethod
-    def complete_task(task_id: str) -> Dict[str, Any]:
-        data = _load_json(TASK_PATH, {"tasks": []})
-        found = False
-        for t in data["tasks"]:
-            if t.get("id") == task_id:
-                t["done"] = True
-                found = True
-                break
-        _save_json(TASK_PATH, data)
+    def complete_task(task_id: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        found = get_repository(task_path(user_id), "tasks").complete(task_id)
         return {"ok": found, "id": task_id}
 
 
+SERVERS = {server.name: server for server in (CalendarServerMock, TaskServerMock)}
+
+
 # --------------------------- MCP Client -------------------------
 class MCPClient:
     """
     This mimics MCP client behavior.
-    In real MCP, this would handle transport, schemas & capability negotiation.
-    Here, we just route (server, tool) to local mock servers.
+    Each server is reached through a transport (see mcp_transport): direct calls on the local mock
+    servers by default, or JSON-RPC to a separate server process over stdio / a Unix socket
+    (MCP_TRANSPORT, or `transports={"calendar": "socket", ...}` / transport objects).
+    `user_id` (when given) is passed to the tool, which then works on that user's files.
     """
-    def __init__(self):
-        self._servers = {
-            CalendarServerMock.name: CalendarServerMock,
-            TaskServerMock.name: TaskServerMock,
+    def __init__(self, transports: Optional[Dict[str, Any]] = None):
+        # own pool (not the loop's default one) so a timed-out call never blocks loop shutdown
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="mcp")
+        kinds = {**parse_transports(MCP_TRANSPORT, list(SERVERS)), **(transports or {})}
+        unknown = set(kinds) - set(SERVERS)
+        if unknown:
+            raise ValueError(f"Unknown server(s) in MCP transports: {', '.join(sorted(unknown))}")
+        self._transports = {
+            name: make_transport(kind, SERVERS[name], self._executor) if isinstance(kind, str) else kind
+            for name, kind in kinds.items()
         }
 
-    def call(self, server: str, tool: str, args: Optional[Dict[str, Any]] = None) -> Any:
-        if server not in self._servers:
+    def _transport(self, server: str):
+        if server not in self._transports:
             raise ValueError(f"Unknown server: {server}")
-        srv = self._servers[server]
-        if not hasattr(srv, tool):
-            raise ValueError(f"Unknown tool '{tool}' on server '{server}'")
-        return getattr(srv, tool)(**(args or {}))
+        return self._transports[server]
+
+    @staticmethod
+    def _args(args: Optional[Dict[str, Any]], user_id: Optional[str]) -> Dict[str, Any]:
+        return {**(args or {}), "user_id": user_id} if user_id is not None else dict(args or {})
+
+    def call(
+        self, server: str, tool: str, args: Optional[Dict[str, Any]] = None, user_id: Optional[str] = None
+    ) -> Any:
+        transport = self._transport(server)
+        with span(f"mcp.{server}.{tool}"):
+            return transport.call(tool, self._args(args, user_id))
+
+    async def acall(
+        self,
+        server: str,
+        tool: str,
+        args: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        user_id: Optional[str] = None,
+    ) -> Any:
+        """Async variant of call(); in-process sync tools run in a worker thread. Raises asyncio.TimeoutError."""
+        transport = self._transport(server)
+        args = self._args(args, user_id)
+        with span(f"mcp.{server}.{tool}"):
+            coro = transport.acall(tool, args)
+            if timeout is None:
+                return await coro
+            return await asyncio.wait_for(coro, timeout)
+
+    def _send_batches(
+        self, calls: Dict[str, Tuple[str, str, Optional[Dict[str, Any]]]], user_id: Optional[str]
+    ) -> Dict[str, Future]:
+        """Sends the calls for each remote server with two or more of them as one JSON-RPC batch."""
+        by_server: Dict[str, List[str]] = {}
+        for key, (server, _, _) in calls.items():
+            if isinstance(self._transports.get(server), RemoteTransport):
+                by_server.setdefault(server, []).append(key)
+        sent: Dict[str, Future] = {}
+        for server, keys in by_server.items():
+            if len(keys) < 2:
+                continue
+            try:
+                futures = self._transports[server].submit_batch(
+                    [(calls[k][1], self._args(calls[k][2], user_id)) for k in keys]
+                )
+            except ConnectionError:
+                continue  # sent one by one below, each reporting its own error
+            sent.update(zip(keys, futures))
+        return sent
+
+    @staticmethod
+    async def _await_sent(server: str, tool: str, future: Future, timeout: Optional[float]) -> Any:
+        with span(f"mcp.{server}.{tool}"):
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+
+    def transport_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Connection pool counters of the servers reached over stdio / sockets."""
+        return {name: t.stats() for name, t in self._transports.items() if isinstance(t, RemoteTransport)}
+
+    def close(self) -> None:
+        for transport in self._transports.values():
+            transport.close()
+
+    async def agather(
+        self,
+        calls: Dict[str, Tuple[str, str, Optional[Dict[str, Any]]]],
+        timeout: Optional[float] = None,
+        defaults: Optional[Dict[str, Any]] = None,
+        user_id: Optional[str] = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """
+        Run several (server, tool, args) calls concurrently, each with its own timeout; calls to the
+        same remote server share one JSON-RPC batch (one round trip).
+        A failed or slow call falls back to `defaults[key]` (None if absent)
+        instead of failing the batch. Returns (results, errors) keyed like `calls`.
+        """
+        defaults = defaults or {}
+        keys = list(calls)
+        sent = self._send_batches(calls, user_id)
+        outcomes = await asyncio.gather(
+            *(
+                self._await_sent(calls[k][0], calls[k][1], sent[k], timeout) if k in sent
+                else self.acall(*calls[k], timeout=timeout, user_id=user_id)
+                for k in keys
+            ),
+            return_exceptions=True,
+        )
+        results: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        for key, out in zip(keys, outcomes):
+            if isinstance(out, BaseException):
+                results[key] = defaults.get(key)
+                errors[key] = "timed out" if isinstance(out, asyncio.TimeoutError) else str(out) or type(out).__name__
+            else:
+                results[key] = out
+        return results, errors
+
+    def gather(
+        self,
+        calls: Dict[str, Tuple[str, str, Optional[Dict[str, Any]]]],
+        timeout: Optional[float] = None,
+        defaults: Optional[Dict[str, Any]] = None,
+        user_id: Optional[str] = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Blocking wrapper around agather() for sync callers (e.g. graph nodes)."""
+        coro = self.agather(calls, timeout=timeout, defaults=defaults, user_id=user_id)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        # already inside an event loop: run on a private loop in a helper thread
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(contextvars.copy_context().run, asyncio.run, coro).result()
@@ -0,0 +1,432 @@
+"""
+Transports between MCPClient and the MCP servers.
+- InProcessTransport: calls the mock server's static methods directly (the default)
+- StdioTransport: spawns `python -m mcp_transport stdio <server>` and talks to it over its stdin/stdout
+- SocketTransport: connects to `python -m mcp_transport socket <server>` on a Unix socket
+The remote ones speak newline-delimited JSON-RPC 2.0 (`tools/list`, `tools/call`, as in MCP's
+stdio transport) and keep a pool of persistent connections (processes, for stdio). Requests are
+pipelined: many can be in flight on one connection and replies are matched by id, so the server
+may answer out of order. Several calls to the same server can also go out as one JSON-RPC batch.
+
+    MCP_TRANSPORT=socket python -m mcp_transport socket calendar &   # one process per server
+    MCP_TRANSPORT=calendar=socket,tasks=stdio python app.py           # or per server
+
+Run a server process from the directory holding its data files (calendar_data.json, ...).
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import functools
+import inspect
+import itertools
+import json
+import os
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "inprocess")  # inprocess | stdio | socket, or "calendar=socket,..."
+MCP_SOCKET_DIR = Path(os.getenv("MCP_SOCKET_DIR", ".mcp"))  # <dir>/<server>.sock
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "4"))  # connections (stdio: processes) per server
+MCP_SERVER_WORKERS = int(os.getenv("MCP_SERVER_WORKERS", "8"))  # concurrent tool calls per server process
+MCP_REPLY_TIMEOUT = float(os.getenv("MCP_REPLY_TIMEOUT", "30"))  # seconds a sync remote call waits for its reply
+
+# JSON-RPC error codes
+PARSE_ERROR, INVALID_REQUEST, METHOD_NOT_FOUND, INVALID_PARAMS, TOOL_ERROR = -32700, -32600, -32601, -32602, -32000
+
+Call = Tuple[str, Dict[str, Any]]  # (tool, arguments)
+
+
+class MCPError(RuntimeError):
+    """A JSON-RPC error reply; `error_type` is the server-side exception's class name when a tool raised."""
+
+    def __init__(self, message: str, code: int = TOOL_ERROR, error_type: Optional[str] = None):
+        super().__init__(message)
+        self.code = code
+        self.error_type = error_type
+
+
+def tool_names(server_cls) -> List[str]:
+    """Public tools of a mock server: its static methods."""
+    return sorted(name for name, fn in vars(server_cls).items() if isinstance(fn, staticmethod))
+
+
+# ------------------ Server side ----------------------
+def _handle(server_cls, tools: List[str], msg: Any) -> Optional[Dict[str, Any]]:
+    """One JSON-RPC request → its reply (None for a notification)."""
+    if not isinstance(msg, dict) or msg.get("jsonrpc") != "2.0" or not isinstance(msg.get("method"), str):
+        return {"jsonrpc": "2.0", "id": None, "error": {"code": INVALID_REQUEST, "message": "invalid request"}}
+    rid, method, params = msg.get("id"), msg["method"], msg.get("params") or {}
+    try:
+        if method == "tools/list":
+            result: Any = {"server": server_cls.name, "tools": tools}
+        elif method == "tools/call":
+            name, args = params.get("name"), params.get("arguments") or {}
+            if name not in tools:
+                raise MCPError(f"Unknown tool '{name}' on server '{server_cls.name}'", METHOD_NOT_FOUND)
+            try:
+                result = getattr(server_cls, name)(**args)
+            except TypeError as exc:
+                raise MCPError(str(exc), INVALID_PARAMS, "TypeError") from exc
+        else:
+            raise MCPError(f"Unknown method '{method}'", METHOD_NOT_FOUND)
+        reply = {"jsonrpc": "2.0", "id": rid, "result": result}
+    except MCPError as exc:
+        reply = {"jsonrpc": "2.0", "id": rid, "error": {"code": exc.code, "message": str(exc), "data": exc.error_type}}
+    except Exception as exc:
+        reply = {"jsonrpc": "2.0", "id": rid,
+                 "error": {"code": TOOL_ERROR, "message": str(exc), "data": type(exc).__name__}}
+    return reply if "id" in msg else None
+
+
+def serve_stream(rfile, wfile, server_cls, executor: ThreadPoolExecutor) -> None:
+    """Serve one connection until EOF. Requests run concurrently on `executor`; replies go out as they finish."""
+    tools = tool_names(server_cls)
+    write_lock = threading.Lock()
+
+    def send(reply) -> None:
+        if reply in (None, []):
+            return
+        data = json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n"
+        with write_lock:
+            try:
+                wfile.write(data)
+                wfile.flush()
+            except (OSError, ValueError):
+                pass  # client went away; its pending calls fail on its side
+
+    def run(msg) -> None:
+        if msg == []:
+            send({"jsonrpc": "2.0", "id": None, "error": {"code": INVALID_REQUEST, "message": "empty batch"}})
+        elif isinstance(msg, list):  # a batch: one reply array, in request order
+            send([r for r in (_handle(server_cls, tools, m) for m in msg) if r is not None])
+        else:
+            send(_handle(server_cls, tools, msg))
+
+    for line in rfile:
+        if not line.strip():
+            continue
+        try:
+            msg = json.loads(line)
+        except ValueError:
+            send({"jsonrpc": "2.0", "id": None, "error": {"code": PARSE_ERROR, "message": "parse error"}})
+            continue
+        executor.submit(run, msg)
+
+
+def serve_stdio(server_cls, workers: int = MCP_SERVER_WORKERS) -> None:
+    stdout = sys.stdout.buffer
+    sys.stdout = sys.stderr  # stray prints must not corrupt the protocol stream
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mcp-server") as executor:
+        serve_stream(sys.stdin.buffer, stdout, server_cls, executor)
+
+
+def serve_socket(server_cls, path=None, workers: int = MCP_SERVER_WORKERS) -> None:
+    path = Path(path or socket_path(server_cls.name))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)  # left over from a killed server
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mcp-server")
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            serve_stream(self.rfile, self.wfile, server_cls, executor)
+
+    # defined here: socketserver has no Unix servers on Windows, where only stdio works
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    with Server(str(path), Handler) as server:
+        try:
+            server.serve_forever()
+        finally:
+            path.unlink(missing_ok=True)
+            executor.shutdown(wait=False)
+
+
+def socket_path(server: str) -> Path:
+    return MCP_SOCKET_DIR / f"{server}.sock"
+
+
+# ------------------ Client side ----------------------
+class InProcessTransport:
+    """Direct calls on the mock server class; acall() runs sync tools on `executor`."""
+
+    kind = "inprocess"
+
+    def __init__(self, server_cls, executor: ThreadPoolExecutor):
+        self.server_cls = server_cls
+        self._executor = executor
+
+    def resolve(self, tool: str) -> Callable[..., Any]:
+        if not hasattr(self.server_cls, tool):
+            raise ValueError(f"Unknown tool '{tool}' on server '{self.server_cls.name}'")
+        return getattr(self.server_cls, tool)
+
+    def call(self, tool: str, args: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        return self.resolve(tool)(**args)
+
+    async def acall(self, tool: str, args: Dict[str, Any]) -> Any:
+        fn = self.resolve(tool)
+        if inspect.iscoroutinefunction(fn):
+            return await fn(**args)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(fn, **args))
+
+    def close(self) -> None:
+        pass
+
+
+class _Connection:
+    """One persistent JSON-RPC stream. Writers pipeline requests; a reader thread resolves them by id."""
+
+    def __init__(self, rfile, wfile, on_close: Callable[[], None]):
+        self._rfile, self._wfile, self._on_close = rfile, wfile, on_close
+        self._pending: Dict[int, Future] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()  # guards _pending / closed
+        self._write_lock = threading.Lock()  # one request (or batch) per write, never interleaved
+        self.closed = False
+        threading.Thread(target=self._read, name="mcp-reader", daemon=True).start()
+
+    def load(self) -> int:
+        return len(self._pending)
+
+    def send(self, calls: Sequence[Call], batch: bool) -> List[Future]:
+        futures, msgs = [], []
+        with self._lock:
+            if self.closed:
+                raise ConnectionError("MCP connection is closed")
+            for tool, args in calls:
+                rid = next(self._ids)
+                future = self._pending.setdefault(rid, Future())
+                future.add_done_callback(functools.partial(self._forget, rid))
+                futures.append(future)
+                msgs.append({"jsonrpc": "2.0", "id": rid, "method": "tools/call",
+                             "params": {"name": tool, "arguments": args}})
+        data = b"".join(json.dumps(m, ensure_ascii=False).encode("utf-8") + b"\n" for m in ([msgs] if batch else msgs))
+        try:
+            with self._write_lock:
+                self._wfile.write(data)
+                self._wfile.flush()
+        except (OSError, ValueError) as exc:
+            self.close()  # fails every pending call, these included
+            raise ConnectionError(f"MCP connection lost: {exc}") from exc
+        return futures
+
+    def _forget(self, rid: int, future: Future) -> None:
+        """A cancelled call (timeout) stops counting as in flight; a late reply to it is dropped."""
+        if future.cancelled():
+            with self._lock:
+                self._pending.pop(rid, None)
+
+    def _read(self) -> None:
+        try:
+            for line in self._rfile:
+                msg = json.loads(line)
+                for reply in msg if isinstance(msg, list) else [msg]:
+                    with self._lock:
+                        future = self._pending.pop(reply.get("id"), None)
+                    if future is None:
+                        continue
+                    error = reply.get("error")
+                    try:
+                        if error:
+                            future.set_exception(MCPError(error.get("message", ""), error.get("code", TOOL_ERROR),
+                                                          error.get("data")))
+                        else:
+                            future.set_result(reply.get("result"))
+                    except InvalidStateError:
+                        pass  # the caller gave up (timeout / cancel)
+        except (OSError, ValueError):
+            pass
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            try:
+                future.set_exception(ConnectionError("MCP server closed the connection"))
+            except InvalidStateError:
+                pass
+        self._on_close()
+
+
+class RemoteTransport:
+    """Pool of up to `pool_size` persistent connections to one server, opened on demand."""
+
+    kind = "remote"
+
+    def __init__(self, server: str, pool_size: int = MCP_POOL_SIZE):
+        self.server = server
+        self.pool_size = max(pool_size, 1)
+        self._conns: List[_Connection] = []
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.requests = 0
+        self.batches = 0
+
+    def _connect(self) -> _Connection:
+        raise NotImplementedError
+
+    def _connection(self) -> _Connection:
+        """The least busy open connection; a new one while all are busy and the pool has room."""
+        with self._lock:
+            self._conns = [c for c in self._conns if not c.closed]
+            conn = min(self._conns, key=_Connection.load, default=None)
+            if conn is None or (conn.load() and len(self._conns) < self.pool_size):
+                conn = self._connect()
+                self._conns.append(conn)
+                self.connects += 1
+            return conn
+
+    def submit(self, tool: str, args: Dict[str, Any]) -> Future:
+        self.requests += 1
+        return self._connection().send([(tool, args)], batch=False)[0]
+
+    def submit_batch(self, calls: Sequence[Call]) -> List[Future]:
+        """All calls in one JSON-RPC batch (one write, one reply) on one connection."""
+        self.requests += len(calls)
+        self.batches += 1
+        return self._connection().send(calls, batch=True)
+
+    def call(self, tool: str, args: Dict[str, Any], timeout: Optional[float] = MCP_REPLY_TIMEOUT) -> Any:
+        """Raises TimeoutError if no reply comes within `timeout` seconds (None waits forever)."""
+        future = self.submit(tool, args)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            if not future.cancel():  # the reply arrived just now
+                return future.result()
+            raise TimeoutError(f"MCP server '{self.server}' did not answer {tool} within {timeout}s") from None
+
+    async def acall(self, tool: str, args: Dict[str, Any]) -> Any:
+        return await asyncio.wrap_future(self.submit(tool, args))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            open_conns = [c for c in self._conns if not c.closed]
+        return {
+            "transport": self.kind,
+            "open": len(open_conns),
+            "in_flight": sum(c.load() for c in open_conns),
+            "connects": self.connects,
+            "requests": self.requests,
+            "batches": self.batches,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+
+
+class StdioTransport(RemoteTransport):
+    """Each pooled connection is a `python -m mcp_transport stdio <server>` child (exits when its stdin closes)."""
+
+    kind = "stdio"
+
+    def __init__(self, server: str, pool_size: int = MCP_POOL_SIZE, cwd=None):
+        super().__init__(server, pool_size)
+        self.cwd = cwd
+
+    def _connect(self) -> _Connection:
+        here = str(Path(__file__).resolve().parent)
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [here, os.environ.get("PYTHONPATH")]))}
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "mcp_transport", "stdio", self.server],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=self.cwd, env=env,
+        )
+
+        def stop():
+            proc.stdin.close()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+        return _Connection(proc.stdout, proc.stdin, stop)
+
+
+class SocketTransport(RemoteTransport):
+    """Pooled connections to a `python -m mcp_transport socket <server>` process."""
+
+    kind = "socket"
+
+    def __init__(self, server: str, pool_size: int = MCP_POOL_SIZE, path=None):
+        super().__init__(server, pool_size)
+        self.path = Path(path or socket_path(server))
+
+    def _connect(self) -> _Connection:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(str(self.path))
+        except OSError as exc:
+            sock.close()
+            raise ConnectionError(f"no MCP server for '{self.server}' at {self.path}: {exc}") from exc
+        rfile, wfile = sock.makefile("rb"), sock.makefile("wb")
+
+        def stop():
+            try:
+                sock.shutdown(socket.SHUT_RDWR)  # first: the reader thread gets EOF and lets go of rfile
+            except OSError:
+                pass
+            for f in (wfile, rfile):
+                try:
+                    f.close()
+                except OSError:
+                    pass
+            sock.close()
+
+        return _Connection(rfile, wfile, stop)
+
+
+def parse_transports(spec: str, servers: Sequence[str]) -> Dict[str, str]:
+    """"socket" → every server over sockets; "calendar=socket,tasks=stdio" → per server (rest in-process)."""
+    if "=" not in spec:
+        return {server: spec.strip() or "inprocess" for server in servers}
+    kinds = {server: "inprocess" for server in servers}
+    for part in spec.split(","):
+        server, _, kind = part.partition("=")
+        kinds[server.strip()] = kind.strip()
+    return kinds
+
+
+def make_transport(kind: str, server_cls, executor: ThreadPoolExecutor):
+    if kind == "inprocess":
+        return InProcessTransport(server_cls, executor)
+    if kind == "stdio":
+        return StdioTransport(server_cls.name)
+    if kind == "socket":
+        return SocketTransport(server_cls.name)
+    raise ValueError(f"Unknown MCP transport '{kind}' (inprocess, stdio or socket)")
+
+
+def main(argv=None):
+    from mcp_client import SERVERS
+
+    parser = argparse.ArgumentParser(description="Run one mock MCP server over stdio or a Unix socket.")
+    parser.add_argument("transport", choices=["stdio", "socket"])
+    parser.add_argument("server", choices=sorted(SERVERS))
+    parser.add_argument("--path", help=f"socket path (default {MCP_SOCKET_DIR}/<server>.sock)")
+    parser.add_argument("--workers", type=int, default=MCP_SERVER_WORKERS)
+    args = parser.parse_args(argv)
+    if args.transport == "stdio":
+        serve_stdio(SERVERS[args.server], args.workers)
+    else:
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # unwind, so the socket file is removed
+        serve_socket(SERVERS[args.server], args.path, args.workers)
+
+
+if __name__ == "__main__":
+    main()
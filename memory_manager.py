@@ -1,28 +1,279 @@
-import json
+import atexit
 import os
+import re
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from pathlib import Path
+
+from memory_stats import FocusStats
+from metrics import instrument
+from memory_store import migrate_json_array, open_store
+from user_stores import MAX_OPEN_USERS, LRUHandles, user_path
+from write_queue import WriteBehindQueue
 
 MEMORY_FILE = "focus_memory.json"
+# "jsonl" (append-only log, default), "sqlite", or "json" (legacy single array)
+MEMORY_BACKEND = os.getenv("FOCUS_MEMORY_BACKEND", "jsonl")
+# record_session is write-behind: entries wait in a bounded queue (journaled here) for the writer thread
+MEMORY_JOURNAL_DIR = os.getenv("FOCUS_MEMORY_JOURNAL_DIR", str(Path(MEMORY_FILE).with_suffix(".journal")))
+MEMORY_QUEUE_SIZE = int(os.getenv("FOCUS_MEMORY_QUEUE_SIZE", "1024"))
+SHUTDOWN_TIMEOUT = 10.0  # seconds the exit hook waits for queued writes (the rest is replayed next start)
+
+_default = None  # UserMemory of the shared single-user store (user_id None)
+_store_guard = threading.Lock()
+
+
+class UserMemory:
+    """One user's store plus its hot state: running aggregates and analytics columns."""
+
+    def __init__(self, store):
+        self.store = store
+        self.stats = None
+        self.analytics = None
+
+    def get_stats(self):
+        """Running aggregates, reloaded when another process has written."""
+        if self.stats is None or self.stats.entries != self.store.count():
+            with self.store.lock():
+                self.stats = _load_stats(self.store)
+        return self.stats
+
+    def get_analytics(self):
+        """Memory-mapped session columns, reloaded when another process has written."""
+        if self.analytics is None or self.analytics.rows != self.store.count():
+            with self.store.lock():
+                self.analytics = _load_analytics(self.store)
+        return self.analytics
+
+    def commit(self, entries):
+        """One locked append + aggregate and column update for a batch of this user's entries.
+        New stats / columns objects are built and published by reference, never updated in place."""
+        store = self.store
+        with store.lock():
+            stats = _load_stats(store)
+            columns = self.analytics
+            if columns is None or columns.rows != store.count():
+                columns = _load_analytics(store)
+            else:
+                columns = columns.fork()  # readers keep the published columns until the swap below
+            store.extend(entries)
+            for entry in entries:
+                stats.update(entry)
+            store.save_meta("stats", stats.to_dict())
+            columns.extend(entries)
+        self.stats, self.analytics = stats, columns
+
+    def close(self):
+        self.store.close()
+
+
+def _open_user(user_id):
+    _writer.start()  # replays journals of a crashed process
+    return UserMemory(open_store(MEMORY_BACKEND, user_path(user_id, MEMORY_FILE)))
+
+
+# per-user stores: the MAX_OPEN_USERS most recently used stay open with their hot state
+_users = LRUHandles(_open_user, MAX_OPEN_USERS, closer=UserMemory.close)
+
+
+def _default_memory():
+    """Opens the shared backend once; migrates a legacy focus_memory.json on first use."""
+    global _default
+    if _default is None:
+        with _store_guard:
+            if _default is None:
+                _writer.start()
+                store = open_store(MEMORY_BACKEND, MEMORY_FILE)
+                with store.lock():
+                    if store.count() == 0:
+                        migrate_json_array(MEMORY_FILE, store)
+                _default = UserMemory(store)
+    return _default
+
+
+@contextmanager
+def user_memory(user_id=None):
+    """The UserMemory of `user_id` (None = shared store), kept open for the duration of the block."""
+    if user_id is None:
+        yield _default_memory()
+        return
+    with _users.lease(user_id) as memory:
+        yield memory
+
+
+def get_store(user_id=None):
+    """The memory store of `user_id` (None = the shared store)."""
+    with user_memory(user_id) as memory:
+        return memory.store
+
+
+def set_store(store):
+    """Swaps the shared backend (e.g. a SqliteStore or a temp store in scripts) once queued writes landed.
+    The write journal moves next to the new store, so a crashed script never replays into the real one."""
+    global _default
+    _writer.close()
+    _writer.journal_dir = Path(MEMORY_JOURNAL_DIR) if store is None else store.path.with_suffix(".journal")
+    if _default is not None and _default.store is not store:
+        _default.close()
+    _default = UserMemory(store) if store is not None else None
+    if store is not None:
+        _writer.start()  # replays journals a crashed process left next to this store
+
+
+def close_user_stores():
+    """Closes every open per-user store (they reopen on next use) once queued writes landed."""
+    _writer.flush()
+    _users.clear()
+
+
+def get_user_store_stats():
+    """{open, capacity, hits, misses, evictions, hit_rate} of the per-user handle cache."""
+    return _users.stats()
+
+
+def _load_stats(store):
+    """Persisted aggregates; rebuilt by one scan only if they drifted. Call with store.lock() held."""
+    stats = FocusStats(store.load_meta("stats"))
+    if stats.entries != store.count():
+        stats = FocusStats.rebuild(store.iter_entries())
+        store.save_meta("stats", stats.to_dict())
+    return stats
+
+
+def get_stats(user_id=None):
+    """Running aggregates for `user_id`'s store (committed entries; flush_memory() waits for queued ones)."""
+    with user_memory(user_id) as memory:
+        return memory.get_stats()
+
+
+def _load_analytics(store):
+    """Columnar copy of the store (session_analytics); rebuilt by one scan if it drifted. Needs store.lock()."""
+    from session_analytics import SessionColumns
+
+    columns = SessionColumns(store.path.with_name(f"{store.path.stem}.analytics"))
+    if columns.rows != store.count():
+        columns.rebuild(store.iter_entries())
+    return columns
+
+
+def get_analytics(user_id=None):
+    """Memory-mapped session columns for `user_id`'s store."""
+    with user_memory(user_id) as memory:
+        return memory.get_analytics()
 
-def load_memory():
-    if not os.path.exists(MEMORY_FILE):
-        return []
-    with open(MEMORY_FILE, "r", encoding="utf-8") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return []
 
+def load_memory(user_id=None):
+    queued = _queued_entries(user_id)
+    with user_memory(user_id) as memory:
+        return _with_queued(memory.store.load_all(), queued)
 
-def save_memory(entry):
-    """Appends structured memory entry to persistent file."""
-    data = load_memory()
-    data.append(entry)
-    with open(MEMORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
 
+def _by_user(items):
+    by_user = {}
+    for user_id, entry in items:
+        by_user.setdefault(user_id, []).append(entry)
+    return by_user
 
-def record_session(goal, duration, reflection, actual_focus=None, fatigue_score=None, breaks_taken=0):
+
+@instrument("memory.commit_batch")
+def _commit_entries(items):
+    """Writer-thread side: the batch's (user_id, entry) items are committed per user, in order."""
+    for user_id, entries in _by_user(items).items():
+        with user_memory(user_id) as memory:
+            memory.commit(entries)
+
+
+def _replay_entries(items):
+    """Journaled entries of a crashed process; skips those its last batch already committed."""
+    for user_id, entries in _by_user(items).items():
+        with user_memory(user_id) as memory:
+            tail = memory.store.recent(2 * len(entries))
+            fresh = [e for e in entries if e not in tail]
+            if fresh:
+                memory.commit(fresh)
+
+
+def _queued_entries(user_id):
+    """Entries of `user_id` still waiting in the write-behind queue."""
+    return [entry for uid, entry in _writer.pending() if uid == user_id]
+
+
+def _with_queued(data, queued, n=None):
+    """Committed entries plus queued ones. `queued` must be read before `data`, so an entry
+    committed in between is in both (and dropped here) rather than in neither."""
+    if queued:
+        tail = data[-2 * len(queued):]
+        data = data + [e for e in queued if e not in tail]
+    return data[-n:] if n is not None else data
+
+
+_BOILERPLATE = {"Initial plan (pre-reflection)", "User feedback after execution."}
+_MARKDOWN = re.compile(r"^[#>*\-\d.\s]+|[*_`]+")
+_PACING = re.compile(r"\d+\s*(?:-\s*\d+\s*)?-?\s*min", re.IGNORECASE)
+DIGEST_GIST_CHARS = 100
+
+
+def _gist(reflection):
+    """The most useful line of a reflection: a work/break pacing line if there is one."""
+    lines = [_MARKDOWN.sub("", l).strip() for l in reflection.splitlines()]
+    lines = [l for l in lines if len(l) > 20]
+    if not lines:
+        return None
+    pacing = [l for l in lines if _PACING.search(l)]
+    with_breaks = [l for l in pacing if "break" in l.lower()]
+    gist = (with_breaks or pacing or lines)[0]
+    if len(gist) > DIGEST_GIST_CHARS:
+        gist = gist[:DIGEST_GIST_CHARS].rsplit(" ", 1)[0] + "…"
+    return gist
+
+
+def make_digest(entry):
+    """One-line summary of a session: numbers plus the gist of its reflection (never the full text)."""
+    parts = [f"{entry.get('goal', '?')} ({entry.get('duration', '?')})"]
+    if entry.get("actual_focus_minutes"):
+        parts.append(f"focus {entry['actual_focus_minutes']} min")
+    if entry.get("fatigue_score"):
+        parts.append(f"fatigue {entry['fatigue_score']}/5")
+    if entry.get("breaks_taken"):
+        parts.append(f"{entry['breaks_taken']} breaks")
+    reflection = (entry.get("reflection") or "").strip()
+    gist = _gist(reflection) if reflection not in _BOILERPLATE else None
+    if gist:
+        parts.append(f"note: {gist}")
+    return " · ".join(parts)
+
+
+_writer = WriteBehindQueue(
+    _commit_entries, MEMORY_JOURNAL_DIR, MEMORY_QUEUE_SIZE, replay=_replay_entries, name="memory-writer"
+)
+atexit.register(_writer.close, SHUTDOWN_TIMEOUT)
+
+
+def save_memory(entry, user_id=None):
+    """Queues a structured memory entry; the writer thread appends it and updates the aggregates.
+    Returns without waiting for disk (blocks only while the queue is full); see flush_memory()."""
+    _writer.submit((user_id, entry))
+
+
+def flush_memory(timeout=None):
+    """Waits until every queued entry is committed; False if `timeout` expired first."""
+    return _writer.flush(timeout)
+
+
+def shutdown_memory_writer(timeout=SHUTDOWN_TIMEOUT):
+    """Flushes and stops the writer thread (also run at exit); the next record_session restarts it."""
+    return _writer.close(timeout)
+
+
+def get_write_queue_stats():
+    """Depth, lag, batch sizes and backpressure (blocked submits / ms) of the memory write queue."""
+    return _writer.stats()
+
+
+@instrument("memory.record_session")
+def record_session(goal, duration, reflection, actual_focus=None, fatigue_score=None, breaks_taken=0, task_type=None,
+                   user_id=None):
     """Stores structured feedback for each session."""
     entry = {
         "goal": goal,
@@ -31,14 +282,18 @@ def record_session(goal, duration, reflection, actual_focus=None, fatigue_score=
         "actual_focus_minutes": actual_focus,
         "breaks_taken": breaks_taken,
         "fatigue_score": fatigue_score,
+        "task_type": task_type,
         "timestamp": datetime.now().isoformat()
     }
-    save_memory(entry)
+    entry["digest"] = make_digest(entry)
+    save_memory(entry, user_id)
 
 
-def get_recent_sessions(n=3):
-    """Returns recent sessions as text for reflection context."""
-    data = load_memory()[-n:]
+def get_recent_sessions(n=3, user_id=None):
+    """Returns recent sessions as text for reflection context (including queued ones)."""
+    queued = _queued_entries(user_id)
+    with user_memory(user_id) as memory:
+        data = _with_queued(memory.store.recent(n), queued, n) if n > 0 else []
     if not data:
         return "No previous sessions found."
     summary = []
@@ -48,10 +303,33 @@ def get_recent_sessions(n=3):
     return "\n".join(summary)
 
 
-def compute_average_focus_time():
-    """Computes avg actual focus minutes from recorded memory."""
-    data = [d for d in load_memory() if d.get("actual_focus_minutes")]
+def get_recent_digests(n=3, user_id=None):
+    """Compact per-session digests (stored with each entry) for LLM prompts."""
+    queued = _queued_entries(user_id)
+    with user_memory(user_id) as memory:
+        data = _with_queued(memory.store.recent(n), queued, n) if n > 0 else []
     if not data:
-        return None
-    total = sum(d["actual_focus_minutes"] for d in data)
-    return round(total / len(data), 1)
+        return "No previous sessions found."
+    return "\n".join(f"- {d.get('digest') or make_digest(d)}" for d in data)
+
+
+def compute_average_focus_time(user_id=None):
+    """Avg actual focus minutes, read from the running aggregates."""
+    avg = get_stats(user_id).mean()
+    return round(avg, 1) if avg is not None else None
+
+
+def get_focus_stats(goal=None, user_id=None):
+    """Variance, EWMA and fatigue trend (plus the goal's own average) without scanning memory."""
+    stats = get_stats(user_id)
+    summary = stats.summary()
+    if goal is not None:
+        goal_avg = stats.goal_mean(goal)
+        summary["goal_avg_focus"] = round(goal_avg, 1) if goal_avg is not None else None
+    return summary
+
+
+def get_focus_profile(goal=None, days=90, user_id=None):
+    """Percentile range, 7-day mean, best hours and fatigue with/without breaks over the last `days` days."""
+    with user_memory(user_id) as memory:
+        return memory.get_analytics().profile(goal, days=days)
@@ -0,0 +1,129 @@
+"""
+Running aggregates over the session memory.
+Updated once per recorded session and persisted next to the store,
+so the planner can read mean / variance / EWMA / per-goal stats in O(1).
+"""
+
+from __future__ import annotations
+import math
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+EWMA_ALPHA = 0.3        # smoothing for focus minutes and fatigue
+FAST_ALPHA = 0.5        # fatigue trend = fast EWMA - slow EWMA
+SLOW_ALPHA = 0.1
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def _ewma(prev: Optional[float], value: float, alpha: float) -> float:
+    return value if prev is None else alpha * value + (1 - alpha) * prev
+
+
+def _bucket(buckets: Dict[str, Dict[str, float]], key: str, value: float) -> None:
+    b = buckets.setdefault(key, {"count": 0, "sum": 0.0})
+    b["count"] += 1
+    b["sum"] += value
+
+
+class FocusStats:
+    """Count / sum / sum of squares of focus minutes plus breakdowns and EWMAs."""
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        data = data or {}
+        self.entries: int = data.get("entries", 0)          # all sessions seen, for drift checks
+        self.count: int = data.get("count", 0)              # sessions with focus minutes
+        self.total: float = data.get("total", 0.0)
+        self.total_sq: float = data.get("total_sq", 0.0)
+        self.by_goal: Dict[str, Dict[str, float]] = data.get("by_goal", {})
+        self.by_weekday: Dict[str, Dict[str, float]] = data.get("by_weekday", {})
+        self.ewma_focus: Optional[float] = data.get("ewma_focus")
+        self.fatigue_count: int = data.get("fatigue_count", 0)
+        self.fatigue_total: float = data.get("fatigue_total", 0.0)
+        self.ewma_fatigue: Optional[float] = data.get("ewma_fatigue")
+        self.fatigue_fast: Optional[float] = data.get("fatigue_fast")
+        self.fatigue_slow: Optional[float] = data.get("fatigue_slow")
+        self.breaks_total: int = data.get("breaks_total", 0)
+
+    @classmethod
+    def rebuild(cls, entries: Iterable[Dict[str, Any]]) -> "FocusStats":
+        stats = cls()
+        for e in entries:
+            stats.update(e)
+        return stats
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+    def update(self, entry: Dict[str, Any]) -> None:
+        self.entries += 1
+        focus = entry.get("actual_focus_minutes")
+        if focus:
+            focus = float(focus)
+            self.count += 1
+            self.total += focus
+            self.total_sq += focus * focus
+            self.ewma_focus = _ewma(self.ewma_focus, focus, EWMA_ALPHA)
+            _bucket(self.by_goal, entry.get("goal") or "", focus)
+            weekday = _weekday(entry.get("timestamp"))
+            if weekday is not None:
+                _bucket(self.by_weekday, weekday, focus)
+        fatigue = entry.get("fatigue_score")
+        if fatigue:
+            fatigue = float(fatigue)
+            self.fatigue_count += 1
+            self.fatigue_total += fatigue
+            self.ewma_fatigue = _ewma(self.ewma_fatigue, fatigue, EWMA_ALPHA)
+            self.fatigue_fast = _ewma(self.fatigue_fast, fatigue, FAST_ALPHA)
+            self.fatigue_slow = _ewma(self.fatigue_slow, fatigue, SLOW_ALPHA)
+        self.breaks_total += int(entry.get("breaks_taken") or 0)
+
+    # --- O(1) reads ---
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def variance(self) -> Optional[float]:
+        if not self.count:
+            return None
+        m = self.total / self.count
+        return max(self.total_sq / self.count - m * m, 0.0)
+
+    def stdev(self) -> Optional[float]:
+        v = self.variance()
+        return math.sqrt(v) if v is not None else None
+
+    def fatigue_trend(self) -> Optional[float]:
+        """Positive when recent fatigue is above the long-run level."""
+        if self.fatigue_fast is None or self.fatigue_slow is None:
+            return None
+        return self.fatigue_fast - self.fatigue_slow
+
+    def goal_mean(self, goal: str) -> Optional[float]:
+        b = self.by_goal.get(goal)
+        return b["sum"] / b["count"] if b and b["count"] else None
+
+    def summary(self) -> Dict[str, Any]:
+        def r(x):
+            return round(x, 1) if x is not None else None
+
+        return {
+            "sessions": self.entries,
+            "focus_sessions": self.count,
+            "avg_focus": r(self.mean()),
+            "focus_variance": r(self.variance()),
+            "focus_stdev": r(self.stdev()),
+            "ewma_focus": r(self.ewma_focus),
+            "avg_fatigue": r(self.fatigue_total / self.fatigue_count) if self.fatigue_count else None,
+            "ewma_fatigue": r(self.ewma_fatigue),
+            "fatigue_trend": round(self.fatigue_trend(), 2) if self.fatigue_trend() is not None else None,
+            "avg_focus_by_weekday": {
+                d: r(self.by_weekday[d]["sum"] / self.by_weekday[d]["count"])
+                for d in WEEKDAYS if d in self.by_weekday
+            },
+        }
+
+
+def _weekday(timestamp: Optional[str]) -> Optional[str]:
+    try:
+        return WEEKDAYS[datetime.fromisoformat(timestamp).weekday()]
+    except (TypeError, ValueError):
+        return None
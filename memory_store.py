@@ -0,0 +1,355 @@
+"""
+Storage backends for the session memory.
+- JsonArrayStore: legacy single JSON array (rewrites the whole file per write)
+- JsonlStore: append-only JSONL log + sidecar offset index (O(1) appends)
+- SqliteStore: SQLite table indexed on timestamp and goal
+All backends share the same small interface so memory_manager can swap them.
+"""
+
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import struct
+import threading
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, List, Optional
+
+from locking import atomic_write_text, locked
+
+_OFFSET = struct.Struct("<Q")  # one little-endian uint64 per record
+
+
+class MemoryStore:
+    """Interface shared by every memory backend."""
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def extend(self, entries: List[Dict[str, Any]]) -> None:
+        for entry in entries:
+            self.append(entry)
+
+    def recent(self, n: int) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def iter_entries(self) -> Iterator[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def load_all(self) -> List[Dict[str, Any]]:
+        return list(self.iter_entries())
+
+    def query(self, goal: Optional[str] = None, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Entries matching `goal` and/or with timestamp >= `since` (ISO string)."""
+        return [
+            e for e in self.iter_entries()
+            if (goal is None or e.get("goal") == goal)
+            and (since is None or e.get("timestamp", "") >= since)
+        ]
+
+    # Small named blobs kept next to the log (e.g. running aggregates)
+    def _meta_path(self, key: str) -> Path:
+        return self.path.with_name(f"{self.path.stem}.{key}.json")
+
+    def load_meta(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._meta_path(key)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            return None
+
+    def save_meta(self, key: str, value: Dict[str, Any]) -> None:
+        atomic_write_text(self._meta_path(key), json.dumps(value, ensure_ascii=False))
+
+    def lock(self) -> ContextManager[None]:
+        """Exclusive access across threads and processes (re-entrant within a thread)."""
+        return locked(self.path)
+
+    def close(self) -> None:
+        pass
+
+
+# ------------------ Legacy JSON array ----------------------
+class JsonArrayStore(MemoryStore):
+    """The original format: one JSON array, rewritten on every append."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def load_all(self) -> List[Dict[str, Any]]:
+        if not self.path.exists():
+            return []
+        with open(self.path, "r", encoding="utf-8") as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                return []
+
+    def iter_entries(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.load_all())
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        self.extend([entry])
+
+    def extend(self, entries: List[Dict[str, Any]]) -> None:
+        with self.lock():
+            data = self.load_all()
+            data.extend(entries)
+            atomic_write_text(self.path, json.dumps(data, indent=2))
+
+    def recent(self, n: int) -> List[Dict[str, Any]]:
+        return self.load_all()[-n:] if n > 0 else []
+
+    def count(self) -> int:
+        return len(self.load_all())
+
+
+# ------------------ Append-only JSONL ----------------------
+class JsonlStore(MemoryStore):
+    """
+    Append-only log with a sidecar index of byte offsets (8 bytes per record).
+    Appends touch only the file tails; recent(n) reads only the last n lines.
+    Only decodable lines are indexed, so count() matches what iter_entries() yields.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+        with self.lock():
+            self._check_index()
+
+    def _check_index(self) -> None:
+        """Rebuild the index if it is missing or out of step with the log (e.g. after a crash)."""
+        log_size = self.path.stat().st_size if self.path.exists() else 0
+        idx_size = self.index_path.stat().st_size if self.index_path.exists() else 0
+        if log_size == 0 and idx_size == 0:
+            return
+        if idx_size % _OFFSET.size == 0 and idx_size > 0:
+            with open(self.index_path, "rb") as idx:
+                idx.seek(idx_size - _OFFSET.size)
+                (last,) = _OFFSET.unpack(idx.read(_OFFSET.size))
+            if last < log_size:
+                with open(self.path, "rb") as log:
+                    log.seek(last)
+                    line = log.readline()
+                if line.endswith(b"\n") and last + len(line) == log_size:
+                    return
+        self._rebuild_index()
+
+    def _rebuild_index(self) -> None:
+        """Index every decodable line; an undecodable last line is a torn append and is cut off."""
+        offsets = bytearray()
+        if self.path.exists():
+            with open(self.path, "rb") as log:
+                pos, last = 0, None
+                for line in log:
+                    if _decode(line) is not None:
+                        offsets += _OFFSET.pack(pos)
+                        last = None
+                    elif line.strip():
+                        last = pos
+                    pos += len(line)
+                if last is None and pos and not line.endswith(b"\n"):
+                    # a complete record that only lost its newline: terminate it
+                    with open(self.path, "ab") as fix:
+                        fix.write(b"\n")
+            if last is not None:
+                with open(self.path, "r+b") as fix:
+                    fix.truncate(last)
+        tmp = self.index_path.with_name(self.index_path.name + f".{os.getpid()}.tmp")
+        tmp.write_bytes(bytes(offsets))
+        os.replace(tmp, self.index_path)
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        self.extend([entry])
+
+    def extend(self, entries: List[Dict[str, Any]]) -> None:
+        lines = [(json.dumps(e, ensure_ascii=False) + "\n").encode("utf-8") for e in entries]
+        if not lines:
+            return
+        with self.lock():
+            offsets = bytearray()
+            with open(self.path, "ab") as log:
+                pos = log.seek(0, os.SEEK_END)
+                for line in lines:
+                    offsets += _OFFSET.pack(pos)
+                    pos += len(line)
+                log.write(b"".join(lines))
+            with open(self.index_path, "ab") as idx:
+                idx.write(bytes(offsets))
+
+    def count(self) -> int:
+        if not self.index_path.exists():
+            return 0
+        return self.index_path.stat().st_size // _OFFSET.size
+
+    def recent(self, n: int) -> List[Dict[str, Any]]:
+        # lock-free: the log is always written before the index, so the indexed
+        # records are complete; lines appended after our index snapshot are dropped,
+        # as are undecodable lines the index skips
+        total = self.count()
+        k = min(max(n, 0), total)
+        if k == 0:
+            return []
+        with open(self.index_path, "rb") as idx:
+            idx.seek((total - k) * _OFFSET.size)
+            (start,) = _OFFSET.unpack(idx.read(_OFFSET.size))
+        with open(self.path, "rb") as log:
+            log.seek(start)
+            lines = log.read().splitlines()
+        return [e for e in (_decode(l) for l in lines) if e is not None][:k]
+
+    def iter_entries(self) -> Iterator[Dict[str, Any]]:
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as log:
+            for line in log:
+                entry = _decode(line)
+                if entry is not None:
+                    yield entry
+
+
+def _decode(line: bytes) -> Optional[Dict[str, Any]]:
+    if not line.strip():
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+
+# ------------------ SQLite ----------------------
+class SqliteStore(MemoryStore):
+    """One row per session; the full entry is kept as JSON, goal/timestamp are indexed.
+    The row count lives in the meta table (updated in the inserting transaction) so count() is O(1)."""
+
+    _COUNT_KEY = "_row_count"
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()  # guards the shared connection
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT,
+                goal TEXT,
+                entry TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_sessions_timestamp ON sessions(timestamp);
+            CREATE INDEX IF NOT EXISTS idx_sessions_goal ON sessions(goal);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        if self._conn.execute("SELECT 1 FROM meta WHERE key = ?", (self._COUNT_KEY,)).fetchone() is None:
+            # stores created before the counter existed: one scan, then kept up to date by extend()
+            self._conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) SELECT ?, COUNT(*) FROM sessions", (self._COUNT_KEY,)
+            )
+        self._conn.commit()
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        self.extend([entry])
+
+    def extend(self, entries: List[Dict[str, Any]]) -> None:
+        rows = [(e.get("timestamp"), e.get("goal"), json.dumps(e, ensure_ascii=False)) for e in entries]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO sessions (timestamp, goal, entry) VALUES (?, ?, ?)", rows
+            )
+            self._conn.execute(
+                "UPDATE meta SET value = CAST(value AS INTEGER) + ? WHERE key = ?", (len(rows), self._COUNT_KEY)
+            )
+            self._conn.commit()
+
+    def recent(self, n: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT entry FROM sessions ORDER BY id DESC LIMIT ?", (max(n, 0),)
+            ).fetchall()
+        return [json.loads(r[0]) for r in reversed(rows)]
+
+    def iter_entries(self) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT entry FROM sessions ORDER BY id").fetchall()
+        for (raw,) in rows:
+            yield json.loads(raw)
+
+    def count(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (self._COUNT_KEY,)).fetchone()
+        return int(row[0])
+
+    def query(self, goal: Optional[str] = None, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        sql, params = "SELECT entry FROM sessions WHERE 1=1", []
+        if goal is not None:
+            sql += " AND goal = ?"
+            params.append(goal)
+        if since is not None:
+            sql += " AND timestamp >= ?"
+            params.append(since)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY id", params).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def load_meta(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_meta(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                (key, json.dumps(value, ensure_ascii=False)),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# ------------------ Factory & migration ----------------------
+BACKENDS = {
+    "json": (JsonArrayStore, ".json"),
+    "jsonl": (JsonlStore, ".jsonl"),
+    "sqlite": (SqliteStore, ".sqlite3"),
+}
+
+
+def store_path(backend: str, base_path) -> Path:
+    """Path of a backend's file derived from the base memory file name."""
+    return Path(base_path).with_suffix(BACKENDS[backend][1])
+
+
+def open_store(backend: str, base_path) -> MemoryStore:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown memory backend: {backend}")
+    cls, _ = BACKENDS[backend]
+    return cls(store_path(backend, base_path))
+
+
+def migrate_json_array(src, store: MemoryStore) -> int:
+    """
+    One-shot import of a legacy JSON-array memory file into `store`.
+    The source is renamed to `<name>.migrated` so it is never imported twice.
+    Returns the number of migrated entries.
+    """
+    src = Path(src)
+    if isinstance(store, JsonArrayStore) or not src.exists():
+        return 0
+    entries = JsonArrayStore(src).load_all()
+    store.extend(entries)
+    os.replace(src, src.with_name(src.name + ".migrated"))
+    return len(entries)
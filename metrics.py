@@ -0,0 +1,160 @@
+"""
+In-process instrumentation for the focus graph.
+- span(name, **attrs): times a block and records it (plus attrs such as tokens or cache_hit)
+- MetricsRegistry: per-name latency samples with p50/p95/p99, token and cache-hit totals
+- run_trace(label): collects every span of one run; last_run_breakdown() returns it
+- FOCUS_TRACE_FILE=path: also append each span as a JSON line (off by default)
+"""
+
+from __future__ import annotations
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+SAMPLE_WINDOW = 2048  # latency samples kept per metric
+
+_current_run: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("focus_run", default=None)
+
+
+def _percentile(sorted_vals: List[float], q: float) -> float:
+    idx = min(int(round(q * (len(sorted_vals) - 1))), len(sorted_vals) - 1)
+    return sorted_vals[idx]
+
+
+class MetricsRegistry:
+    def __init__(self, window: int = SAMPLE_WINDOW):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self._counts: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    def observe(self, name: str, seconds: float, attrs: Dict[str, Any]) -> None:
+        with self._lock:
+            self._samples[name].append(seconds)
+            counts = self._counts[name]
+            counts["count"] += 1
+            for key in ("input_tokens", "output_tokens"):
+                if attrs.get(key):
+                    counts[key] += attrs[key]
+            if attrs.get("cache_hit"):
+                counts["cache_hits"] += 1
+            if attrs.get("error"):
+                counts["errors"] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            out = {}
+            for name, samples in sorted(self._samples.items()):
+                vals = sorted(samples)
+                row = {
+                    "count": int(self._counts[name]["count"]),
+                    "p50_ms": round(_percentile(vals, 0.50) * 1000, 2),
+                    "p95_ms": round(_percentile(vals, 0.95) * 1000, 2),
+                    "p99_ms": round(_percentile(vals, 0.99) * 1000, 2),
+                    "mean_ms": round(sum(vals) / len(vals) * 1000, 2),
+                }
+                for key in ("input_tokens", "output_tokens", "cache_hits", "errors"):
+                    if self._counts[name].get(key):
+                        row[key] = int(self._counts[name][key])
+                out[name] = row
+            return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+registry = MetricsRegistry()
+_trace_lock = threading.Lock()
+_last_run: Dict[str, Any] = {}
+
+
+def _write_trace(record: Dict[str, Any]) -> None:
+    path = os.getenv("FOCUS_TRACE_FILE")
+    if not path:
+        return
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _trace_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """Time the block; the yielded dict can be filled with tokens / cache_hit on the way."""
+    t0 = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - t0
+        registry.observe(name, elapsed, attrs)
+        run = _current_run.get()
+        record = {"name": name, "ms": round(elapsed * 1000, 2), **attrs}
+        if run is not None:
+            run["spans"].append(record)
+        _write_trace({"ts": time.time(), "run": run["id"] if run else None, **record})
+
+
+def instrument(name: str):
+    """Decorator form of span(); works for plain and async functions."""
+
+    def wrap(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def ainner(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+
+            return ainner
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return inner
+
+    return wrap
+
+
+@contextmanager
+def run_trace(label: str) -> Iterator[Dict[str, Any]]:
+    """Collect all spans recorded while the block runs (including graph worker threads)."""
+    global _last_run
+    run = {"id": uuid.uuid4().hex[:12], "label": label, "spans": []}
+    token = _current_run.set(run)
+    t0 = time.perf_counter()
+    try:
+        yield run
+    finally:
+        run["total_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        try:
+            _current_run.reset(token)
+        except ValueError:  # generator resumed in another context (e.g. streamed UI)
+            _current_run.set(None)
+        _last_run = run
+
+
+def last_run_breakdown() -> Dict[str, Any]:
+    """{"id", "label", "total_ms", "spans": [{"name", "ms", ...}]} of the most recent run."""
+    return _last_run
+
+
+def get_metrics() -> Dict[str, Dict[str, Any]]:
+    return registry.snapshot()
+
+
+def usage_of(reply: Any) -> Dict[str, int]:
+    """input/output token counts from a LangChain message's usage_metadata, if present."""
+    usage = getattr(reply, "usage_metadata", None) or {}
+    return {k: usage[k] for k in ("input_tokens", "output_tokens") if usage.get(k)}
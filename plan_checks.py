@@ -0,0 +1,187 @@
+"""
+Cheap local review of a generated plan, used to decide whether the reflector pass
+(a second LLM call) is worth running.
+- check_plan(): parses timed steps out of the plan text and checks that they fit the
+  session length, that focus blocks / breaks match the user's focus window, and that
+  one of the free calendar slots was used
+- should_reflect(): applies a reflection mode ("adaptive" / "merged" / "always")
+- record_review() / record_reflection(): skip-rate and latency-saved bookkeeping;
+  get_reflection_stats() reports it
+"""
+
+from __future__ import annotations
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+FIT_MIN, FIT_MAX = 0.75, 1.10  # steps must cover 75–110% of the session
+DEFAULT_FOCUS_WINDOW = 90  # minutes, when the user has no history yet
+BLOCK_SLACK = 1.25  # a focus block may exceed the user's average window by 25%
+
+_RANGE = re.compile(r"\b(\d{1,2})[:.](\d{2})\s*(?:-|–|—|→|to)\s*(\d{1,2})[:.](\d{2})\b")
+_AMOUNT = re.compile(r"(\d+(?:\.\d+)?)\s*(minutes?|mins?|m|hours?|hrs?|h)\b", re.IGNORECASE)
+_BREAK = re.compile(r"\b(break|rest|pause|stretch|walk|lunch|recharge)\b", re.IGNORECASE)
+_SKIP_LINE = re.compile(r"\b(total|duration|session length)\b", re.IGNORECASE)
+_CLOCK = re.compile(r"T(\d{2}:\d{2})")
+
+
+@dataclass
+class Step:
+    minutes: float
+    is_break: bool
+    start: Optional[int] = None  # minutes after midnight, when the step has a time range
+
+
+@dataclass
+class PlanReview:
+    ok: bool
+    issues: List[str] = field(default_factory=list)
+    total_minutes: float = 0.0
+    longest_block: float = 0.0
+    breaks: int = 0
+    used_slot: Optional[bool] = None
+
+
+def _minutes(h: str, m: str) -> int:
+    return int(h) * 60 + int(m)
+
+
+def parse_steps(plan: str) -> List[Step]:
+    """One step per line that carries a time range ("09:00-09:50") or an amount ("25 min")."""
+    steps = []
+    for line in plan.splitlines():
+        if _SKIP_LINE.search(line):
+            continue
+        rng = _RANGE.search(line)
+        if rng:
+            start, end = _minutes(*rng.group(1, 2)), _minutes(*rng.group(3, 4))
+            if end <= start:
+                end += 12 * 60 if end + 12 * 60 > start else 24 * 60  # 11:30-1:00 style or midnight
+            steps.append(Step(end - start, bool(_BREAK.search(line)), start))
+            continue
+        amt = _AMOUNT.search(line)
+        if amt:
+            value, unit = float(amt.group(1)), amt.group(2).lower()
+            steps.append(Step(value * 60 if unit.startswith("h") else value, bool(_BREAK.search(line))))
+    return steps
+
+
+def _slot_used(plan: str, steps: Sequence[Step], free_slots: Sequence[Dict[str, str]]) -> bool:
+    for slot in free_slots:
+        s, e = _CLOCK.search(slot.get("start", "")), _CLOCK.search(slot.get("end", ""))
+        if not s:
+            continue
+        if s.group(1) in plan:
+            return True
+        lo = _minutes(*s.group(1).split(":"))
+        hi = _minutes(*e.group(1).split(":")) if e else lo + 24 * 60
+        if hi <= lo:
+            hi += 24 * 60
+        if any(st.start is not None and lo <= st.start < hi for st in steps):
+            return True
+    return False
+
+
+def check_plan(
+    plan: str,
+    duration_min: int,
+    avg_focus: Optional[float] = None,
+    free_slots: Optional[Sequence[Dict[str, str]]] = None,
+) -> PlanReview:
+    steps = parse_steps(plan)
+    if not steps:
+        return PlanReview(ok=False, issues=["no timed steps"])
+
+    total = sum(s.minutes for s in steps)
+    longest = run = 0.0
+    for s in steps:
+        run = 0.0 if s.is_break else run + s.minutes
+        longest = max(longest, run)
+    breaks = sum(s.is_break for s in steps)
+    window = avg_focus or DEFAULT_FOCUS_WINDOW
+    review = PlanReview(ok=True, total_minutes=total, longest_block=longest, breaks=breaks)
+
+    if not FIT_MIN * duration_min <= total <= FIT_MAX * duration_min:
+        review.issues.append("duration mismatch")
+    if longest > window * BLOCK_SLACK:
+        review.issues.append("focus block too long")
+    if duration_min > window and not breaks:
+        review.issues.append("no breaks")
+    if free_slots:
+        review.used_slot = _slot_used(plan, steps, free_slots)
+        if not review.used_slot:
+            review.issues.append("no free slot used")
+    review.ok = not review.issues
+    return review
+
+
+def should_reflect(
+    mode: str,
+    plan: str,
+    duration_min: int,
+    avg_focus: Optional[float] = None,
+    free_slots: Optional[Sequence[Dict[str, str]]] = None,
+) -> bool:
+    """
+    "merged": never (the planner prompt already carried the reflection instructions);
+    "adaptive": only when check_plan() finds issues; anything else: always.
+    The outcome is recorded for get_reflection_stats().
+    """
+    if mode == "merged":
+        record_review("merged")
+        return False
+    if mode != "adaptive":
+        record_review("reflected")
+        return True
+    review = check_plan(plan, duration_min, avg_focus=avg_focus, free_slots=free_slots)
+    record_review("skipped" if review.ok else "reflected", review.issues)
+    return not review.ok
+
+
+# ------------------ Skip / latency bookkeeping ----------------------
+_lock = threading.Lock()
+_stats: Dict[str, Any] = {
+    "reviewed": 0, "reflected": 0, "skipped": 0, "merged": 0,
+    "reflection_runs": 0, "reflection_seconds": 0.0, "seconds_saved": 0.0,
+}
+_issues: Counter = Counter()
+
+
+def _avg_reflection_seconds() -> Optional[float]:
+    runs = _stats["reflection_runs"]
+    return _stats["reflection_seconds"] / runs if runs else None
+
+
+def record_review(outcome: str, issues: Sequence[str] = ()) -> None:
+    """outcome: "reflected" | "skipped" | "merged". Skips are credited the average reflector latency."""
+    with _lock:
+        _stats["reviewed"] += 1
+        _stats[outcome] += 1
+        _issues.update(issues)
+        if outcome != "reflected":
+            _stats["seconds_saved"] += _avg_reflection_seconds() or 0.0
+
+
+def record_reflection(seconds: float) -> None:
+    with _lock:
+        _stats["reflection_runs"] += 1
+        _stats["reflection_seconds"] += seconds
+
+
+def get_reflection_stats() -> Dict[str, Any]:
+    """{reviewed, reflected, skipped, merged, skip_rate, avg_reflection_s, est_seconds_saved, issues}."""
+    with _lock:
+        avg = _avg_reflection_seconds()
+        reviewed = _stats["reviewed"]
+        return {
+            "reviewed": reviewed,
+            "reflected": _stats["reflected"],
+            "skipped": _stats["skipped"],
+            "merged": _stats["merged"],
+            "skip_rate": round((_stats["skipped"] + _stats["merged"]) / reviewed, 3) if reviewed else None,
+            "avg_reflection_s": round(avg, 3) if avg is not None else None,
+            "est_seconds_saved": round(_stats["seconds_saved"], 3),
+            "issues": dict(_issues),
+        }
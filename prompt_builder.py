@@ -0,0 +1,149 @@
+"""
+Token-budgeted prompt assembly for the graph nodes.
+- count_tokens(): local regex estimate by default; PROMPT_TOKENIZER=tiktoken switches
+  to exact counts (the o200k_base encoding must be obtainable on that machine)
+- PromptBuilder: messages made of fixed and trimmable blocks; trimmable blocks lose
+  trailing lines (last block first) until the node's budget is met
+- get_prompt_token_stats(): prompt sizes per node
+"""
+
+from __future__ import annotations
+import os
+import re
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple, Union
+
+# per-node prompt budgets (tokens); override with e.g. PROMPT_BUDGET_PLANNER_AGENT=900
+NODE_BUDGETS = {
+    "planner_agent": 1200,
+    "research_agent": 800,
+    "reflection_agent": 1600,
+}
+DEFAULT_BUDGET = 1200
+MESSAGE_OVERHEAD = 4  # role/separator tokens per chat message
+TRIM_MARKER = "…"
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_encoder = None
+_encoder_loaded = False
+
+
+def _get_encoder():
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        _encoder_loaded = True
+        if os.getenv("PROMPT_TOKENIZER") == "tiktoken":
+            try:
+                import tiktoken
+
+                _encoder = tiktoken.get_encoding("o200k_base")
+            except Exception:
+                _encoder = None
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    enc = _get_encoder()
+    if enc is not None:
+        return len(enc.encode(text))
+    # words and punctuation, plus ~1 extra token per 8 chars of long words
+    return sum(1 + len(t) // 8 for t in _TOKEN.findall(text))
+
+
+def budget_for(node: str) -> int:
+    env = os.getenv(f"PROMPT_BUDGET_{node.upper()}")
+    return int(env) if env else NODE_BUDGETS.get(node, DEFAULT_BUDGET)
+
+
+class Trim(str):
+    """A block that may be shortened (from the end, line by line) to fit the budget."""
+
+
+Block = Union[str, Trim]
+
+_stats: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"calls": 0, "total": 0, "max": 0, "last": 0, "trimmed": 0})
+_stats_lock = threading.Lock()
+
+
+class PromptBuilder:
+    def __init__(self, node: str, budget: int | None = None):
+        self.node = node
+        self.budget = budget if budget is not None else budget_for(node)
+        # (role, [block lines], [trimmable], [was trimmed])
+        self._messages: List[Tuple[str, List[List[str]], List[bool], List[bool]]] = []
+
+    def add(self, role: str, *blocks: Block) -> "PromptBuilder":
+        blocks = [b for b in blocks if b]
+        self._messages.append((
+            role,
+            [str(b).split("\n") for b in blocks],
+            [isinstance(b, Trim) for b in blocks],
+            [False] * len(blocks),
+        ))
+        return self
+
+    def _render(self) -> List[Dict[str, str]]:
+        return [
+            {
+                "role": role,
+                "content": "\n\n".join(
+                    "\n".join(lines + [TRIM_MARKER] if cut else lines)
+                    for lines, cut in zip(blocks, trimmed)
+                ),
+            }
+            for role, blocks, _, trimmed in self._messages
+        ]
+
+    def _total(self, messages: List[Dict[str, str]]) -> int:
+        return sum(count_tokens(m["content"]) + MESSAGE_OVERHEAD for m in messages)
+
+    def build(self) -> List[Dict[str, str]]:
+        messages = self._render()
+        total = self._total(messages)
+        any_trimmed = False
+        # trimmable blocks, last one first; each keeps its first line (its header)
+        candidates = [
+            (blocks[bi], trimmed, bi)
+            for _, blocks, flags, trimmed in self._messages
+            for bi in range(len(blocks))
+            if flags[bi]
+        ]
+        for lines, trimmed, bi in reversed(candidates):
+            if total <= self.budget:
+                break
+            while total > self.budget and len(lines) > 1:
+                total -= count_tokens(lines.pop())
+                trimmed[bi] = any_trimmed = True
+        if any_trimmed:
+            messages = self._render()
+            total = self._total(messages)
+        _record(self.node, total, any_trimmed, self.budget)
+        return messages
+
+
+def _record(node: str, tokens: int, trimmed: bool, budget: int) -> None:
+    with _stats_lock:
+        s = _stats[node]
+        s["budget"] = budget
+        s["calls"] += 1
+        s["total"] += tokens
+        s["last"] = tokens
+        s["max"] = max(s["max"], tokens)
+        s["trimmed"] += int(trimmed)
+
+
+def get_prompt_token_stats() -> Dict[str, Dict[str, Any]]:
+    """{node: {calls, last, avg, max, trimmed, budget}} for every node that built a prompt."""
+    with _stats_lock:
+        return {
+            node: {
+                "calls": s["calls"],
+                "last": s["last"],
+                "avg": round(s["total"] / s["calls"], 1) if s["calls"] else 0,
+                "max": s["max"],
+                "trimmed": s["trimmed"],
+                "budget": s["budget"],
+            }
+            for node, s in _stats.items()
+        }
@@ -0,0 +1,278 @@
+"""
+Persistent cache + local index for the RAG pipeline's web retrieval.
+- Exact tier: the normalized query (lowercased, punctuation/whitespace collapsed)
+  maps to the last search result, served while younger than the TTL
+- Index tier: every result is split into snippets and added to an on-disk BM25
+  index (SQLite postings table). A new query is served from the best-matching
+  snippets when one of them came from a query whose local embedding
+  (llm_cache.embed) is similar enough — e.g. "write a 3 page research report"
+  reuses what was fetched for "Write a 3-page research report."
+- Miss: only then is the web search called; its result is stored for both tiers.
+  If the search fails and an expired exact entry exists, that stale result is
+  returned instead of the error.
+"""
+
+from __future__ import annotations
+import ast
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from llm_cache import _cosine, embed
+from metrics import span
+
+BM25_K1, BM25_B = 1.2, 0.75
+MAX_SNIPPET_CHARS = 320
+CANDIDATES = 20  # BM25 hits whose source queries are compared against the new query
+
+_WORD = re.compile(r"\w+")
+_PUNCT = re.compile(r"[^\w\s]+")
+_WS = re.compile(r"\s+")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from how in is it of on or that the this to with your you".split()
+)
+
+
+def normalize_query(query: str) -> str:
+    return _WS.sub(" ", _PUNCT.sub(" ", query.lower())).strip()
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _WORD.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def split_snippets(result: str, max_chars: int = MAX_SNIPPET_CHARS) -> List[str]:
+    """SerpAPIWrapper.run returns a string or the repr of a list of snippets; sentences are packed up to max_chars."""
+    parts: List[str] = [result]
+    if result.startswith("[") and result.endswith("]"):
+        try:
+            parsed = ast.literal_eval(result)
+            if isinstance(parsed, list):
+                parts = [str(p) for p in parsed]
+        except (ValueError, SyntaxError):
+            pass
+    snippets = []
+    for part in parts:
+        chunk = ""
+        for sentence in _SENTENCE.split(part):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            if chunk and len(chunk) + len(sentence) + 1 > max_chars:
+                snippets.append(chunk)
+                chunk = ""
+            chunk = f"{chunk} {sentence}".strip()
+        if chunk:
+            snippets.append(chunk)
+    return snippets
+
+
+class RetrievalCache:
+    def __init__(
+        self,
+        path,
+        ttl_seconds: float = 7 * 24 * 3600,
+        similarity_threshold: Optional[float] = 0.75,
+        top_k: int = 5,
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold  # None/0 disables the index tier
+        self.top_k = top_k
+        self._lock = threading.Lock()  # guards the shared connection and counters
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS queries (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                result TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS snippets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL,
+                text TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_snippets_key ON snippets(key);
+            CREATE INDEX IF NOT EXISTS idx_snippets_fetched ON snippets(fetched_at);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                snippet_id INTEGER NOT NULL,
+                tf INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_postings_term ON postings(term);
+            CREATE INDEX IF NOT EXISTS idx_postings_snippet ON postings(snippet_id);
+            """
+        )
+        self._conn.commit()
+        self.hits_exact = 0
+        self.hits_index = 0
+        self.hits_stale = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(query: str) -> str:
+        return hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+
+    def _cutoff(self) -> float:
+        return time.time() - self.ttl_seconds
+
+    # ------------------ Exact tier ----------------------
+    def get(self, query: str, allow_stale: bool = False) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, fetched_at FROM queries WHERE key = ?", (self.key(query),)
+            ).fetchone()
+        if row is None or (row[1] < self._cutoff() and not allow_stale):
+            return None
+        return row[0]
+
+    # ------------------ Index tier ----------------------
+    def search(self, query: str) -> List[Tuple[float, str, str]]:
+        """BM25 over live snippets: [(score, snippet, source query)], best first, at most CANDIDATES."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        cutoff = self._cutoff()
+        marks = ",".join("?" * len(terms))
+        with self._lock:
+            n_docs, avgdl = self._conn.execute(
+                "SELECT COUNT(*), AVG(length) FROM snippets WHERE fetched_at >= ?", (cutoff,)
+            ).fetchone()
+            rows = self._conn.execute(
+                f"SELECT p.term, p.snippet_id, p.tf, s.length FROM postings p "
+                f"JOIN snippets s ON s.id = p.snippet_id "
+                f"WHERE p.term IN ({marks}) AND s.fetched_at >= ?",
+                (*terms, cutoff),
+            ).fetchall()
+        if not rows:
+            return []
+        df = Counter(term for term, *_ in rows)
+        scores: Dict[int, float] = defaultdict(float)
+        for term, sid, tf, length in rows:
+            idf = math.log(1 + (n_docs - df[term] + 0.5) / (df[term] + 0.5))
+            norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / (avgdl or 1))
+            scores[sid] += idf * tf * (BM25_K1 + 1) / norm
+        best = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:CANDIDATES]
+        ids = [sid for sid, _ in best]
+        with self._lock:
+            found = {
+                sid: (text, source)
+                for sid, text, source in self._conn.execute(
+                    f"SELECT s.id, s.text, q.query FROM snippets s JOIN queries q ON q.key = s.key "
+                    f"WHERE s.id IN ({','.join('?' * len(ids))})",
+                    ids,
+                )
+            }
+        return [(score, *found[sid]) for sid, score in best if sid in found]
+
+    def lookup(self, query: str) -> Optional[str]:
+        """Top-k indexed snippets among the BM25 candidates that came from a similar enough query."""
+        if not self.similarity_threshold:
+            return None
+        candidates = self.search(query)
+        if not candidates:
+            return None
+        vec = embed(normalize_query(query))
+        sims = {source: _cosine(vec, embed(source)) for source in {c[2] for c in candidates}}
+        similar = [text for _, text, source in candidates if sims[source] >= self.similarity_threshold]
+        if not similar:
+            return None
+        return "\n".join(similar[: self.top_k])
+
+    # ------------------ Writes ----------------------
+    def put(self, query: str, result: str) -> None:
+        """Store the result under the normalized query and (re)index its snippets; expired rows are purged."""
+        key, now = self.key(query), time.time()
+        snippets = [(s, Counter(tokenize(s))) for s in split_snippets(result)]
+        with self._lock:
+            self._purge(key, self._cutoff())
+            self._conn.execute(
+                "INSERT OR REPLACE INTO queries (key, query, result, fetched_at) VALUES (?, ?, ?, ?)",
+                (key, normalize_query(query), result, now),
+            )
+            for text, counts in snippets:
+                sid = self._conn.execute(
+                    "INSERT INTO snippets (key, text, length, fetched_at) VALUES (?, ?, ?, ?)",
+                    (key, text, sum(counts.values()), now),
+                ).lastrowid
+                self._conn.executemany(
+                    "INSERT INTO postings (term, snippet_id, tf) VALUES (?, ?, ?)",
+                    [(term, sid, tf) for term, tf in counts.items()],
+                )
+            self._conn.commit()
+
+    def _purge(self, key: str, cutoff: float) -> None:
+        """Drop the snippets of `key` (about to be replaced) and of every expired query. Caller holds the lock."""
+        stale = "SELECT id FROM snippets WHERE key = ? OR fetched_at < ?"
+        self._conn.execute(f"DELETE FROM postings WHERE snippet_id IN ({stale})", (key, cutoff))
+        self._conn.execute("DELETE FROM snippets WHERE key = ? OR fetched_at < ?", (key, cutoff))
+        # expired exact entries stay (stale-if-error) until they are a week past their TTL
+        self._conn.execute("DELETE FROM queries WHERE fetched_at < ?", (cutoff - 7 * 24 * 3600,))
+
+    # ------------------ Retrieval ----------------------
+    def retrieve(self, query: str, search_fn: Callable[[str], str]) -> Tuple[str, str]:
+        """(result, source) with source "exact" | "index" | "web" | "stale"; search_fn(query) runs only on a miss."""
+        with span("rag.retrieve") as attrs:
+            result = self.get(query)
+            source = "exact"
+            if result is None:
+                result, source = self.lookup(query), "index"
+            if result is None:
+                try:
+                    with span("rag.search"):
+                        result, source = search_fn(query), "web"
+                except Exception:
+                    result, source = self.get(query, allow_stale=True), "stale"
+                    if result is None:
+                        raise
+                else:
+                    self.put(query, result)
+            attrs["source"] = source
+            with self._lock:
+                if source == "exact":
+                    self.hits_exact += 1
+                elif source == "index":
+                    self.hits_index += 1
+                elif source == "stale":
+                    self.hits_stale += 1
+                else:
+                    self.misses += 1
+            return result, source
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.executescript("DELETE FROM postings; DELETE FROM snippets; DELETE FROM queries;")
+            self._conn.commit()
+            self.hits_exact = self.hits_index = self.hits_stale = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queries, snippets = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM queries), (SELECT COUNT(*) FROM snippets)"
+            ).fetchone()
+            total = self.hits_exact + self.hits_index + self.hits_stale + self.misses
+            return {
+                "queries": queries,
+                "snippets": snippets,
+                "hits_exact": self.hits_exact,
+                "hits_index": self.hits_index,
+                "hits_stale": self.hits_stale,
+                "misses": self.misses,
+                "hit_rate": round((total - self.misses) / total, 3) if total else None,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,254 @@
+"""
+Columnar copy of the numeric / categorical session fields for vectorized analytics.
+- One little-endian column file per field (timestamp, focus minutes, fatigue, breaks,
+  goal id, weekday, hour) in `<memory stem>.analytics/`, memory-mapped with NumPy;
+  goal names and the committed row count live in meta.json
+- Appends write only the new rows to each column; a crash between column writes
+  is harmless because readers map just the first `rows` rows of each file
+- An object other threads may be reading is never extended: the writer extends a
+  fork() and publishes it by swapping the reference, so every reader sees one
+  consistent set of rows, maps and goal ids
+- Queries (group-by goal, rolling windows, percentiles, fatigue vs breaks) never
+  touch the JSON entries, so bulky `reflection` strings are not parsed
+Missing focus / fatigue values (None or 0, as in memory_stats) are stored as NaN.
+"""
+
+from __future__ import annotations
+import copy
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from locking import atomic_write_text
+
+COLUMNS = {
+    "ts": "<f8",       # epoch seconds (NaN when the entry has no timestamp)
+    "focus": "<f4",    # actual_focus_minutes
+    "fatigue": "<f4",  # fatigue_score
+    "breaks": "<i2",   # breaks_taken
+    "goal": "<i4",     # index into meta["goals"]
+    "weekday": "<i1",  # 0 = Monday, -1 unknown
+    "hour": "<i1",     # local hour of day, -1 unknown
+}
+DAY = 24 * 3600
+MIN_GROUP = 2  # sessions an hour-of-day bucket needs before it counts as a "best hour"
+
+
+def _number(value) -> float:
+    try:
+        return float(value) if value else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _to_rows(entries: Iterable[Dict[str, Any]], goal_ids: Dict[str, int], goals: List[str]) -> Dict[str, np.ndarray]:
+    cols: Dict[str, list] = {name: [] for name in COLUMNS}
+    for e in entries:
+        try:
+            when = datetime.fromisoformat(e.get("timestamp"))
+            ts, weekday, hour = when.timestamp(), when.weekday(), when.hour
+        except (TypeError, ValueError):
+            ts, weekday, hour = np.nan, -1, -1
+        goal = e.get("goal") or ""
+        if goal not in goal_ids:
+            goal_ids[goal] = len(goals)
+            goals.append(goal)
+        try:
+            breaks = int(e.get("breaks_taken") or 0)
+        except (TypeError, ValueError):
+            breaks = 0
+        cols["ts"].append(ts)
+        cols["focus"].append(_number(e.get("actual_focus_minutes")))
+        cols["fatigue"].append(_number(e.get("fatigue_score")))
+        cols["breaks"].append(breaks)
+        cols["goal"].append(goal_ids[goal])
+        cols["weekday"].append(weekday)
+        cols["hour"].append(hour)
+    return {name: np.asarray(values, dtype=COLUMNS[name]) for name, values in cols.items()}
+
+
+def _stats(values: np.ndarray, qs: Sequence[float] = ()) -> Dict[str, Any]:
+    values = values[~np.isnan(values)]
+    out: Dict[str, Any] = {"count": int(values.size), "mean": round(float(values.mean()), 1) if values.size else None}
+    for q, v in zip(qs, np.percentile(values, qs) if values.size and qs else [None] * len(qs)):
+        out[f"p{q:g}"] = round(float(v), 1) if v is not None else None
+    return out
+
+
+class SessionColumns:
+    def __init__(self, directory):
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.meta_path = self.dir / "meta.json"
+        meta = {}
+        if self.meta_path.exists():
+            try:
+                meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            except json.JSONDecodeError:
+                meta = {}
+        self.rows: int = meta.get("rows", 0)
+        self.goals: List[str] = meta.get("goals", [])
+        self._goal_ids = {g: i for i, g in enumerate(self.goals)}
+        self._maps: Optional[Dict[str, np.ndarray]] = None
+        if self.rows and not all(
+            self._path(n).exists() and self._path(n).stat().st_size >= self.rows * np.dtype(t).itemsize
+            for n, t in COLUMNS.items()
+        ):
+            self.rows = -1  # a column file is missing or short: never matches the store, so it is rebuilt
+
+    def _path(self, name: str) -> Path:
+        return self.dir / f"{name}.col"
+
+    def _save_meta(self) -> None:
+        atomic_write_text(self.meta_path, json.dumps({"rows": self.rows, "goals": self.goals}, ensure_ascii=False))
+
+    # ------------------ Writes ----------------------
+    def extend(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """Appends rows for `entries`; the row count is committed (meta.json) after every column is written."""
+        new = _to_rows(entries, self._goal_ids, self.goals)
+        added = len(new["ts"])
+        if not added:
+            return 0
+        self._maps = None  # drop the mappings before resizing their files
+        for name, dtype in COLUMNS.items():
+            with open(self._path(name), "ab") as f:
+                f.truncate(self.rows * np.dtype(dtype).itemsize)  # discard rows of an interrupted append
+                f.write(new[name].tobytes())  # no fsync: the columns are derived and rebuilt if they drift
+        self.rows += added
+        self._save_meta()
+        return added
+
+    def fork(self) -> "SessionColumns":
+        """A copy to extend() while readers keep using this object (the column files are shared)."""
+        other = copy.copy(self)
+        other.goals, other._goal_ids, other._maps = list(self.goals), dict(self._goal_ids), None
+        return other
+
+    def rebuild(self, entries: Iterable[Dict[str, Any]]) -> None:
+        self._maps = None
+        self.rows, self.goals, self._goal_ids = 0, [], {}
+        for name in COLUMNS:
+            self._path(name).unlink(missing_ok=True)
+        self.extend(entries)
+        self._save_meta()
+
+    # ------------------ Reads ----------------------
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Read-only memory maps of the committed rows (plain empty arrays when there are none)."""
+        if self._maps is None:
+            if self.rows <= 0:
+                self._maps = {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+            else:
+                self._maps = {
+                    name: np.memmap(self._path(name), dtype=dtype, mode="r", shape=(self.rows,))
+                    for name, dtype in COLUMNS.items()
+                }
+        return self._maps
+
+    def mask(self, days: Optional[float] = None, goal: Optional[str] = None, now: Optional[float] = None) -> np.ndarray:
+        """Rows from the last `days` days and/or for `goal`."""
+        cols = self.columns()
+        keep = np.ones(max(self.rows, 0), dtype=bool)
+        if days is not None:
+            now = datetime.now().timestamp() if now is None else now
+            keep &= cols["ts"] >= now - days * DAY
+        if goal is not None:
+            gid = self._goal_ids.get(goal)
+            if gid is None:
+                keep[:] = False
+            else:
+                keep &= cols["goal"] == gid
+        return keep
+
+    def percentiles(self, column: str = "focus", qs: Sequence[float] = (50, 75, 90), **where) -> Dict[str, Any]:
+        return _stats(np.asarray(self.columns()[column][self.mask(**where)], dtype=float), qs)
+
+    def group_by_goal(self, column: str = "focus", qs: Sequence[float] = (50,), days: Optional[float] = None,
+                      now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """{goal: {count, mean, p50…}} of `column`, e.g. average focus by goal over the last 90 days."""
+        cols = self.columns()
+        keep = self.mask(days=days, now=now)
+        values = np.asarray(cols[column][keep], dtype=float)
+        gids = np.asarray(cols["goal"][keep])
+        valid = ~np.isnan(values)
+        values, gids = values[valid], gids[valid]
+        order = np.argsort(gids, kind="stable")
+        values, gids = values[order], gids[order]
+        uniq, starts = np.unique(gids, return_index=True)
+        return {
+            self.goals[g]: _stats(chunk, qs)
+            for g, chunk in zip(uniq, np.split(values, starts[1:]))
+        }
+
+    def rolling_mean(self, column: str = "focus", window_days: float = 7) -> np.ndarray:
+        """Per session: mean of `column` over the sessions in the `window_days` up to it (time order)."""
+        cols = self.columns()
+        order = np.argsort(cols["ts"], kind="stable")
+        ts = np.asarray(cols["ts"][order], dtype=float)
+        values = np.asarray(cols[column][order], dtype=float)
+        valid = ~np.isnan(values)
+        sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+        counts = np.concatenate(([0], np.cumsum(valid)))
+        first = np.searchsorted(ts, ts - window_days * DAY, side="left")
+        last = np.arange(1, ts.size + 1)
+        n = counts[last] - counts[first]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(n > 0, (sums[last] - sums[first]) / n, np.nan)
+
+    def fatigue_by_breaks(self, days: Optional[float] = None, now: Optional[float] = None) -> Dict[int, Dict[str, Any]]:
+        """{breaks taken: {count, mean fatigue}} for sessions with a fatigue score."""
+        cols = self.columns()
+        keep = self.mask(days=days, now=now) & ~np.isnan(cols["fatigue"])
+        breaks = np.asarray(cols["breaks"][keep])
+        fatigue = np.asarray(cols["fatigue"][keep], dtype=float)
+        if not breaks.size:
+            return {}
+        breaks = np.clip(breaks, 0, None)
+        counts = np.bincount(breaks)
+        sums = np.bincount(breaks, weights=fatigue)
+        return {
+            int(b): {"count": int(counts[b]), "mean": round(float(sums[b] / counts[b]), 2)}
+            for b in np.nonzero(counts)[0]
+        }
+
+    def by_hour(self, column: str = "focus", days: Optional[float] = None, now: Optional[float] = None) -> Dict[int, Dict[str, Any]]:
+        cols = self.columns()
+        values = np.asarray(cols[column], dtype=float)
+        keep = self.mask(days=days, now=now) & ~np.isnan(values) & (np.asarray(cols["hour"]) >= 0)
+        hours = np.asarray(cols["hour"][keep], dtype=np.int64)
+        if not hours.size:
+            return {}
+        counts = np.bincount(hours, minlength=24)
+        sums = np.bincount(hours, weights=values[keep], minlength=24)
+        return {
+            int(h): {"count": int(counts[h]), "mean": round(float(sums[h] / counts[h]), 1)}
+            for h in np.nonzero(counts)[0]
+        }
+
+    def profile(self, goal: Optional[str] = None, days: float = 90, now: Optional[float] = None) -> Dict[str, Any]:
+        """Compact personal stats for the planner prompt (all over the last `days` days)."""
+        now = datetime.now().timestamp() if now is None else now
+        recent = self.percentiles("focus", (25, 75), days=days, now=now)
+        out: Dict[str, Any] = {
+            "window_days": days,
+            "sessions": int(self.mask(days=days, now=now).sum()),
+            "focus_p25": recent["p25"],
+            "focus_p75": recent["p75"],
+            "focus_7d": self.percentiles("focus", (), days=7, now=now)["mean"],
+        }
+        if goal is not None:
+            out["goal_focus"] = self.percentiles("focus", (), days=days, goal=goal, now=now)["mean"]
+        hours = {h: s for h, s in self.by_hour(days=days, now=now).items() if s["count"] >= MIN_GROUP}
+        out["best_hours"] = sorted(hours, key=lambda h: hours[h]["mean"], reverse=True)[:2]
+        by_breaks = self.fatigue_by_breaks(days=days, now=now)
+        without = by_breaks.get(0)
+        with_breaks = [s for b, s in by_breaks.items() if b > 0]
+        out["fatigue_no_breaks"] = without["mean"] if without else None
+        out["fatigue_with_breaks"] = (
+            round(sum(s["mean"] * s["count"] for s in with_breaks) / sum(s["count"] for s in with_breaks), 2)
+            if with_breaks else None
+        )
+        return out
@@ -0,0 +1,169 @@
+"""
+Per-user data placement and a bounded cache of open per-user handles.
+- user_path(user_id, name): `<FOCUS_USER_DATA_DIR>/<shard>/<user dir>/<name>`; every user
+  gets their own memory log, calendar and task files, spread over 256 shard directories
+- LRUHandles: at most `capacity` open handles (e.g. a user's store plus its hot
+  aggregates); the least recently used one is closed on overflow, but never while a
+  lease on it is still held. A miss opens its handle outside the cache lock (callers
+  for the same key wait for that one open), so a slow open stalls only its own user
+user_id None keeps the original single-user files (MEMORY_FILE, CAL_PATH, TASK_PATH).
+"""
+
+from __future__ import annotations
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+USER_DATA_DIR = Path(os.getenv("FOCUS_USER_DATA_DIR", "user_data"))
+MAX_OPEN_USERS = int(os.getenv("FOCUS_MAX_OPEN_USERS", "128"))
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def user_dir(user_id: str, base=None) -> Path:
+    """Stable directory for `user_id`: readable prefix + hash, so ids that sanitize alike never collide."""
+    digest = hashlib.sha1(str(user_id).encode("utf-8")).hexdigest()
+    slug = _UNSAFE.sub("_", str(user_id)).strip("._")[:40] or "user"
+    return Path(base or USER_DATA_DIR) / digest[:2] / f"{slug}-{digest[:10]}"
+
+
+def user_path(user_id: Optional[str], name, default=None, base=None) -> Path:
+    """`default` (the shared single-user file) when user_id is None, else the user's own copy of `name`."""
+    if user_id is None:
+        return Path(default if default is not None else name)
+    path = user_dir(user_id, base) / Path(name).name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+class _Entry:
+    __slots__ = ("handle", "leases", "evicted", "ready", "error")
+
+    def __init__(self):
+        self.handle: Any = None
+        self.leases = 0
+        self.evicted = False
+        self.ready = threading.Event()  # set once the handle is open (or opening failed: `error`)
+        self.error: Optional[BaseException] = None
+
+
+class LRUHandles:
+    def __init__(
+        self,
+        opener: Callable[[Hashable], Any],
+        capacity: int = MAX_OPEN_USERS,
+        closer: Optional[Callable[[Any], None]] = None,
+    ):
+        self._opener = opener
+        self._closer = closer
+        self.capacity = max(capacity, 1)
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _acquire(self, key: Hashable, lease: bool) -> _Entry:
+        with self._lock:
+            entry = self._entries.get(key)
+            opening = entry is None
+            if opening:
+                self.misses += 1
+                entry = self._entries[key] = _Entry()  # placeholder: the open happens below, unlocked
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            entry.leases += 1  # held while the handle opens, and for the caller's block when `lease`
+            to_close = self._evict()
+        for old in to_close:
+            self._close(old)
+        if opening:
+            try:
+                entry.handle = self._opener(key)
+            except BaseException as exc:
+                entry.error = exc
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]  # the next caller tries again
+                    entry.evicted = True
+            entry.ready.set()
+        else:
+            entry.ready.wait()
+        if entry.error is not None:
+            self._release(entry)
+            raise entry.error
+        if not lease:
+            self._release(entry)
+        return entry
+
+    def _release(self, entry: _Entry) -> None:
+        with self._lock:
+            entry.leases -= 1
+            close = entry.evicted and not entry.leases and entry.error is None
+        if close:
+            self._close(entry)
+
+    def _evict(self) -> List[_Entry]:
+        """Drop the oldest entries over capacity; return those that can be closed now. Caller holds the lock."""
+        to_close = []
+        while len(self._entries) > self.capacity:
+            _, old = self._entries.popitem(last=False)
+            old.evicted = True
+            self.evictions += 1
+            if not old.leases:
+                to_close.append(old)
+        return to_close
+
+    def _close(self, entry: _Entry) -> None:
+        if self._closer is not None:
+            self._closer(entry.handle)
+
+    def get(self, key: Hashable) -> Any:
+        """The handle for `key`, opened on a miss. Without a lease it may be closed by a later eviction."""
+        return self._acquire(key, lease=False).handle
+
+    @contextmanager
+    def lease(self, key: Hashable) -> Iterator[Any]:
+        """The handle for `key`, guaranteed open until the block exits."""
+        entry = self._acquire(key, lease=True)
+        try:
+            yield entry.handle
+        finally:
+            self._release(entry)
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return
+            entry.evicted = True
+            close = not entry.leases
+        if close:
+            self._close(entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            for entry in entries:
+                entry.evicted = True
+        for entry in entries:
+            if not entry.leases:
+                self._close(entry)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "open": len(self._entries),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+            }
@@ -0,0 +1,271 @@
+"""
+Single-writer write-behind queue with group commit.
+- WriteBehindQueue: submit() returns as soon as the item is in a bounded in-memory
+  queue and appended to this process's journal (a write to the page cache, no fsync);
+  one background thread drains whatever is queued and commits it in a single batch,
+  so concurrent writers share one lock + one write instead of racing. Journals left
+  by a crashed process are replayed by the next one. flush() / close() wait for the
+  queue to drain; a full queue blocks submitters (backpressure), counted in stats().
+"""
+
+from __future__ import annotations
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from locking import try_lock_fd
+
+MAX_BATCH = 256
+MAX_PENDING = 1024
+RETRY_DELAYS = (0.1, 0.5, 2.0)  # seconds between attempts at a failing batch
+JOURNAL_SUFFIX = ".journal"
+DEAD_LETTERS = "failed.jsonl"  # items whose commit kept failing, one JSON line each
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        commit: Callable[[List[Any]], None],
+        journal_dir=None,
+        max_pending: int = MAX_PENDING,
+        max_batch: int = MAX_BATCH,
+        replay: Optional[Callable[[List[Any]], None]] = None,
+        name: str = "write-behind",
+    ):
+        """`commit(items)` persists a batch; `replay(items)` (default: commit) re-commits journaled items
+        of a crashed process, which may include a batch that landed just before the crash.
+        Items must be JSON-serializable when a journal_dir is given."""
+        self._commit = commit
+        self._replay = replay or commit
+        self.journal_dir = Path(journal_dir) if journal_dir is not None else None
+        self._max_pending = max(max_pending, 1)
+        self._max_batch = max_batch
+        self._name = name
+        self._cond = threading.Condition()
+        self._queue: Deque[Tuple[int, Any, float]] = deque()  # (seq, item, enqueued at)
+        self._thread: Optional[threading.Thread] = None
+        self._running = False  # cleared under the lock by an exiting writer, unlike Thread.is_alive()
+        self._closing = False
+        self._recovering = False
+        self._seq = 0  # last submitted
+        self._done = 0  # last committed (or dead-lettered)
+        self._journal_fd: Optional[int] = None
+        self._journal_path: Optional[Path] = None
+        self.counters: Dict[str, float] = dict.fromkeys(
+            ("submitted", "committed", "batches", "blocked", "blocked_s", "retries", "failed", "recovered"), 0
+        )
+        self.max_depth = 0
+        self.last_error: Optional[str] = None
+
+    # ------------------ Producer side ----------------------
+    def start(self) -> None:
+        """Starts the writer thread (which first replays orphaned journals) if it is not running."""
+        if not self._running:
+            with self._cond:
+                if not self._running:
+                    self._running, self._closing, self._recovering = True, False, True
+                    self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                    self._thread.start()
+
+    def submit(self, item: Any, timeout: Optional[float] = None) -> None:
+        """Queues `item` and returns; blocks while the queue is full (raises queue.Full after `timeout`)."""
+        self.start()
+        with self._cond:
+            if len(self._queue) >= self._max_pending:
+                t0 = time.perf_counter()
+                self.counters["blocked"] += 1
+                full = not self._cond.wait_for(lambda: len(self._queue) < self._max_pending, timeout)
+                self.counters["blocked_s"] += time.perf_counter() - t0
+                if full:
+                    raise queue.Full(f"{self._name}: {self._max_pending} writes pending")
+            self._seq += 1
+            self._journal(self._seq, item)
+            self._queue.append((self._seq, item, time.monotonic()))
+            self.counters["submitted"] += 1
+            self.max_depth = max(self.max_depth, len(self._queue))
+            self._cond.notify_all()
+
+    def pending(self) -> List[Any]:
+        """Items submitted but not committed yet (including the batch being committed), oldest first."""
+        with self._cond:
+            return [item for _, item, _ in self._queue]
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits until everything submitted so far (and any journal being replayed) is committed;
+        False on timeout."""
+        with self._cond:
+            target = self._seq
+            if self._done >= target and not self._recovering:
+                return True
+        self.start()
+        with self._cond:
+            return self._cond.wait_for(lambda: self._done >= target and not self._recovering, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Flushes, stops the writer thread and removes the (empty) journal; a later submit() restarts it
+        (journal_dir may be changed in between)."""
+        drained = self.flush(timeout)
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        with self._cond:
+            if drained and not self._queue:
+                self._close_journal()
+        return drained
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            c = self.counters
+            oldest = self._queue[0][2] if self._queue else None
+            return {
+                "depth": len(self._queue),
+                "capacity": self._max_pending,
+                "max_depth": self.max_depth,
+                "submitted": int(c["submitted"]),
+                "committed": int(c["committed"]),
+                "batches": int(c["batches"]),
+                "avg_batch": round(c["committed"] / c["batches"], 1) if c["batches"] else None,
+                "lag_ms": round((time.monotonic() - oldest) * 1000, 1) if oldest is not None else 0.0,
+                "blocked_submits": int(c["blocked"]),
+                "blocked_ms": round(c["blocked_s"] * 1000, 1),
+                "retries": int(c["retries"]),
+                "failed": int(c["failed"]),
+                "recovered": int(c["recovered"]),
+                "last_error": self.last_error,
+            }
+
+    # ------------------ Journal ----------------------
+    def _journal(self, seq: int, item: Any) -> None:
+        """Appends `[seq, item]` to this process's journal. Caller holds the lock."""
+        if self.journal_dir is None:
+            return
+        if self._journal_fd is None:
+            self.journal_dir.mkdir(parents=True, exist_ok=True)
+            path = self.journal_dir / f"{os.getpid()}-{uuid.uuid4().hex[:8]}{JOURNAL_SUFFIX}"
+            fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try_lock_fd(fd)  # held while we live, so other processes leave the journal alone
+            self._journal_fd, self._journal_path = fd, path
+        line = json.dumps([seq, item], ensure_ascii=False, default=str) + "\n"
+        os.write(self._journal_fd, line.encode("utf-8"))
+
+    def _journal_done(self) -> None:
+        """After a batch: empty the journal when the queue is drained, else record the commit point."""
+        if self._journal_fd is None:
+            return
+        if not self._queue:
+            os.ftruncate(self._journal_fd, 0)
+        else:
+            os.write(self._journal_fd, (json.dumps({"done": self._done}) + "\n").encode("utf-8"))
+
+    def _close_journal(self) -> None:
+        if self._journal_fd is None:
+            return
+        os.close(self._journal_fd)
+        self._journal_path.unlink(missing_ok=True)
+        try:
+            self._journal_path.parent.rmdir()  # only succeeds when no other journal is left
+        except OSError:
+            pass
+        self._journal_fd = self._journal_path = None
+
+    @staticmethod
+    def _read_journal(path: Path) -> List[Any]:
+        """Uncommitted items of a journal, in order; a torn last line is ignored."""
+        items, done = [], 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if isinstance(record, dict):
+                    done = max(done, record.get("done", 0))
+                else:
+                    items.append(record)
+        return [item for seq, item in items if seq > done]
+
+    def _recover(self) -> None:
+        """Replays journals whose process is gone (their lock is free)."""
+        if self.journal_dir is None or not self.journal_dir.is_dir():
+            return
+        for path in sorted(self.journal_dir.glob(f"*{JOURNAL_SUFFIX}")):
+            if path == self._journal_path:
+                continue
+            try:
+                fd = os.open(str(path), os.O_RDWR)
+            except OSError:
+                continue
+            try:
+                if not try_lock_fd(fd):
+                    continue  # a live process owns it
+                items = self._read_journal(path)
+                for start in range(0, len(items), self._max_batch):
+                    self._commit_batch(items[start:start + self._max_batch], self._replay)
+                with self._cond:
+                    self.counters["recovered"] += len(items)
+                path.unlink(missing_ok=True)
+            finally:
+                os.close(fd)
+
+    # ------------------ Writer thread ----------------------
+    def _commit_batch(self, items: List[Any], commit: Callable[[List[Any]], None]) -> None:
+        """Commits with retries; items that still fail on their own are dead-lettered, never retried forever."""
+        for delay in RETRY_DELAYS + (None,):
+            try:
+                commit(items)
+                return
+            except Exception as e:
+                self.last_error = repr(e)
+                if delay is None or self._closing:
+                    break
+                self.counters["retries"] += 1
+                time.sleep(delay)
+        for item in items:
+            try:
+                commit([item])
+            except Exception as e:
+                self.last_error = repr(e)
+                self.counters["failed"] += 1
+                self._dead_letter(item)
+
+    def _dead_letter(self, item: Any) -> None:
+        if self.journal_dir is None:
+            return
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.journal_dir / DEAD_LETTERS, "a", encoding="utf-8") as f:
+            f.write(json.dumps(item, ensure_ascii=False, default=str) + "\n")
+
+    def _run(self) -> None:
+        try:
+            self._recover()
+        except Exception as e:  # an unreadable journal must not stop the writer; it is retried next start
+            self.last_error = repr(e)
+        finally:
+            with self._cond:
+                self._recovering = False
+                self._cond.notify_all()
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closing)
+                if not self._queue:
+                    self._running = False
+                    return
+                batch = [self._queue[i] for i in range(min(len(self._queue), self._max_batch))]
+            self._commit_batch([item for _, item, _ in batch], self._commit)
+            with self._cond:
+                for _ in batch:
+                    self._queue.popleft()
+                self._done = batch[-1][0]
+                self.counters["committed"] += len(batch)
+                self.counters["batches"] += 1
+                self._journal_done()
+                self._cond.notify_all()